@@ -10,13 +10,19 @@ def create_app(config_name='development'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
 
+    # Encode JSON responses with orjson when it is installed
+    from app.services.serializers import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
     db.init_app(app)
-    JWTManager(app)
+    jwt = JWTManager(app)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
-    socketio = SocketIO(app, cors_allowed_origins="*")
+    # With several workers, set SOCKETIO_MESSAGE_QUEUE (e.g. a Redis URL) so
+    # events emitted in one process reach clients connected to another
+    socketio = SocketIO(app, cors_allowed_origins="*", message_queue=os.getenv('SOCKETIO_MESSAGE_QUEUE'))
 
     # Register blueprints
-    from app.routes import auth_bp, user_bp, match_bp, chat_bp, payment_bp, video_bp, verification_bp
+    from app.routes import auth_bp, user_bp, match_bp, chat_bp, payment_bp, video_bp, verification_bp, photo_bp
     from app.routes.admin import admin_bp
     from app.routes.movie import movie_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -28,6 +34,15 @@ def create_app(config_name='development'):
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(movie_bp, url_prefix='/api/movie')
     app.register_blueprint(verification_bp, url_prefix='/api/verification')
+    app.register_blueprint(photo_bp, url_prefix='/api/photos')
+
+    # Authorization claims in access tokens and their revocation list
+    from app.services.auth_claims import init_auth_claims, revoke_banned_users
+    init_auth_claims(app, jwt)
+
+    # Socket.IO events (chat push, video call signaling)
+    from app.events import init_socketio_events
+    init_socketio_events(socketio)
 
     with app.app_context():
         # Create schema if using PostgreSQL
@@ -45,4 +60,6 @@ def create_app(config_name='development'):
         db.create_all()
         print('Database tables created')
 
+        revoke_banned_users()
+
     return app, socketio
@@ -1,11 +1,226 @@
+import time
+
+from flask import request, current_app
 from flask_socketio import emit, join_room, leave_room
+from flask_jwt_extended import decode_token
+from sqlalchemy import or_
+from app.models import db, Match, MovieSession
+from app.services.auth_claims import is_token_revoked
+from app.services.signaling_store import signaling_store
+
+# Authenticated Socket.IO connections: {sid: user_id}
+connected_users = {}
+
+
+def match_room(match_id):
+    """Socket.IO room shared by both users of a match"""
+    return f'match_{match_id}'
+
+
+def find_member_match(match_id, user_id):
+    """The (mutual) match if user_id is part of it, else None"""
+    return Match.query.filter(
+        Match.id == match_id,
+        or_(
+            Match.sender_id == user_id,
+            Match.receiver_id == user_id
+        ),
+        Match.status == 'matched'
+    ).first()
+
+
+def emit_to_match(match_id, event, data):
+    """Push an event to everyone who joined the match room"""
+    socketio = current_app.extensions.get('socketio')
+    if socketio:
+        socketio.emit(event, data, to=match_room(match_id))
+
+
+def _user_from_token(auth):
+    """Resolve the user id from the JWT sent in the Socket.IO auth payload or ?token="""
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    token = token or request.args.get('token')
+    if not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except Exception:
+        return None
+    # Refresh tokens are only good for /api/auth/refresh
+    if payload.get('type') != 'access':
+        return None
+    # decode_token does not consult the revocation list
+    return None if is_token_revoked(payload) else payload['sub']
+
 
 def init_socketio_events(socketio):
     @socketio.on('connect')
-    def handle_connect():
-        print('Client connected')
-        emit('connection_response', {'data': 'Connected'})
+    def handle_connect(auth=None):
+        user_id = _user_from_token(auth)
+        if not user_id:
+            # Reject unauthenticated connections
+            return False
+
+        connected_users[request.sid] = user_id
+        emit('connection_response', {'data': 'Connected', 'user_id': user_id})
 
     @socketio.on('disconnect')
-    def handle_disconnect():
-        print('Client disconnected')
+    def handle_disconnect(*args):
+        connected_users.pop(request.sid, None)
+
+    @socketio.on('join_match')
+    def handle_join_match(data):
+        """Subscribe to pushes (messages, read receipts, typing) for a match"""
+        user_id = connected_users.get(request.sid)
+        match_id = (data or {}).get('match_id')
+
+        if not user_id or not match_id or not find_member_match(match_id, user_id):
+            emit('error', {'error': 'Match not found or not authorized', 'match_id': match_id})
+            return
+
+        join_room(match_room(match_id))
+        emit('joined_match', {'match_id': match_id})
+
+    @socketio.on('leave_match')
+    def handle_leave_match(data):
+        match_id = (data or {}).get('match_id')
+        if match_id:
+            leave_room(match_room(match_id))
+
+    def joined_member(data):
+        """(user_id, match_id) if this connection joined the match room, else (None, None)"""
+        user_id = connected_users.get(request.sid)
+        match_id = (data or {}).get('match_id')
+        if not user_id or not match_id or match_room(match_id) not in socketio.server.rooms(request.sid):
+            return None, None
+        return user_id, match_id
+
+    @socketio.on('typing')
+    def handle_typing(data):
+        """Relay typing indicators to the other user in the match"""
+        user_id, match_id = joined_member(data)
+        if not user_id:
+            return
+
+        emit('typing', {
+            'match_id': match_id,
+            'user_id': user_id,
+            'is_typing': bool(data.get('is_typing', True))
+        }, to=match_room(match_id), include_self=False)
+
+    @socketio.on('mark_read')
+    def handle_mark_read(data):
+        """Mark the other user's messages as read and send a read receipt"""
+        from app.routes.chat import mark_messages_read
+
+        user_id = connected_users.get(request.sid)
+        match_id = (data or {}).get('match_id')
+        match = find_member_match(match_id, user_id) if user_id and match_id else None
+        if not match:
+            return
+
+        mark_messages_read(match, user_id)
+
+    # WebRTC signaling: each offer, answer and ICE candidate is relayed to the
+    # other user as soon as it arrives. It is also kept in the signaling store
+    # so a peer that joins late (or uses the HTTP fallback) can catch up.
+
+    @socketio.on('call_offer')
+    def handle_call_offer(data):
+        user_id, match_id = joined_member(data)
+        if not user_id or not data.get('offer'):
+            return
+
+        signaling_store.start_call(match_id, user_id)
+        signaling_store.set_description(match_id, user_id, 'offer', data['offer'])
+        emit('call_offer', {
+            'match_id': match_id,
+            'user_id': user_id,
+            'offer': data['offer']
+        }, to=match_room(match_id), include_self=False)
+
+    @socketio.on('call_answer')
+    def handle_call_answer(data):
+        user_id, match_id = joined_member(data)
+        if not user_id or not data.get('answer'):
+            return
+
+        signaling_store.set_description(match_id, user_id, 'answer', data['answer'])
+        emit('call_answer', {
+            'match_id': match_id,
+            'user_id': user_id,
+            'answer': data['answer']
+        }, to=match_room(match_id), include_self=False)
+
+    @socketio.on('ice_candidate')
+    def handle_ice_candidate(data):
+        """Trickle ICE: one candidate per event"""
+        user_id, match_id = joined_member(data)
+        if not user_id or not data.get('candidate'):
+            return
+
+        signaling_store.add_candidate(match_id, user_id, data['candidate'])
+        emit('ice_candidate', {
+            'match_id': match_id,
+            'user_id': user_id,
+            'candidate': data['candidate']
+        }, to=match_room(match_id), include_self=False)
+
+    @socketio.on('call_hangup')
+    def handle_call_hangup(data):
+        user_id, match_id = joined_member(data)
+        if not user_id:
+            return
+
+        signaling_store.end_call(match_id)
+        emit('call_hangup', {
+            'match_id': match_id,
+            'user_id': user_id
+        }, to=match_room(match_id), include_self=False)
+
+    # Watch-together playback sync
+
+    @socketio.on('time_sync')
+    def handle_time_sync(data):
+        """
+        NTP-style clock probe. The client sends its time t0 and, on the
+        reply, takes t3; its offset to the server clock is
+        ((t1 - t0) + (t2 - t3)) / 2, best from the probe with the
+        smallest round trip.
+        """
+        received_at = time.time()
+        return {'t0': (data or {}).get('t0'), 't1': received_at, 't2': time.time()}
+
+    def joined_session(data):
+        """(match_id, MovieSession) for a member of the match room, else (None, None)"""
+        user_id, match_id = joined_member(data)
+        session_id = (data or {}).get('session_id')
+        if not user_id or not session_id:
+            return None, None
+        return match_id, MovieSession.query.filter_by(id=session_id, match_id=match_id).first()
+
+    @socketio.on('movie_control')
+    def handle_movie_control(data):
+        """Play, pause or seek; both clients get the new state with its play-at time"""
+        from app.routes.movie import change_session
+
+        match_id, session = joined_session(data)
+        if not session:
+            return
+        try:
+            change_session(match_id, session, status=data.get('status'), position=data.get('position'))
+        except Exception as e:
+            db.session.rollback()
+            emit('error', {'error': f'Failed to update session: {str(e)}', 'match_id': match_id})
+
+    @socketio.on('movie_drift')
+    def handle_movie_drift(data):
+        """
+        A client could not correct its drift locally (stall, sleep, bad
+        clock estimate): send it the authoritative state again
+        """
+        from app.routes.movie import session_state
+
+        match_id, session = joined_session(data)
+        if session:
+            emit('movie_state', session_state(match_id, session))
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import deferred
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import uuid
@@ -9,6 +10,12 @@ db = SQLAlchemy()
 # Get schema from environment
 SCHEMA = os.getenv('DATABASE_SCHEMA', 'public')
 
+# Heavy or rarely read User columns are deferred in groups and loaded on
+# first access. Endpoints that need a group up front use undefer_group();
+# list endpoints select their columns with load_only().
+#   profile      - free text and JSON lists (bio, photos, interests, ...)
+#   billing      - Stripe customer, subscription and payout data
+#   verification - identity verification bookkeeping and ban reason
 class User(db.Model):
     __tablename__ = 'users'
     __table_args__ = {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
@@ -23,8 +30,10 @@ class User(db.Model):
     age = db.Column(db.Integer)
     gender = db.Column(db.String(20))
     city = db.Column(db.String(120))
-    bio = db.Column(db.Text)
-    photos = db.Column(db.JSON, default=list)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    bio = deferred(db.Column(db.Text), group='profile')
+    photos = deferred(db.Column(db.JSON, default=list), group='profile')
 
     # Extended Profile Info
     height = db.Column(db.Integer)  # in cm
@@ -36,7 +45,7 @@ class User(db.Model):
     education = db.Column(db.String(50))  # high_school, bachelor, master, phd
     occupation = db.Column(db.String(100))
     company = db.Column(db.String(100))
-    languages = db.Column(db.JSON, default=list)  # ["Russian", "English", "German"]
+    languages = deferred(db.Column(db.JSON, default=list), group='profile')  # ["Russian", "English", "German"]
     
     # Lifestyle
     smoking = db.Column(db.String(20))  # never, sometimes, regularly
@@ -44,7 +53,7 @@ class User(db.Model):
     children = db.Column(db.String(30))  # no, yes_living_together, yes_living_separately, want_someday
     
     # Interests (stored as JSON array)
-    interests = db.Column(db.JSON, default=list)  # ["travel", "music", "sport", "art", ...]
+    interests = deferred(db.Column(db.JSON, default=list), group='profile')  # ["travel", "music", "sport", "art", ...]
     
     # Looking for (detailed)
     relationship_type = db.Column(db.String(30))  # serious, casual, friendship, not_sure
@@ -55,17 +64,17 @@ class User(db.Model):
     # Subscription: free, standard, premium
     subscription_plan = db.Column(db.String(20), default='free')
     subscription_expires = db.Column(db.DateTime)
-    stripe_customer_id = db.Column(db.String(100))
-    stripe_subscription_id = db.Column(db.String(100))
+    stripe_customer_id = deferred(db.Column(db.String(100)), group='billing')
+    stripe_subscription_id = deferred(db.Column(db.String(100), index=True), group='billing')  # Subscription webhooks look users up by it
 
     # Service Provider Specific (for intimate_services)
     is_service_provider = db.Column(db.Boolean, default=False)
     service_verified = db.Column(db.Boolean, default=False)
-    business_name = db.Column(db.String(200))
-    tax_id = db.Column(db.String(255))  # Now stores provider's Stripe Secret Key (increased to 255)
-    stripe_account_id = db.Column(db.String(100))  # Extracted from Stripe API
+    business_name = deferred(db.Column(db.String(200)), group='billing')
+    tax_id = deferred(db.Column(db.String(255)), group='billing')  # Now stores provider's Stripe Secret Key (increased to 255)
+    stripe_account_id = deferred(db.Column(db.String(100)), group='billing')  # Extracted from Stripe API
     hourly_rate = db.Column(db.Float)
-    services_offered = db.Column(db.JSON, default=list)
+    services_offered = deferred(db.Column(db.JSON, default=list), group='profile')
 
     # AI Assistant Settings
     ai_assistant_enabled = db.Column(db.Boolean, default=False)
@@ -82,15 +91,15 @@ class User(db.Model):
     # Stripe Identity Verification (18+ Age Verification)
     identity_verified = db.Column(db.Boolean, default=False)
     identity_verification_status = db.Column(db.String(30), default='unverified')  # unverified, pending, verified, failed
-    stripe_identity_session_id = db.Column(db.String(100))
-    identity_verified_at = db.Column(db.DateTime)
-    identity_document_type = db.Column(db.String(30))  # passport, id_card, driving_license
+    stripe_identity_session_id = deferred(db.Column(db.String(100)), group='verification')
+    identity_verified_at = deferred(db.Column(db.DateTime), group='verification')
+    identity_document_type = deferred(db.Column(db.String(30)), group='verification')  # passport, id_card, driving_license
     identity_age_verified = db.Column(db.Boolean, default=False)  # Confirms 18+
-    verification_attempts = db.Column(db.Integer, default=0)
-    last_verification_attempt = db.Column(db.DateTime)
+    verification_attempts = deferred(db.Column(db.Integer, default=0), group='verification')
+    last_verification_attempt = deferred(db.Column(db.DateTime), group='verification')
     is_active = db.Column(db.Boolean, default=True)
     is_banned = db.Column(db.Boolean, default=False)
-    banned_reason = db.Column(db.Text)
+    banned_reason = deferred(db.Column(db.Text), group='verification')
     is_admin = db.Column(db.Boolean, default=False)
 
     # Preferences
@@ -112,16 +121,37 @@ class User(db.Model):
 
 class Match(db.Model):
     __tablename__ = 'matches'
-    __table_args__ = {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
+    __table_args__ = (
+        # One swipe per direction; also the conflict target for atomic likes
+        db.UniqueConstraint('sender_id', 'receiver_id', name='uq_matches_sender_receiver'),
+        # Listings: "my matches / likes with this status", newest change first
+        db.Index('ix_matches_sender_status_updated', 'sender_id', 'status', 'updated_at'),
+        db.Index('ix_matches_receiver_status_updated', 'receiver_id', 'status', 'updated_at'),
+        {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
+    )
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     sender_id = db.Column(db.String(36), db.ForeignKey(f'{SCHEMA}.users.id' if 'postgresql' in os.getenv('DATABASE_URL', '') else 'users.id'))
     receiver_id = db.Column(db.String(36), db.ForeignKey(f'{SCHEMA}.users.id' if 'postgresql' in os.getenv('DATABASE_URL', '') else 'users.id'))
     status = db.Column(db.String(20), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Read watermarks: created_at of the newest message each side has read
+    sender_last_read_at = db.Column(db.DateTime)
+    receiver_last_read_at = db.Column(db.DateTime)
+    # Inbox counters, maintained when messages are sent and read
+    last_message_at = db.Column(db.DateTime)
+    last_message_preview = db.Column(db.String(200))
+    last_message_sender_id = db.Column(db.String(36))
+    sender_unread_count = db.Column(db.Integer, default=0)
+    receiver_unread_count = db.Column(db.Integer, default=0)
 
 class Chat(db.Model):
     __tablename__ = 'chats'
-    __table_args__ = {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
+    __table_args__ = (
+        # Message pages, read watermarks and unread counts of a match
+        db.Index('ix_chats_match_created', 'match_id', 'created_at', 'id'),
+        {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
+    )
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     match_id = db.Column(db.String(36), db.ForeignKey(f'{SCHEMA}.matches.id' if 'postgresql' in os.getenv('DATABASE_URL', '') else 'matches.id'))
     message = db.Column(db.Text)
@@ -138,7 +168,8 @@ class MovieSession(db.Model):
     movie_url = db.Column(db.String(500))  # YouTube URL or file path
     movie_thumbnail = db.Column(db.String(500))
     status = db.Column(db.String(20), default='selecting')  # selecting, playing, paused, ended
-    current_time = db.Column(db.Float, default=0.0)  # Current playback position in seconds
+    current_time = db.Column(db.Float, default=0.0)  # Playback position in seconds at position_anchored_at
+    position_anchored_at = db.Column(db.DateTime, default=datetime.utcnow)  # Playback clock anchor (play-at time while playing)
     started_by = db.Column(db.String(36), db.ForeignKey(f'{SCHEMA}.users.id' if 'postgresql' in os.getenv('DATABASE_URL', '') else 'users.id'))
     started_at = db.Column(db.DateTime)
     ended_at = db.Column(db.DateTime)
@@ -147,7 +178,12 @@ class MovieSession(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
-    __table_args__ = {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
+    __table_args__ = (
+        # "My bookings" as provider or client, newest first
+        db.Index('ix_bookings_provider_created', 'provider_id', 'created_at'),
+        db.Index('ix_bookings_client_created', 'client_id', 'created_at'),
+        {'schema': SCHEMA} if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
+    )
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     client_id = db.Column(db.String(36), db.ForeignKey(f'{SCHEMA}.users.id' if 'postgresql' in os.getenv('DATABASE_URL', '') else 'users.id'))
     provider_id = db.Column(db.String(36), db.ForeignKey(f'{SCHEMA}.users.id' if 'postgresql' in os.getenv('DATABASE_URL', '') else 'users.id'))
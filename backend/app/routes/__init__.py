@@ -7,9 +7,10 @@ chat_bp = Blueprint('chat', __name__)
 payment_bp = Blueprint('payment', __name__)
 video_bp = Blueprint('video', __name__)
 verification_bp = Blueprint('verification', __name__)
+photo_bp = Blueprint('photos', __name__)
 
 # Import route handlers to register them with blueprints
-from app.routes import auth, user, match, chat, payment, video, verification
+from app.routes import auth, user, match, chat, payment, video, verification, photos
 
 @auth_bp.route('/test', methods=['GET'])
 def test():
@@ -2,9 +2,14 @@
 # API routes for admin panel
 
 from flask import request, jsonify, Blueprint
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
+from flask_jwt_extended import jwt_required
 from app.models import User, Match, Chat, db
+from app.services.discovery import discovery_index
+from app.services.serializers import serialize_user, ADMIN_USER
+from app.services.profile_cache import invalidate_user
+from app.services.auth_claims import current_claims, issue_access_token, issue_refresh_token, revoke_claims
 from sqlalchemy import func
+from sqlalchemy.orm import load_only
 import json
 
 admin_bp = Blueprint('admin', __name__)
@@ -14,10 +19,8 @@ def admin_required():
     def wrapper(fn):
         @jwt_required()
         def decorator(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-
-            if not user or not getattr(user, 'is_admin', False):
+            # Role comes from the token claims, no user row is loaded
+            if current_claims().get('role') != 'admin':
                 return jsonify({'error': 'Admin access required'}), 403
 
             return fn(*args, **kwargs)
@@ -25,6 +28,13 @@ def admin_required():
         return decorator
     return wrapper
 
+# Columns shown in the admin user list
+USER_LIST_COLUMNS = (
+    User.id, User.email, User.username, User.first_name, User.last_name, User.age,
+    User.gender, User.city, User.goal, User.subscription_plan, User.trust_score,
+    User.is_active, User.is_banned, User.is_admin, User.created_at
+)
+
 @admin_bp.route('/users', methods=['GET'])
 @admin_required()
 def get_all_users():
@@ -34,7 +44,7 @@ def get_all_users():
         per_page = request.args.get('per_page', 50, type=int)
         search = request.args.get('search', '')
 
-        query = User.query
+        query = User.query.options(load_only(*USER_LIST_COLUMNS))
 
         if search:
             query = query.filter(
@@ -47,25 +57,7 @@ def get_all_users():
 
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
-        users = []
-        for user in pagination.items:
-            users.append({
-                'id': user.id,
-                'email': user.email,
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'age': user.age,
-                'gender': user.gender,
-                'city': user.city,
-                'goal': user.goal,
-                'subscription_plan': user.subscription_plan,
-                'trust_score': user.trust_score,
-                'is_active': user.is_active,
-                'is_banned': user.is_banned,
-                'is_admin': getattr(user, 'is_admin', False),
-                'created_at': user.created_at.isoformat() if user.created_at else None
-            })
+        users = [serialize_user(user, ADMIN_USER) for user in pagination.items]
 
         return jsonify({
             'users': users,
@@ -88,12 +80,13 @@ def impersonate_user(user_id):
         if not target_user:
             return jsonify({'error': 'User not found'}), 404
 
-        # Create access token for target user
-        access_token = create_access_token(identity=target_user.id)
+        # Create access and refresh tokens for target user
+        access_token = issue_access_token(target_user)
 
         return jsonify({
             'message': f'Now logged in as {target_user.username}',
             'access_token': access_token,
+            'refresh_token': issue_refresh_token(target_user),
             'user': {
                 'id': target_user.id,
                 'email': target_user.email,
@@ -175,6 +168,12 @@ def update_user(user_id):
             user.subscription_plan = data['subscription_plan']
 
         db.session.commit()
+        discovery_index.update_user(user)
+        invalidate_user(user.id)
+        # Banned or deactivated users lose their tokens; a plan change only
+        # refreshes the claims, and an unban lifts the rejection
+        blocked = bool(user.is_banned) or not user.is_active
+        revoke_claims(user.id, reject=blocked, unban=not blocked)
 
         return jsonify({'message': 'User updated successfully'}), 200
 
@@ -195,10 +194,18 @@ def get_all_matches():
             page=page, per_page=per_page, error_out=False
         )
 
+        # Load both users of every match on this page in one query
+        user_ids = {match.sender_id for match in pagination.items} | {match.receiver_id for match in pagination.items}
+        users = {
+            user.id: user for user in User.query.filter(User.id.in_(user_ids)).options(
+                load_only(User.id, User.username, User.email)
+            ).all()
+        } if user_ids else {}
+
         matches = []
         for match in pagination.items:
-            user1 = User.query.get(match.sender_id)
-            user2 = User.query.get(match.receiver_id)
+            user1 = users.get(match.sender_id)
+            user2 = users.get(match.receiver_id)
 
             matches.append({
                 'match_id': match.id,
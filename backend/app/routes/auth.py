@@ -1,7 +1,13 @@
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, decode_token
+from sqlalchemy.orm import undefer_group
 from app.routes import auth_bp
 from app.models import db, User
+from app.services.discovery import discovery_index
+from app.services.geo import is_valid_coordinate
+from app.services.photo_store import photo_store
+from app.services.auth_claims import issue_access_token, issue_refresh_token, deny_token
+from app.services.profile_cache import profile_cache
 from datetime import datetime
 import re
 import json
@@ -59,6 +65,11 @@ def register():
         if not isinstance(data['age'], int) or data['age'] < 18 or data['age'] > 100:
             return jsonify({'error': 'Age must be between 18 and 100'}), 400
 
+        # Validate optional location
+        has_location = data.get('latitude') is not None and data.get('longitude') is not None
+        if has_location and not is_valid_coordinate(data['latitude'], data['longitude']):
+            return jsonify({'error': 'Invalid latitude/longitude'}), 400
+
         # Create new user
         new_user = User(
             email=data['email'].lower(),
@@ -72,7 +83,9 @@ def register():
             bio=data.get('bio'),
             looking_for_gender=data.get('looking_for_gender'),
             age_min=data.get('age_min', 18),
-            age_max=data.get('age_max', 100)
+            age_max=data.get('age_max', 100),
+            latitude=float(data['latitude']) if has_location else None,
+            longitude=float(data['longitude']) if has_location else None
         )
 
         new_user.set_password(data['password'])
@@ -87,13 +100,15 @@ def register():
 
         db.session.add(new_user)
         db.session.commit()
+        discovery_index.update_user(new_user)
 
-        # Create access token
-        access_token = create_access_token(identity=new_user.id)
+        # Create access and refresh tokens
+        access_token = issue_access_token(new_user)
 
         return jsonify({
             'message': 'Registration successful',
             'access_token': access_token,
+            'refresh_token': issue_refresh_token(new_user),
             'user': {
                 'id': new_user.id,
                 'email': new_user.email,
@@ -134,12 +149,13 @@ def login():
         user.last_active = datetime.utcnow()
         db.session.commit()
 
-        # Create access token
-        access_token = create_access_token(identity=user.id)
+        # Create access and refresh tokens
+        access_token = issue_access_token(user)
 
         return jsonify({
             'message': 'Login successful',
             'access_token': access_token,
+            'refresh_token': issue_refresh_token(user),
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -159,18 +175,58 @@ def login():
     except Exception as e:
         return jsonify({'error': f'Login failed: {str(e)}'}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token for a new short-lived access token"""
+    try:
+        # Claims come from the profile snapshot, so a refresh picks up plan and role changes
+        user = profile_cache.get(get_jwt_identity())
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        if not user.is_active or user.is_banned:
+            return jsonify({'error': 'Account is deactivated or banned'}), 403
+
+        return jsonify({'access_token': issue_access_token(user)}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Token refresh failed: {str(e)}'}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the current token and, if sent, the refresh token"""
+    try:
+        token = get_jwt()
+        deny_token(token)
+
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                refresh_payload = decode_token(refresh_token)
+            except Exception:
+                refresh_payload = None  # Expired or invalid: nothing left to revoke
+            if refresh_payload and refresh_payload.get('sub') == token['sub']:
+                deny_token(refresh_payload)
+
+        return jsonify({'message': 'Logged out'}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Logout failed: {str(e)}'}), 500
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = User.query.options(undefer_group('profile')).get(user_id)
 
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        # DON'T include photos here - they can be huge!
-        # Photos are loaded separately in profile endpoints
+        # Photos are returned as photo store URLs, not inline image data
         return jsonify({
             'user': {
                 'id': user.id,
@@ -186,6 +242,9 @@ def get_current_user():
                 'looking_for_gender': user.looking_for_gender,
                 'age_min': user.age_min,
                 'age_max': user.age_max,
+                'max_distance': user.max_distance,
+                'latitude': user.latitude,
+                'longitude': user.longitude,
                 'subscription_plan': user.subscription_plan,
                 'is_service_provider': user.is_service_provider,
                 'service_verified': user.service_verified,
@@ -197,7 +256,7 @@ def get_current_user():
                 'identity_verified': user.identity_verified,
                 'identity_verification_status': user.identity_verification_status,
                 'identity_age_verified': user.identity_age_verified,
-                # 'photos': removed to reduce payload size
+                'photos': photo_store.urls(user.photos, 'medium'),
                 'created_at': user.created_at.isoformat() if user.created_at else None,
                 'is_admin': user.is_admin
             }
@@ -6,15 +6,127 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes import chat_bp
 from app.models import User, Match, Chat, db
 from app.services.ai_service import ai_assistant
-from sqlalchemy import and_, or_
+from app.events import emit_to_match
+from app.services.photo_store import photo_store
+from app.services.serializers import serialize_user, ROOM_MEMBER
+from app.services.profile_cache import profile_cache, invalidate_user
+from app.services.entitlements import entitlements
+from app.services.auth_claims import current_entitlements
+from sqlalchemy import and_, or_, case, func, tuple_
+from sqlalchemy.orm import load_only
 from datetime import datetime
 
+# Messages per page of GET /<match_id>/messages
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_MAX_PAGE_SIZE = 200
+
+# Characters of the last message kept on the match for the inbox
+PREVIEW_LENGTH = 100
+
+def _serialize_message(msg, sender, recipient_read_at=None):
+    return {
+        'id': msg.id,
+        'match_id': msg.match_id,
+        'message': msg.message,
+        'sender_id': msg.sender_id,
+        'sender_name': sender.first_name or sender.username if sender else 'Unknown',
+        'is_read': bool(recipient_read_at and msg.created_at <= recipient_read_at),
+        'created_at': msg.created_at.isoformat()
+    }
+
+
+def _last_read_column(match, user_id):
+    """Match column holding user_id's read watermark"""
+    return Match.sender_last_read_at if match.sender_id == user_id else Match.receiver_last_read_at
+
+
+def _unread_count_column(match, user_id):
+    """Match column counting messages user_id has not read yet"""
+    return Match.sender_unread_count if match.sender_id == user_id else Match.receiver_unread_count
+
+
+def mark_messages_read(match, reader_id):
+    """
+    Move reader_id's read watermark up to the newest message in the match
+    and push a read receipt. A single UPDATE of the match row, however
+    long the conversation is.
+    """
+    latest = db.session.query(db.func.max(Chat.created_at)).filter(Chat.match_id == match.id).scalar()
+    if not latest:
+        return None
+
+    column = _last_read_column(match, reader_id)
+    # Messages that arrived after `latest` was read stay unread
+    still_unread = db.session.query(func.count(Chat.id)).filter(
+        Chat.match_id == match.id,
+        Chat.sender_id != reader_id,
+        Chat.created_at > latest
+    ).scalar_subquery()
+    updated = Match.query.filter(
+        Match.id == match.id,
+        or_(column.is_(None), column < latest)
+    ).update({
+        column: latest,
+        _unread_count_column(match, reader_id): still_unread,
+        # Reading a chat does not change the match itself
+        Match.updated_at: Match.updated_at
+    }, synchronize_session=False)
+    db.session.commit()
+
+    if updated:
+        emit_to_match(match.id, 'messages_read', {
+            'match_id': match.id,
+            'reader_id': reader_id,
+            'read_at': latest.isoformat()
+        })
+    return latest
+
+
+def _message_page(match_id, after_id=None, before_id=None, limit=MESSAGE_PAGE_SIZE):
+    """
+    One page of messages, oldest first, and whether more exist beyond it.
+
+    after_id returns messages newer than that message, before_id older ones;
+    without either the newest page is returned. Messages are keyed on
+    (created_at, id) so the cost does not depend on the conversation length.
+    """
+    key = tuple_(Chat.created_at, Chat.id)
+    query = Chat.query.filter(Chat.match_id == match_id)
+
+    anchor_id = after_id or before_id
+    if anchor_id:
+        anchor = Chat.query.filter_by(id=anchor_id, match_id=match_id).first()
+        if not anchor:
+            raise ValueError('Unknown message id')
+        anchor_key = tuple_(anchor.created_at, anchor.id)
+
+    if after_id:
+        query = query.filter(key > anchor_key).order_by(Chat.created_at.asc(), Chat.id.asc())
+    else:
+        if before_id:
+            query = query.filter(key < anchor_key)
+        query = query.order_by(Chat.created_at.desc(), Chat.id.desc())
+
+    messages = query.limit(limit + 1).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not after_id:
+        messages.reverse()
+    return messages, has_more
+
+
 @chat_bp.route('/<match_id>/messages', methods=['GET'])
 @jwt_required()
 def get_messages(match_id):
-    """Get all messages for a match/room"""
+    """Get a page of messages for a match/room (?after_id=, ?before_id=, ?limit=)"""
     try:
         current_user_id = get_jwt_identity()
+        after_id = request.args.get('after_id')
+        before_id = request.args.get('before_id')
+        limit = min(max(request.args.get('limit', MESSAGE_PAGE_SIZE, type=int), 1), MESSAGE_MAX_PAGE_SIZE)
+
+        if after_id and before_id:
+            return jsonify({'error': 'Use either after_id or before_id'}), 400
 
         # Verify user is part of this match
         match = Match.query.filter(
@@ -29,41 +141,46 @@ def get_messages(match_id):
         if not match:
             return jsonify({'error': 'Match not found or not authorized'}), 404
 
-        # Get all messages for this match
-        messages = Chat.query.filter_by(match_id=match_id).order_by(Chat.created_at).all()
+        # Mark messages as read (one UPDATE) and notify the sender
+        mark_messages_read(match, current_user_id)
 
-        # Mark messages as read
-        for msg in messages:
-            if msg.sender_id != current_user_id and not msg.is_read:
-                msg.is_read = True
-        db.session.commit()
-
-        # Serialize messages
-        messages_data = []
-        for msg in messages:
-            sender = User.query.get(msg.sender_id)
-            messages_data.append({
-                'id': msg.id,
-                'message': msg.message,
-                'sender_id': msg.sender_id,
-                'sender_name': sender.first_name or sender.username if sender else 'Unknown',
-                'is_read': msg.is_read,
-                'created_at': msg.created_at.isoformat()
-            })
+        # Get one page of messages for this match
+        try:
+            messages, has_more = _message_page(match_id, after_id, before_id, limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid after_id or before_id'}), 400
 
-        # Get other user info
+        # Both participants are the only possible senders
         other_user_id = match.receiver_id if match.sender_id == current_user_id else match.sender_id
-        other_user = User.query.get(other_user_id)
+        users = {u.id: u for u in User.query.filter(User.id.in_([current_user_id, other_user_id])).options(
+            load_only(User.id, User.username, User.first_name, User.last_name, User.photos, User.trust_score)
+        ).all()}
+        other_user = users.get(other_user_id)
+
+        # A message is read once its recipient's watermark has reached it
+        read_at = {
+            match.sender_id: match.sender_last_read_at,
+            match.receiver_id: match.receiver_last_read_at
+        }
+        recipient = {current_user_id: other_user_id, other_user_id: current_user_id}
+
+        # Serialize messages
+        messages_data = [
+            _serialize_message(msg, users.get(msg.sender_id), read_at.get(recipient.get(msg.sender_id)))
+            for msg in messages
+        ]
 
         return jsonify({
             'messages': messages_data,
+            # Newer messages exist for after_id, older ones otherwise
+            'has_more': has_more,
             'match_id': match_id,
             'other_user': {
                 'id': other_user.id,
                 'username': other_user.username,
                 'first_name': other_user.first_name,
                 'last_name': other_user.last_name,
-                'photos': other_user.photos,
+                'photos': photo_store.urls(other_user.photos, 'thumb'),
                 'trust_score': other_user.trust_score
             } if other_user else None
         }), 200
@@ -100,24 +217,31 @@ def send_message(match_id):
         new_message = Chat(
             match_id=match_id,
             sender_id=current_user_id,
-            message=data['message'],
-            is_read=False
+            message=data['message']
         )
         db.session.add(new_message)
+        db.session.flush()
+
+        # Maintain the inbox preview and the recipient's unread counter
+        recipient_unread = _unread_count_column(match, match.receiver_id if match.sender_id == current_user_id else match.sender_id)
+        Match.query.filter(Match.id == match_id).update({
+            Match.last_message_at: new_message.created_at,
+            Match.last_message_preview: new_message.message[:PREVIEW_LENGTH],
+            Match.last_message_sender_id: current_user_id,
+            recipient_unread: func.coalesce(recipient_unread, 0) + 1,
+            Match.updated_at: Match.updated_at
+        }, synchronize_session=False)
         db.session.commit()
 
         # Get sender info
-        sender = User.query.get(current_user_id)
+        sender = profile_cache.get(current_user_id)
+        message_data = _serialize_message(new_message, sender)
+
+        # Push to both participants' open chat views
+        emit_to_match(match_id, 'new_message', message_data)
 
         return jsonify({
-            'message': {
-                'id': new_message.id,
-                'message': new_message.message,
-                'sender_id': new_message.sender_id,
-                'sender_name': sender.first_name or sender.username if sender else 'Unknown',
-                'is_read': new_message.is_read,
-                'created_at': new_message.created_at.isoformat()
-            }
+            'message': message_data
         }), 201
 
     except Exception as e:
@@ -125,6 +249,69 @@ def send_message(match_id):
         return jsonify({'error': f'Failed to send message: {str(e)}'}), 500
 
 
+@chat_bp.route('/inbox', methods=['GET'])
+@jwt_required()
+def get_inbox():
+    """All conversations of the user with last message preview and unread count, in one query"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        # The other user and this user's unread counter of each match
+        other_user_id = case(
+            (Match.sender_id == current_user_id, Match.receiver_id),
+            else_=Match.sender_id
+        )
+        my_unread = case(
+            (Match.sender_id == current_user_id, Match.sender_unread_count),
+            else_=Match.receiver_unread_count
+        )
+
+        rows = db.session.query(Match, User, func.coalesce(my_unread, 0)).join(
+            User, User.id == other_user_id
+        ).filter(
+            or_(Match.sender_id == current_user_id, Match.receiver_id == current_user_id),
+            Match.status == 'matched'
+        ).options(
+            load_only(User.id, User.username, User.first_name, User.photos, User.last_active)
+        ).order_by(
+            Match.last_message_at.is_(None), Match.last_message_at.desc(), Match.created_at.desc()
+        ).all()
+
+        conversations = []
+        seen_users = set()
+        for match, user, unread in rows:
+            # A mutual match has a row per direction; keep the most recent conversation
+            if user.id in seen_users:
+                continue
+            seen_users.add(user.id)
+
+            conversations.append({
+                'match_id': match.id,
+                'user': {
+                    'id': user.id,
+                    'username': user.username,
+                    'first_name': user.first_name,
+                    'photos': photo_store.urls(user.photos, 'thumb', limit=1),
+                    'last_active': user.last_active.isoformat() if user.last_active else None
+                },
+                'last_message': {
+                    'preview': match.last_message_preview,
+                    'sender_id': match.last_message_sender_id,
+                    'is_own': match.last_message_sender_id == current_user_id,
+                    'created_at': match.last_message_at.isoformat()
+                } if match.last_message_at else None,
+                'unread_count': unread
+            })
+
+        return jsonify({
+            'conversations': conversations,
+            'total_unread': sum(c['unread_count'] for c in conversations)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch inbox: {str(e)}'}), 500
+
+
 @chat_bp.route('/<match_id>/room', methods=['GET'])
 @jwt_required()
 def get_room_info(match_id):
@@ -148,32 +335,19 @@ def get_room_info(match_id):
         # Get both users
         user1 = User.query.get(match.sender_id)
         user2 = User.query.get(match.receiver_id)
+        plan1, plan2 = entitlements.resolve(user1), entitlements.resolve(user2)
 
         return jsonify({
             'match_id': match_id,
             'created_at': match.created_at.isoformat(),
-            'users': [
-                {
-                    'id': user1.id,
-                    'username': user1.username,
-                    'first_name': user1.first_name,
-                    'photos': user1.photos,
-                    'subscription_plan': user1.subscription_plan
-                },
-                {
-                    'id': user2.id,
-                    'username': user2.username,
-                    'first_name': user2.first_name,
-                    'photos': user2.photos,
-                    'subscription_plan': user2.subscription_plan
-                }
-            ],
+            'users': [serialize_user(user1, ROOM_MEMBER), serialize_user(user2, ROOM_MEMBER)],
             'features': {
                 'chat': True,
                 'movie_theater': True,  # Available for all users
                 'date_planning': True,
-                'ai_assistant': user1.ai_assistant_enabled or user2.ai_assistant_enabled,
-                'video_chat': user1.subscription_plan == 'premium' or user2.subscription_plan == 'premium'
+                'ai_assistant': bool((user1.ai_assistant_enabled and plan1.allows('ai_assistant')) or
+                                     (user2.ai_assistant_enabled and plan2.allows('ai_assistant'))),
+                'video_chat': plan1.allows('video_chat') or plan2.allows('video_chat')
             }
         }), 200
 
@@ -189,10 +363,10 @@ def ai_analyze_conversation(match_id):
     """Analyze conversation with AI for safety and suggestions"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = profile_cache.get(current_user_id)
         
-        # Check if user has premium subscription
-        if current_user.subscription_plan not in ['standard', 'premium']:
+        # Check if user's plan includes the AI assistant
+        if not current_entitlements().allows('ai_assistant'):
             return jsonify({'error': 'AI-Assistent ist nur für Premium-Nutzer verfügbar'}), 403
         
         # Check if AI is enabled for this user
@@ -246,10 +420,10 @@ def ai_get_suggestions(match_id):
     """Get quick response suggestions from AI"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = profile_cache.get(current_user_id)
         
         # Check subscription
-        if current_user.subscription_plan not in ['standard', 'premium']:
+        if not current_entitlements().allows('ai_assistant'):
             return jsonify({'suggestions': []}), 200
         
         if not current_user.ai_assistant_enabled:
@@ -289,7 +463,7 @@ def ai_chat(match_id):
     """Chat directly with AI assistant about the conversation"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = profile_cache.get(current_user_id)
         data = request.get_json()
         
         user_message = data.get('message', '')
@@ -297,7 +471,7 @@ def ai_chat(match_id):
             return jsonify({'error': 'Nachricht erforderlich'}), 400
         
         # Check subscription
-        if current_user.subscription_plan not in ['standard', 'premium']:
+        if not current_entitlements().allows('ai_assistant'):
             return jsonify({'error': 'AI-Assistent ist nur für Premium-Nutzer verfügbar'}), 403
         
         if not current_user.ai_assistant_enabled:
@@ -351,9 +525,9 @@ def ai_get_icebreaker(match_id):
     """Get conversation starters based on partner profile"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = profile_cache.get(current_user_id)
         
-        if current_user.subscription_plan not in ['standard', 'premium']:
+        if not current_entitlements().allows('ai_assistant'):
             return jsonify({'icebreakers': []}), 200
         
         # Verify match
@@ -400,12 +574,13 @@ def toggle_ai_assistant():
         data = request.get_json()
         
         # Check subscription
-        if current_user.subscription_plan not in ['standard', 'premium']:
+        if not current_entitlements().allows('ai_assistant'):
             return jsonify({'error': 'AI-Assistent ist nur für Premium-Nutzer verfügbar'}), 403
         
         enabled = data.get('enabled', False)
         current_user.ai_assistant_enabled = enabled
         db.session.commit()
+        invalidate_user(current_user_id)
         
         return jsonify({
             'message': 'AI-Assistent aktiviert' if enabled else 'AI-Assistent deaktiviert',
@@ -423,16 +598,14 @@ def get_ai_status():
     """Get AI assistant status and availability"""
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        # Premium plans that can use AI
-        premium_plans = ['standard', 'premium', 'vip', 'basic']
+        current_user = profile_cache.get(current_user_id)
+        user_entitlements = current_entitlements()
         
         return jsonify({
             'ai_available': ai_assistant.is_available(),
             'ai_enabled': current_user.ai_assistant_enabled,
             'subscription_plan': current_user.subscription_plan,
-            'can_use_ai': current_user.subscription_plan in premium_plans
+            'can_use_ai': user_entitlements.allows('ai_assistant')
         }), 200
         
     except Exception as e:
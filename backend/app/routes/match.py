@@ -1,90 +1,262 @@
 # match.py
 # API routes for match
 
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes import match_bp
 from app.models import User, Match, db
-from sqlalchemy import and_, or_, not_
-import json
+from app.services.discovery import discovery_index, viewer_profile
+from app.services.discovery_feed import discovery_feed
+from app.services.geo import distance_km
+from app.services.serializers import serialize_user, CANDIDATE_PREVIEW, USER_PREVIEW, LIKE_PREVIEW
+from sqlalchemy import and_, or_, case, bindparam, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only, undefer_group
+from datetime import datetime, timedelta, timezone
+import base64
+import uuid
+
+# Default and maximum number of users per discovery page
+DISCOVER_PAGE_SIZE = 50
+DISCOVER_MAX_PAGE_SIZE = 100
+
+# Columns of the user preview shown in discovery and listings; everything
+# else (deferred groups included) stays in the database
+PREVIEW_COLUMNS = (
+    User.id, User.username, User.first_name, User.last_name, User.age, User.gender,
+    User.city, User.bio, User.photos, User.goal, User.trust_score, User.last_active,
+    User.is_service_provider, User.service_verified, User.hourly_rate
+)
+CANDIDATE_COLUMNS = PREVIEW_COLUMNS + (User.latitude, User.longitude)
+
+
+def _serialize_candidate(user, viewer=None):
+    """Serialize a discovery candidate (preview only)"""
+    return {**serialize_user(user, CANDIDATE_PREVIEW), 'distance_km': _rounded_distance(viewer, user)}
+
+
+def _rounded_distance(viewer, user):
+    if viewer is None:
+        return None
+    distance = distance_km(viewer.latitude, viewer.longitude, user.latitude, user.longitude)
+    return round(distance, 1) if distance is not None else None
+
+
+def _load_candidates(viewer, params, exclude, limit):
+    """Pick up to `limit` unseen candidates from the discovery index, best match first, and serialize them"""
+    current_user_id = viewer.id
+    goal, gender, age_min, age_max, order = params
+    exclude = set(exclude)
+    loaded = []
+
+    while len(loaded) < limit:
+        wanted = limit - len(loaded)
+        candidate_ids = discovery_index.pick(
+            viewer,
+            goal,
+            gender=gender,
+            age_min=age_min,
+            age_max=age_max,
+            exclude=exclude,
+            limit=wanted,
+            order=order
+        )
+        if not candidate_ids:
+            break
+        exclude.update(candidate_ids)
+
+        # Other workers may have recorded swipes this index has not seen yet;
+        # re-checking only the picked ids keeps this independent of history size
+        swiped = db.session.query(Match.receiver_id).filter(
+            Match.sender_id == current_user_id,
+            Match.receiver_id.in_(candidate_ids)
+        ).all()
+        for (receiver_id,) in swiped:
+            discovery_index.mark_seen(current_user_id, receiver_id)
+        swiped_ids = {receiver_id for (receiver_id,) in swiped}
+
+        users_by_id = {
+            user.id: user for user in User.query.filter(
+                User.id.in_([cid for cid in candidate_ids if cid not in swiped_ids]),
+                User.is_active == True,
+                User.is_banned == False
+            ).options(load_only(*CANDIDATE_COLUMNS)).all()
+        }
+        loaded.extend(_serialize_candidate(users_by_id[cid], viewer) for cid in candidate_ids if cid in users_by_id)
+
+        if len(candidate_ids) < wanted:
+            break
+
+    return loaded
+
 
 @match_bp.route('/discover', methods=['GET'])
 @jwt_required()
 def discover():
-    """Get potential matches for the current user"""
+    """
+    Get potential matches for the current user
+
+    Query params:
+    - category: goal to browse (defaults to the user's own goal)
+    - cursor: feed token from a previous response to continue the same feed
+    - limit: page size (default 50, max 100)
+    - sort: 'distance' for nearest first (default: best match first)
+
+    If the user has a location and max_distance, only candidates within
+    that radius are returned.
+    """
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        # Interests and languages (profile group) feed the compatibility score
+        current_user = User.query.options(undefer_group('profile')).get(current_user_id)
 
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
 
         # Get category filter from query params (optional)
         category = request.args.get('category')
-
-        # Get users that current user has already liked or passed
-        existing_interactions = db.session.query(Match.receiver_id).filter(
-            Match.sender_id == current_user_id
-        ).all()
-        excluded_ids = [interaction[0] for interaction in existing_interactions]
-        excluded_ids.append(current_user_id)  # Exclude self
-
-        # Build query for potential matches
-        query = User.query.filter(
-            not_(User.id.in_(excluded_ids)),
-            User.is_active == True,
-            User.is_banned == False
-        )
+        cursor = request.args.get('cursor')
+        limit = min(max(request.args.get('limit', DISCOVER_PAGE_SIZE, type=int), 1), DISCOVER_MAX_PAGE_SIZE)
 
         # Filter by category if provided, otherwise use user's own goal
-        if category:
-            query = query.filter(User.goal == category)
-        else:
-            query = query.filter(User.goal == current_user.goal)
+        goal = category or current_user.goal
 
         # Filter by gender preference
-        if current_user.looking_for_gender and current_user.looking_for_gender != 'both':
-            query = query.filter(User.gender == current_user.looking_for_gender)
-
-        # Filter by age range
-        if current_user.age_min:
-            query = query.filter(User.age >= current_user.age_min)
-        if current_user.age_max:
-            query = query.filter(User.age <= current_user.age_max)
-
-        # Get all potential matches
-        potential_matches = query.limit(50).all()
-
-        # Serialize users
-        users = []
-        for user in potential_matches:
-            # Only include first photo for preview to reduce payload size
-            photos_array = json.loads(user.photos) if user.photos else []
-            first_photo = [photos_array[0]] if photos_array else []
-
-            users.append({
-                'id': user.id,
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'age': user.age,
-                'gender': user.gender,
-                'city': user.city,
-                'bio': user.bio,
-                'photos': first_photo,  # Only first photo for preview
-                'goal': user.goal,
-                'trust_score': user.trust_score,
-                'is_service_provider': user.is_service_provider,
-                'service_verified': user.service_verified,
-                'hourly_rate': user.hourly_rate if user.is_service_provider else None
-            })
+        gender = current_user.looking_for_gender
+        if gender == 'both':
+            gender = None
+
+        order = 'distance' if request.args.get('sort') == 'distance' else 'score'
+        params = (goal, gender, current_user.age_min, current_user.age_max, order)
+        viewer = viewer_profile(current_user)
 
-        return jsonify({'users': users, 'count': len(users)}), 200
+        # Continue an existing feed, or start a new one if the cursor is
+        # unknown (expired, or issued by another worker process)
+        feed = discovery_feed.get(cursor, current_user_id, params) if cursor else None
+        if feed is None:
+            feed = discovery_feed.open(current_user_id, params)
+
+        def load(exclude, count):
+            return _load_candidates(viewer, params, exclude, count)
+
+        users = discovery_feed.next_page(feed, load, limit)
+
+        # Prefetch the next page while the client swipes through this one
+        app = current_app._get_current_object()
+
+        def load_in_background(exclude, count):
+            with app.app_context():
+                return _load_candidates(viewer, params, exclude, count)
+
+        socketio = current_app.extensions['socketio']
+        discovery_feed.prefetch(feed, load_in_background, limit, socketio.start_background_task)
+
+        has_more = discovery_feed.has_more(feed)
+        if not has_more:
+            discovery_feed.close(feed.token)
+
+        return jsonify({
+            'users': users,
+            'count': len(users),
+            'next_cursor': feed.token if has_more else None
+        }), 200
 
     except Exception as e:
         return jsonify({'error': f'Failed to fetch matches: {str(e)}'}), 500
 
 
+def _record_likes(sender_id, receiver_ids):
+    """
+    Insert likes from one sender and resolve mutual matches atomically, with
+    one set-based statement for any number of receivers.
+
+    Returns {receiver_id: (match_id, status)} for the new rows; receivers
+    that do not exist or that the sender already swiped on are left out.
+
+    Reverse likes are flipped to 'matched' and the new rows are inserted
+    with the right status in the same statement. On PostgreSQL the pairs
+    are serialized with transaction-scoped advisory locks sent in the same
+    round trip, so two users liking each other at the same moment cannot
+    both miss the match; the locks are taken in sorted key order, so two
+    batches over the same pairs in a different order cannot deadlock.
+    SQLite serializes writers on its own. The unique (sender_id,
+    receiver_id) constraint turns duplicate likes into no-ops.
+
+    updated_at is taken from the database clock once the locks are held,
+    so the order of the timestamps follows the order the pairs were
+    written in, whichever worker wrote them (see _listing_page).
+    """
+    if not receiver_ids:
+        return {}
+
+    matches_table = Match.__table__.fullname
+    users_table = User.__table__.fullname
+    params = {'sender': sender_id}
+    values = []
+    for i, receiver_id in enumerate(receiver_ids):
+        params[f'id{i}'] = str(uuid.uuid4())
+        params[f'receiver{i}'] = receiver_id
+        values.append(f'(:id{i}, :receiver{i})')
+    batch = f"batch (id, receiver_id) AS (VALUES {', '.join(values)})"
+
+    if db.engine.dialect.name == 'postgresql':
+        params['pairs'] = ['|'.join(sorted((sender_id, receiver_id))) for receiver_id in receiver_ids]
+        rows = db.session.execute(text(f"""
+            SELECT pg_advisory_xact_lock(key)
+            FROM (SELECT DISTINCT hashtext(pair) AS key FROM unnest(CAST(:pairs AS text[])) AS pair ORDER BY key) AS keys;
+            WITH {batch}, clock AS (
+                SELECT clock_timestamp() AT TIME ZONE 'UTC' AS now
+            ), fresh AS (
+                SELECT batch.id, batch.receiver_id FROM batch
+                WHERE EXISTS (SELECT 1 FROM {users_table} WHERE id = batch.receiver_id)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {matches_table} WHERE sender_id = :sender AND receiver_id = batch.receiver_id
+                  )
+            ), reverse AS (
+                UPDATE {matches_table} SET status = 'matched', updated_at = (SELECT now FROM clock)
+                WHERE receiver_id = :sender AND status = 'liked'
+                  AND sender_id IN (SELECT receiver_id FROM fresh)
+                RETURNING sender_id
+            )
+            INSERT INTO {matches_table} (id, sender_id, receiver_id, status, created_at, updated_at)
+            SELECT fresh.id, :sender, fresh.receiver_id,
+                   CASE WHEN fresh.receiver_id IN (SELECT sender_id FROM reverse) THEN 'matched' ELSE 'liked' END,
+                   clock.now, clock.now
+            FROM fresh, clock
+            ON CONFLICT (sender_id, receiver_id) DO NOTHING
+            RETURNING receiver_id, id, status, updated_at
+        """), params).all()
+    else:
+        # SQLite has no data-modifying CTEs; the INSERT takes the write lock,
+        # so the follow-up UPDATE still runs before any competing like. The
+        # clock is written in SQLAlchemy's text format for SQLite datetimes.
+        rows = db.session.execute(text(f"""
+            WITH {batch}, clock (now) AS (
+                SELECT strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'
+            )
+            INSERT INTO {matches_table} (id, sender_id, receiver_id, status, created_at, updated_at)
+            SELECT batch.id, :sender, batch.receiver_id,
+                   CASE WHEN EXISTS (
+                       SELECT 1 FROM {matches_table}
+                       WHERE sender_id = batch.receiver_id AND receiver_id = :sender AND status = 'liked'
+                   ) THEN 'matched' ELSE 'liked' END, clock.now, clock.now
+            FROM batch, clock
+            WHERE EXISTS (SELECT 1 FROM {users_table} WHERE id = batch.receiver_id)
+            ON CONFLICT (sender_id, receiver_id) DO NOTHING
+            RETURNING receiver_id, id, status, updated_at
+        """), params).all()
+        matched = [row.receiver_id for row in rows if row.status == 'matched']
+        if matched:
+            db.session.execute(text(f"""
+                UPDATE {matches_table} SET status = 'matched', updated_at = :now
+                WHERE receiver_id = :sender AND status = 'liked' AND sender_id IN :matched
+            """).bindparams(bindparam('matched', expanding=True)),
+                {'sender': sender_id, 'now': rows[0].updated_at, 'matched': matched})
+
+    return {row.receiver_id: (row.id, row.status) for row in rows}
+
+
 @match_bp.route('/like', methods=['POST'])
 @jwt_required()
 def like_user():
@@ -98,48 +270,27 @@ def like_user():
 
         receiver_id = data['user_id']
 
-        # Check if user exists
-        receiver = User.query.get(receiver_id)
-        if not receiver:
-            return jsonify({'error': 'User not found'}), 404
+        if receiver_id == current_user_id:
+            return jsonify({'error': 'Cannot like yourself'}), 400
 
-        # Check if already liked
-        existing_match = Match.query.filter_by(
-            sender_id=current_user_id,
-            receiver_id=receiver_id
-        ).first()
+        # Insert the like and resolve a mutual match in one atomic step
+        result = _record_likes(current_user_id, [receiver_id]).get(receiver_id)
+        db.session.commit()
 
-        if existing_match:
+        if result is None:
+            # Nothing inserted: find out why (rare path, not worth a round trip up front)
+            if not db.session.query(User.id).filter_by(id=receiver_id).first():
+                return jsonify({'error': 'User not found'}), 404
+            discovery_index.mark_seen(current_user_id, receiver_id)
             return jsonify({'error': 'Already liked this user'}), 400
 
-        # Create new match
-        new_match = Match(
-            sender_id=current_user_id,
-            receiver_id=receiver_id,
-            status='liked'
-        )
-        db.session.add(new_match)
-
-        # Check if it's a mutual match
-        reverse_match = Match.query.filter_by(
-            sender_id=receiver_id,
-            receiver_id=current_user_id,
-            status='liked'
-        ).first()
-
-        is_mutual = False
-        if reverse_match:
-            # Update both matches to 'matched'
-            new_match.status = 'matched'
-            reverse_match.status = 'matched'
-            is_mutual = True
-
-        db.session.commit()
+        match_id, status = result
+        discovery_index.mark_seen(current_user_id, receiver_id)
 
         return jsonify({
             'message': 'User liked successfully',
-            'is_match': is_mutual,
-            'match_id': new_match.id
+            'is_match': status == 'matched',
+            'match_id': match_id
         }), 200
 
     except Exception as e:
@@ -177,6 +328,7 @@ def pass_user():
         )
         db.session.add(new_match)
         db.session.commit()
+        discovery_index.mark_seen(current_user_id, receiver_id)
 
         return jsonify({'message': 'User passed'}), 200
 
@@ -185,53 +337,226 @@ def pass_user():
         return jsonify({'error': f'Failed to pass user: {str(e)}'}), 500
 
 
+# Maximum number of swipes accepted in one batch
+MAX_SWIPE_BATCH = 200
+
+
+@match_bp.route('/swipes', methods=['POST'])
+@jwt_required()
+def batch_swipes():
+    """
+    Record an ordered batch of likes and passes in a single transaction
+
+    Body: {'swipes': [{'user_id': '...', 'action': 'like' | 'pass'}, ...]}
+
+    Target users are resolved with one query, passes are bulk inserted
+    with one statement and likes go through _record_likes, the same atomic
+    statement as /like, which resolves mutual matches for the whole batch
+    at once. A like here and a like from the other user (through either
+    endpoint) cannot both miss the match. Swipes that lost a race
+    to an identical one are reported as duplicates.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        swipes = data.get('swipes')
+
+        if not isinstance(swipes, list) or not swipes:
+            return jsonify({'error': 'swipes must be a non-empty list'}), 400
+        if len(swipes) > MAX_SWIPE_BATCH:
+            return jsonify({'error': f'At most {MAX_SWIPE_BATCH} swipes per batch'}), 400
+
+        # Validate and keep the first swipe per target, in client order
+        ordered = []
+        statuses = {}
+        for swipe in swipes:
+            if not isinstance(swipe, dict) or not swipe.get('user_id') or swipe.get('action') not in ('like', 'pass'):
+                return jsonify({'error': 'Each swipe needs user_id and action (like or pass)'}), 400
+            target_id = swipe['user_id']
+            if target_id == current_user_id or target_id in statuses:
+                continue
+            statuses[target_id] = None
+            ordered.append((target_id, swipe['action']))
+
+        target_ids = [target_id for target_id, _ in ordered]
+
+        existing_users = {user_id for (user_id,) in db.session.query(User.id).filter(
+            User.id.in_(target_ids)
+        ).all()}
+
+        # Passes: one insert; rows already there (swiped before, or by a
+        # concurrent request) are skipped by the unique constraint
+        now = datetime.utcnow()
+        pass_rows = [{
+            'id': str(uuid.uuid4()),
+            'sender_id': current_user_id,
+            'receiver_id': target_id,
+            'status': 'passed',
+            'created_at': now,
+            'updated_at': now
+        } for target_id, action in ordered if action == 'pass' and target_id in existing_users]
+        passed = {}
+        if pass_rows:
+            dialect_insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+            statement = dialect_insert(Match).values(pass_rows).on_conflict_do_nothing(
+                index_elements=['sender_id', 'receiver_id']
+            ).returning(Match.receiver_id, Match.id)
+            passed = dict(db.session.execute(statement).all())
+
+        # Likes: one set-based statement that also resolves mutual matches
+        liked = _record_likes(current_user_id, [target_id for target_id, action in ordered
+                                                if action == 'like' and target_id in existing_users])
+
+        results = []
+        for target_id, action in ordered:
+            result = {'user_id': target_id, 'action': action, 'is_match': False, 'match_id': None}
+
+            if target_id not in existing_users:
+                result['status'] = 'not_found'
+            else:
+                recorded = liked.get(target_id) if action == 'like' else (
+                    (passed[target_id], 'passed') if target_id in passed else None)
+                if recorded is None:
+                    result['status'] = 'duplicate'
+                else:
+                    result['match_id'], status = recorded
+                    result['is_match'] = status == 'matched'
+                    result['status'] = 'recorded'
+
+            results.append(result)
+
+        db.session.commit()
+
+        recorded = [result['user_id'] for result in results if result['status'] == 'recorded']
+        for target_id in recorded:
+            discovery_index.mark_seen(current_user_id, target_id)
+
+        return jsonify({
+            'results': results,
+            'recorded': len(recorded),
+            'matches': [result['user_id'] for result in results if result['is_match']]
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to record swipes: {str(e)}'}), 500
+
+
+# Default and maximum page size for match and like listings
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
+
+# Delta syncs re-read this much before the sync token: a row can commit
+# after a later one was handed out, or carry a timestamp from a worker whose
+# clock runs slightly behind. Clients dedupe by match_id.
+DELTA_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _encode_cursor(match):
+    raw = f'{match.updated_at.isoformat()}|{match.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    timestamp, match_id = raw.split('|', 1)
+    return datetime.fromisoformat(timestamp), match_id
+
+
+def _parse_timestamp(value):
+    """Parse an ISO timestamp into a naive UTC datetime (as stored in the database)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _listing_page(query, status_filter, delta_filter=None):
+    """
+    Apply cursor paging or delta sync to a (Match, User) listing query.
+
+    Query params:
+    - limit: page size (default 50, max 500)
+    - cursor: next_cursor from the previous page
+    - updated_since: sync_token from the last sync; only rows changed since
+      then (less DELTA_SYNC_OVERLAP) are returned, oldest change first
+
+    Without any of these the full list is returned, as before.
+
+    Returns (rows, meta) where meta holds next_cursor and sync_token for
+    the response. Rows may repeat across syncs; clients dedupe by match_id.
+    """
+    cursor = request.args.get('cursor')
+    updated_since = request.args.get('updated_since')
+    limit = request.args.get('limit', type=int)
+
+    if not (cursor or updated_since or limit):
+        return query.filter(status_filter).all(), {}
+
+    limit = min(max(limit or LIST_PAGE_SIZE, 1), LIST_MAX_PAGE_SIZE)
+    key = tuple_(Match.updated_at, Match.id)
+
+    if updated_since:
+        since = _parse_timestamp(updated_since)
+        query = query.filter(Match.updated_at > since - DELTA_SYNC_OVERLAP)
+        if delta_filter is not None:
+            query = query.filter(delta_filter)
+        if cursor:
+            query = query.filter(key > tuple_(*_decode_cursor(cursor)))
+        query = query.order_by(Match.updated_at.asc(), Match.id.asc())
+    else:
+        query = query.filter(status_filter)
+        if cursor:
+            query = query.filter(key < tuple_(*_decode_cursor(cursor)))
+        query = query.order_by(Match.updated_at.desc(), Match.id.desc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    meta = {'next_cursor': _encode_cursor(rows[-1][0]) if has_more else None}
+    if updated_since:
+        # Only hand out a new sync point once the delta has been read completely
+        if not has_more:
+            meta['sync_token'] = rows[-1][0].updated_at.isoformat() if rows else since.isoformat()
+    elif not cursor:
+        meta['sync_token'] = rows[0][0].updated_at.isoformat() if rows else datetime.utcnow().isoformat()
+
+    return rows, meta
+
+
 @match_bp.route('/matches', methods=['GET'])
 @jwt_required()
 def get_matches():
-    """Get all matched users (mutual likes)"""
+    """Get matched users (mutual likes); supports paging and delta sync, see _listing_page"""
     try:
         current_user_id = get_jwt_identity()
 
-        # Get all mutual matches
-        matches = Match.query.filter(
-            or_(
-                and_(Match.sender_id == current_user_id, Match.status == 'matched'),
-                and_(Match.receiver_id == current_user_id, Match.status == 'matched')
-            )
-        ).all()
+        # The other user of each match, loaded in the same query
+        other_user_id = case(
+            (Match.sender_id == current_user_id, Match.receiver_id),
+            else_=Match.sender_id
+        )
+
+        query = db.session.query(Match, User).join(User, User.id == other_user_id).filter(
+            or_(Match.sender_id == current_user_id, Match.receiver_id == current_user_id)
+        ).options(load_only(*PREVIEW_COLUMNS))
+
+        rows, meta = _listing_page(query, Match.status == 'matched', delta_filter=Match.status == 'matched')
 
         # Get matched user details
         matched_users = []
-        for match in matches:
-            # Determine the other user
-            other_user_id = match.receiver_id if match.sender_id == current_user_id else match.sender_id
-            user = User.query.get(other_user_id)
-
-            if user:
-                # Only include first photo for preview
-                photos_array = json.loads(user.photos) if user.photos else []
-                first_photo = [photos_array[0]] if photos_array else []
-
-                matched_users.append({
-                    'match_id': match.id,
-                    'matched_at': match.created_at.isoformat(),
-                    'user': {
-                        'id': user.id,
-                        'username': user.username,
-                        'first_name': user.first_name,
-                        'last_name': user.last_name,
-                        'age': user.age,
-                        'gender': user.gender,
-                        'city': user.city,
-                        'bio': user.bio,
-                        'photos': first_photo,  # Only first photo
-                        'trust_score': user.trust_score,
-                        'last_active': user.last_active.isoformat() if user.last_active else None
-                    }
-                })
-
-        return jsonify({'matches': matched_users, 'count': len(matched_users)}), 200
+        for match, user in rows:
+            matched_users.append({
+                'match_id': match.id,
+                'matched_at': match.created_at.isoformat(),
+                'user': serialize_user(user, USER_PREVIEW)
+            })
 
+        return jsonify({'matches': matched_users, 'count': len(matched_users), **meta}), 200
+
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or updated_since'}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to fetch matches: {str(e)}'}), 500
 
@@ -239,47 +564,42 @@ def get_matches():
 @match_bp.route('/likes/incoming', methods=['GET'])
 @jwt_required()
 def get_incoming_likes():
-    """Get users who liked you (incoming likes that are not matched yet)"""
+    """
+    Get users who liked you (incoming likes that are not matched yet)
+    Supports paging and delta sync, see _listing_page
+    """
     try:
         current_user_id = get_jwt_identity()
 
         # Get all incoming likes (where current user is receiver and status is 'liked')
-        incoming_likes = Match.query.filter_by(
-            receiver_id=current_user_id,
-            status='liked'
-        ).all()
+        # together with the sender's preview columns
+        query = db.session.query(Match, User).join(User, User.id == Match.sender_id).filter(
+            Match.receiver_id == current_user_id
+        ).options(load_only(*PREVIEW_COLUMNS))
+
+        # In delta mode likes that turned into matches are reported as removed;
+        # passes were never likes, so they are left out of the delta entirely
+        rows, meta = _listing_page(query, Match.status == 'liked',
+                                   delta_filter=Match.status.in_(('liked', 'matched')))
 
-        # Get user details for each incoming like
         likes = []
-        for match in incoming_likes:
-            user = User.query.get(match.sender_id)
-            if user:
-                # Only include first photo for preview
-                photos_array = json.loads(user.photos) if user.photos else []
-                first_photo = [photos_array[0]] if photos_array else []
-
-                likes.append({
-                    'match_id': match.id,
-                    'liked_at': match.created_at.isoformat(),
-                    'user': {
-                        'id': user.id,
-                        'username': user.username,
-                        'first_name': user.first_name,
-                        'last_name': user.last_name,
-                        'age': user.age,
-                        'gender': user.gender,
-                        'city': user.city,
-                        'bio': user.bio,
-                        'photos': first_photo,  # Only first photo
-                        'goal': user.goal,
-                        'trust_score': user.trust_score,
-                        'is_service_provider': user.is_service_provider,
-                        'service_verified': user.service_verified,
-                        'hourly_rate': user.hourly_rate if user.is_service_provider else None
-                    }
-                })
-
-        return jsonify({'likes': likes, 'count': len(likes)}), 200
+        removed = []
+        for match, user in rows:
+            if match.status != 'liked':
+                removed.append(match.id)
+                continue
+            likes.append({
+                'match_id': match.id,
+                'liked_at': match.created_at.isoformat(),
+                'user': serialize_user(user, LIKE_PREVIEW)
+            })
+
+        response = {'likes': likes, 'count': len(likes), **meta}
+        if request.args.get('updated_since'):
+            response['removed'] = removed
+        return jsonify(response), 200
 
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or updated_since'}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to fetch incoming likes: {str(e)}'}), 500
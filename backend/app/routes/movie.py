@@ -1,13 +1,55 @@
 # movie.py
-# API routes for movie sessions
+# API routes for movie sessions. Playback state lives in the session clocks
+# (app/services/session_clock.py); changes are pushed to the match room as
+# `movie_state` events and written to the database only on transitions.
 
 from flask import request, jsonify, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import db, User, Match, MovieSession
-from datetime import datetime
+from app.events import emit_to_match
+from app.services.session_clock import session_clocks, PLAY_LEAD_SECONDS
 
 movie_bp = Blueprint('movie', __name__)
 
+
+def session_state(match_id, session):
+    """Live playback state of a session, as pushed in `movie_state` events"""
+    return {
+        'match_id': match_id,
+        'movie_title': session.movie_title,
+        'movie_url': session.movie_url,
+        **session_clocks.get(session).to_dict()
+    }
+
+
+def broadcast_state(match_id, session):
+    """Push the live playback state to both users in the match room"""
+    emit_to_match(match_id, 'movie_state', session_state(match_id, session))
+
+
+def change_session(match_id, session, status=None, position=None, details=None):
+    """
+    Apply play/pause/seek/end and movie details to a session. A position
+    close to the live clock is a heartbeat and changes nothing. Commits and
+    broadcasts only real changes; returns the live state.
+    """
+    details = details or {}
+    for key, value in details.items():
+        setattr(session, key, value)
+
+    change = session_clocks.update(session, status=status,
+                                   position=float(position) if position is not None else None,
+                                   lead=PLAY_LEAD_SECONDS)
+    if change or details:
+        db.session.commit()
+    if change == 'transition' or details:
+        broadcast_state(match_id, session)
+
+    state = session_clocks.get(session).to_dict()
+    if state['status'] == 'ended':
+        session_clocks.forget(session.id)
+    return state
+
 @movie_bp.route('/<match_id>/session', methods=['GET'])
 @jwt_required()
 def get_movie_session(match_id):
@@ -31,14 +73,20 @@ def get_movie_session(match_id):
         if not session:
             return jsonify({'session': None}), 200
 
+        # Live position from the clock; server_time lets clients extrapolate
+        state = session_clocks.get(session).to_dict()
+
         return jsonify({
             'session': {
                 'id': session.id,
                 'movie_title': session.movie_title,
                 'movie_url': session.movie_url,
                 'movie_thumbnail': session.movie_thumbnail,
-                'status': session.status,
-                'current_time': session.current_time,
+                'status': state['status'],
+                'current_time': state['current_time'],
+                'position': state['position'],
+                'play_at': state['play_at'],
+                'server_time': state['server_time'],
                 'started_by': session.started_by,
                 'started_at': session.started_at.isoformat() if session.started_at else None,
                 'created_at': session.created_at.isoformat()
@@ -79,6 +127,7 @@ def create_movie_session(match_id):
 
         db.session.add(session)
         db.session.commit()
+        broadcast_state(match_id, session)
 
         return jsonify({
             'message': 'Movie session created',
@@ -119,41 +168,27 @@ def update_movie_session(match_id, session_id):
         if not session:
             return jsonify({'error': 'Session not found'}), 404
 
-        # Update fields
-        if 'status' in data:
-            session.status = data['status']
-            if data['status'] == 'playing' and not session.started_at:
-                session.started_at = datetime.utcnow()
-            elif data['status'] == 'ended':
-                session.ended_at = datetime.utcnow()
-
-        if 'current_time' in data:
-            session.current_time = data['current_time']
-
-        if 'movie_title' in data:
-            session.movie_title = data['movie_title']
-
-        if 'movie_url' in data:
-            session.movie_url = data['movie_url']
-
-        if 'movie_thumbnail' in data:
-            session.movie_thumbnail = data['movie_thumbnail']
-
-        session.updated_at = datetime.utcnow()
-        db.session.commit()
+        # Play, pause, seek or end, and movie details
+        details = {key: data[key] for key in ('movie_title', 'movie_url', 'movie_thumbnail') if key in data}
+        state = change_session(match_id, session, status=data.get('status'),
+                               position=data.get('current_time'), details=details)
 
         return jsonify({
             'message': 'Session updated',
             'session': {
                 'id': session.id,
-                'status': session.status,
-                'current_time': session.current_time,
+                'status': state['status'],
+                'current_time': state['current_time'],
+                'position': state['position'],
+                'play_at': state['play_at'],
+                'server_time': state['server_time'],
                 'updated_at': session.updated_at.isoformat()
             }
         }), 200
 
     except Exception as e:
         db.session.rollback()
+        session_clocks.forget(session_id)
         return jsonify({'error': f'Failed to update session: {str(e)}'}), 500
 
 
@@ -180,12 +215,11 @@ def delete_movie_session(match_id, session_id):
         if not session:
             return jsonify({'error': 'Session not found'}), 404
 
-        session.status = 'ended'
-        session.ended_at = datetime.utcnow()
-        db.session.commit()
+        change_session(match_id, session, status='ended')
 
         return jsonify({'message': 'Session ended'}), 200
 
     except Exception as e:
         db.session.rollback()
+        session_clocks.forget(session_id)
         return jsonify({'error': f'Failed to end session: {str(e)}'}), 500
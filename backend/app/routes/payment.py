@@ -5,6 +5,9 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes import payment_bp
 from app.models import db, User, Booking
+from app.services.profile_cache import profile_cache, invalidate_user
+from app.services.entitlements import entitlements
+from app.services.auth_claims import revoke_claims
 from datetime import datetime
 from sqlalchemy import or_, and_
 
@@ -54,6 +57,7 @@ def setup_stripe_account():
                 user.business_name = account.business_profile.name
 
             db.session.commit()
+            invalidate_user(user.id)
 
             return jsonify({
                 'message': 'Stripe account connected successfully',
@@ -79,7 +83,7 @@ def get_provider_stats():
     """Get statistics for service provider"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = profile_cache.get(current_user_id)
 
         if not user or not user.is_service_provider:
             return jsonify({'error': 'Only service providers can view stats'}), 403
@@ -97,7 +101,7 @@ def get_provider_stats():
         recent_bookings = sorted(bookings, key=lambda x: x.created_at, reverse=True)[:10]
         recent_bookings_data = []
         for booking in recent_bookings:
-            client = User.query.get(booking.client_id)
+            client = profile_cache.get(booking.client_id)
             recent_bookings_data.append({
                 'id': booking.id,
                 'client_name': client.username if client else 'Unknown',
@@ -143,8 +147,9 @@ def create_booking():
                 print(f"[CREATE BOOKING] Missing field: {field}")
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
-        # Get provider
-        provider = User.query.get(data['provider_id'])
+        # Get provider. The booking is priced from the row, never from a
+        # cached profile that may predate a rate change on another worker
+        provider = db.session.get(User, data['provider_id'])
         if not provider or not provider.is_service_provider:
             print(f"[CREATE BOOKING] Provider not found or not a service provider")
             return jsonify({'error': 'Provider not found'}), 404
@@ -414,9 +419,9 @@ def get_my_bookings():
             print(f"[GET BOOKINGS] Processing booking {booking.id}: status={booking.status}, payment={booking.payment_status}, amount={booking.total_amount}")
 
             if role == 'client':
-                other_user = User.query.get(booking.provider_id)
+                other_user = profile_cache.get(booking.provider_id)
             else:
-                other_user = User.query.get(booking.client_id)
+                other_user = profile_cache.get(booking.client_id)
 
             bookings_data.append({
                 'id': booking.id,
@@ -521,13 +526,7 @@ STRIPE_PRICES = {
     'vip': os.getenv('STRIPE_PRICE_VIP')
 }
 
-# Plan features mapping
-PLAN_FEATURES = {
-    'free': {'ai_assistant': False, 'unlimited_likes': False, 'priority_support': False},
-    'basic': {'ai_assistant': False, 'unlimited_likes': False, 'priority_support': False},
-    'premium': {'ai_assistant': True, 'unlimited_likes': True, 'priority_support': False},
-    'vip': {'ai_assistant': True, 'unlimited_likes': True, 'priority_support': True}
-}
+# Plan features live in Config.SUBSCRIPTION_PLANS (see app/services/entitlements.py)
 
 
 @payment_bp.route('/create-subscription', methods=['POST'])
@@ -550,9 +549,11 @@ def create_subscription():
             print(f"[SUBSCRIPTION] Test mode - upgrading user to {plan}")
             # Test mode - directly upgrade user
             user.subscription_plan = plan
-            features = PLAN_FEATURES.get(plan, {})
-            user.ai_assistant_enabled = features.get('ai_assistant', False)
+            user.subscription_expires = None
+            user.ai_assistant_enabled = entitlements.features_of(plan)['ai_assistant']
             db.session.commit()
+            invalidate_user(user.id)
+            revoke_claims(user.id)
             
             return jsonify({
                 'success': True,
@@ -627,6 +628,8 @@ def cancel_subscription():
         user.ai_assistant_enabled = False
         user.stripe_subscription_id = None
         db.session.commit()
+        invalidate_user(user.id)
+        revoke_claims(user.id)
         
         return jsonify({
             'success': True,
@@ -665,10 +668,12 @@ def subscription_webhook():
             user = User.query.get(user_id)
             if user:
                 user.subscription_plan = plan
+                user.subscription_expires = None  # Renewals are managed by Stripe
                 user.stripe_subscription_id = subscription_id
-                features = PLAN_FEATURES.get(plan, {})
-                user.ai_assistant_enabled = features.get('ai_assistant', False)
+                user.ai_assistant_enabled = entitlements.features_of(plan)['ai_assistant']
                 db.session.commit()
+                invalidate_user(user.id)
+                revoke_claims(user.id)
                 print(f"[WEBHOOK] User {user_id} upgraded to {plan}")
     
     elif event['type'] == 'customer.subscription.deleted':
@@ -681,6 +686,8 @@ def subscription_webhook():
             user.ai_assistant_enabled = False
             user.stripe_subscription_id = None
             db.session.commit()
+            invalidate_user(user.id)
+            revoke_claims(user.id)
             print(f"[WEBHOOK] User {user.id} subscription cancelled")
     
     return jsonify({'received': True}), 200
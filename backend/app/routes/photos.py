@@ -0,0 +1,56 @@
+# photos.py
+# API routes for profile photos (upload and serving from the photo store)
+
+from flask import request, jsonify, send_file, abort
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.routes import photo_bp
+from app.services.photo_store import photo_store, PHOTO_SIZES, PHOTO_KEY, ORIGINAL, MAX_PHOTO_BYTES
+
+@photo_bp.route('', methods=['POST'])
+@jwt_required()
+def upload_photo():
+    """Upload a photo (multipart field 'photo'); returns its key and URLs"""
+    try:
+        current_user_id = get_jwt_identity()
+        upload = request.files.get('photo')
+
+        if not upload:
+            return jsonify({'error': 'Photo file is required'}), 400
+
+        data = upload.read(MAX_PHOTO_BYTES + 1)
+        try:
+            key = photo_store.save(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        print(f"[PHOTO UPLOAD] User {current_user_id} stored {key}")
+
+        return jsonify({
+            'key': key,
+            'url': photo_store.url(key, 'medium'),
+            'thumbnail_url': photo_store.url(key, 'thumb')
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to upload photo: {str(e)}'}), 500
+
+
+@photo_bp.route('/<size>/<key>', methods=['GET'])
+def get_photo(size, key):
+    """Serve a stored photo rendition; content-addressed, so cacheable forever"""
+    if (size not in PHOTO_SIZES and size != ORIGINAL) or not PHOTO_KEY.match(key):
+        abort(404)
+
+    name = f'{size}/{key}'
+    if not photo_store.backend.exists(name):
+        abort(404)
+
+    response = send_file(photo_store.backend.open(name), mimetype=_mimetype(key),
+                         max_age=31536000, etag=key)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def _mimetype(key):
+    extension = key.rsplit('.', 1)[-1]
+    return 'image/jpeg' if extension == 'jpg' else f'image/{extension}'
@@ -5,8 +5,14 @@
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes import user_bp
+from sqlalchemy.orm import undefer_group
 from app.models import User, Match
 from app import db
+from app.services.discovery import discovery_index
+from app.services.geo import is_valid_coordinate
+from app.services.photo_store import photo_store
+from app.services.serializers import serialize_user, USER_PROFILE
+from app.services.profile_cache import invalidate_user
 import json
 
 @user_bp.route('/profile', methods=['PUT'])
@@ -15,7 +21,7 @@ def update_profile():
     """Update user profile including photos"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = User.query.options(undefer_group('profile')).get(current_user_id)
 
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -43,17 +49,38 @@ def update_profile():
             user.age_min = int(data['age_min'])
         if 'age_max' in data:
             user.age_max = int(data['age_max'])
-
-        # Update photos (stored as JSON array)
+        if 'max_distance' in data:
+            user.max_distance = int(data['max_distance']) if data['max_distance'] else None
+
+        # Update location (used for proximity search in discovery)
+        if 'latitude' in data or 'longitude' in data:
+            latitude, longitude = data.get('latitude'), data.get('longitude')
+            if latitude is None and longitude is None:
+                user.latitude = user.longitude = None
+            elif is_valid_coordinate(latitude, longitude):
+                user.latitude, user.longitude = float(latitude), float(longitude)
+            else:
+                return jsonify({'error': 'Invalid latitude/longitude'}), 400
+
+        # Update photos (stored as JSON array of photo store keys)
         if 'photos' in data:
+            if not isinstance(data['photos'], list):
+                return jsonify({'error': 'Photos must be a list'}), 400
+            try:
+                # Uploaded data URLs go to the photo store, photo URLs map back to their keys
+                photo_keys = photo_store.to_keys(data['photos'])
+            except ValueError as e:
+                return jsonify({'error': f'Invalid photo: {str(e)}'}), 400
             # Convert photos list to JSON string for PostgreSQL
-            user.photos = json.dumps(data['photos']) if isinstance(data['photos'], list) else data['photos']
+            user.photos = json.dumps(photo_keys)
 
         # Update timestamp
         from datetime import datetime
         user.updated_at = datetime.utcnow()
 
         db.session.commit()
+        discovery_index.update_user(user)
+        invalidate_user(user.id)
 
         # Return updated user data
         user_data = {
@@ -69,7 +96,10 @@ def update_profile():
             'looking_for_gender': user.looking_for_gender,
             'age_min': user.age_min,
             'age_max': user.age_max,
-            'photos': json.loads(user.photos) if user.photos else [],
+            'max_distance': user.max_distance,
+            'latitude': user.latitude,
+            'longitude': user.longitude,
+            'photos': photo_store.urls(user.photos, 'medium'),
             'subscription_plan': user.subscription_plan,
             'trust_score': user.trust_score,
         }
@@ -89,7 +119,7 @@ def get_user_profile(user_id):
         current_user_id = get_jwt_identity()
         print(f"[GET USER PROFILE] Current user: {current_user_id}, Requested user: {user_id}")
 
-        user = User.query.get(user_id)
+        user = User.query.options(undefer_group('profile')).get(user_id)
 
         if not user:
             print(f"[GET USER PROFILE] User {user_id} not found")
@@ -104,50 +134,7 @@ def get_user_profile(user_id):
             (Match.status == 'matched')
         ).first()
 
-        # Prepare user data with defaults for None values
-        # Only include first photo to reduce payload size
-        photos_array = json.loads(user.photos) if user.photos else []
-        first_photo = [photos_array[0]] if photos_array else []
-
-        user_data = {
-            'id': user.id,
-            'username': user.username or 'Пользователь',
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'age': user.age or 18,
-            'gender': user.gender,
-            'city': user.city or 'Не указано',
-            'bio': user.bio or '',
-            'photos': photos_array,  # Return all photos for full profile view
-            'subscription_plan': user.subscription_plan or 'free',
-            'trust_score': user.trust_score if user.trust_score is not None else 50,
-            'is_service_provider': user.is_service_provider or False,
-            'hourly_rate': user.hourly_rate,
-            'service_verified': user.service_verified or False,
-            'services_offered': user.services_offered or [],
-            
-            # Extended profile
-            'height': user.height,
-            'weight': user.weight,
-            'body_type': user.body_type,
-            'hair_color': user.hair_color,
-            'eye_color': user.eye_color,
-            'zodiac_sign': user.zodiac_sign,
-            'education': user.education,
-            'occupation': user.occupation,
-            'company': user.company,
-            'languages': user.languages or [],
-            'smoking': user.smoking,
-            'drinking': user.drinking,
-            'children': user.children,
-            'interests': user.interests or [],
-            'relationship_type': user.relationship_type,
-            'goal': user.goal,
-            
-            # Activity
-            'last_active': user.last_active.isoformat() if user.last_active else None,
-            'created_at': user.created_at.isoformat() if user.created_at else None,
-        }
+        user_data = serialize_user(user, USER_PROFILE)
 
         response_data = {
             'user': user_data,
@@ -5,6 +5,8 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes import verification_bp
 from app.models import db, User
+from app.services.profile_cache import profile_cache, invalidate_user
+from app.services.auth_claims import revoke_claims
 from datetime import datetime
 import stripe
 import os
@@ -21,7 +23,7 @@ def get_verification_status():
     """Get current user's verification status"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = profile_cache.get(current_user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -106,6 +108,7 @@ def create_verification_session():
         user.verification_attempts = (user.verification_attempts or 0) + 1
         user.last_verification_attempt = datetime.utcnow()
         db.session.commit()
+        invalidate_user(user.id)
         
         return jsonify({
             'session_id': verification_session.id,
@@ -168,6 +171,8 @@ def check_verification_session(session_id):
                         user.identity_verification_status = 'failed'
                         user.identity_verified = False
                         db.session.commit()
+                        invalidate_user(user.id)
+                        revoke_claims(user.id)
                         return jsonify({
                             'status': 'failed',
                             'reason': 'age_under_18',
@@ -197,6 +202,8 @@ def check_verification_session(session_id):
             user.identity_verification_status = status
         
         db.session.commit()
+        invalidate_user(user.id)
+        revoke_claims(user.id)
         
         return jsonify({
             'session_id': session_id,
@@ -264,6 +271,8 @@ def verification_webhook():
                         user.identity_document_type = report.document.type
                 
                 db.session.commit()
+                invalidate_user(user.id)
+                revoke_claims(user.id)
                 
         elif event_type == 'identity.verification_session.requires_input':
             # User needs to provide more input
@@ -273,6 +282,7 @@ def verification_webhook():
             if user:
                 user.identity_verification_status = 'requires_input'
                 db.session.commit()
+                invalidate_user(user.id)
                 
         elif event_type == 'identity.verification_session.canceled':
             # Verification was cancelled
@@ -282,6 +292,7 @@ def verification_webhook():
             if user:
                 user.identity_verification_status = 'cancelled'
                 db.session.commit()
+                invalidate_user(user.id)
         
         return jsonify({'received': True}), 200
         
@@ -298,7 +309,7 @@ def require_verification_check():
     """
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = profile_cache.get(current_user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
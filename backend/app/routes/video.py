@@ -1,15 +1,14 @@
 # video.py
-# API routes for video calling with WebRTC signaling
+# API routes for video calling with WebRTC signaling. Clients connected over
+# Socket.IO signal through the call_* events in app/events.py; these routes
+# remain for clients without a socket, and relay what they receive to it.
 
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.routes import video_bp
-from app.models import User, Match
-from app import db
-from datetime import datetime
-
-# In-memory storage for WebRTC signaling (in production, use Redis or similar)
-active_calls = {}  # {match_id: {user1_id: {offer/answer/candidates}, user2_id: {...}}}
+from app.models import db
+from app.events import find_member_match, emit_to_match
+from app.services.signaling_store import signaling_store
 
 @video_bp.route('/call/initiate', methods=['POST'])
 @jwt_required()
@@ -23,22 +22,12 @@ def initiate_call():
         if not match_id:
             return jsonify({'error': 'Match ID is required'}), 400
 
-        # Verify match exists
-        match = Match.query.get(match_id)
-        if not match:
-            return jsonify({'error': 'Match not found'}), 404
-
-        # Verify user is part of this match
-        if current_user_id not in [match.user1_id, match.user2_id]:
-            return jsonify({'error': 'Unauthorized'}), 403
+        # Verify the user is part of this match
+        if not find_member_match(match_id, current_user_id):
+            return jsonify({'error': 'Match not found or not authorized'}), 404
 
-        # Initialize call data structure
-        if match_id not in active_calls:
-            active_calls[match_id] = {
-                'initiator': current_user_id,
-                'users': {},
-                'started_at': datetime.utcnow().isoformat()
-            }
+        # Initialize call data (the first caller stays the initiator)
+        signaling_store.start_call(match_id, current_user_id)
 
         return jsonify({
             'message': 'Call initiated',
@@ -64,14 +53,12 @@ def send_offer():
         if not match_id or not offer:
             return jsonify({'error': 'Match ID and offer are required'}), 400
 
-        # Store offer
-        if match_id not in active_calls:
-            active_calls[match_id] = {'users': {}}
+        if not find_member_match(match_id, current_user_id):
+            return jsonify({'error': 'Match not found or not authorized'}), 404
 
-        active_calls[match_id]['users'][current_user_id] = {
-            'offer': offer,
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        # Store offer
+        signaling_store.set_description(match_id, current_user_id, 'offer', offer)
+        emit_to_match(match_id, 'call_offer', {'match_id': match_id, 'user_id': current_user_id, 'offer': offer})
 
         return jsonify({'message': 'Offer sent successfully'}), 200
 
@@ -93,15 +80,12 @@ def send_answer():
         if not match_id or not answer:
             return jsonify({'error': 'Match ID and answer are required'}), 400
 
-        # Store answer
-        if match_id not in active_calls:
-            active_calls[match_id] = {'users': {}}
-
-        if current_user_id not in active_calls[match_id]['users']:
-            active_calls[match_id]['users'][current_user_id] = {}
+        if not find_member_match(match_id, current_user_id):
+            return jsonify({'error': 'Match not found or not authorized'}), 404
 
-        active_calls[match_id]['users'][current_user_id]['answer'] = answer
-        active_calls[match_id]['users'][current_user_id]['timestamp'] = datetime.utcnow().isoformat()
+        # Store answer
+        signaling_store.set_description(match_id, current_user_id, 'answer', answer)
+        emit_to_match(match_id, 'call_answer', {'match_id': match_id, 'user_id': current_user_id, 'answer': answer})
 
         return jsonify({'message': 'Answer sent successfully'}), 200
 
@@ -123,17 +107,12 @@ def send_ice_candidate():
         if not match_id or not candidate:
             return jsonify({'error': 'Match ID and candidate are required'}), 400
 
-        # Store ICE candidate
-        if match_id not in active_calls:
-            active_calls[match_id] = {'users': {}}
+        if not find_member_match(match_id, current_user_id):
+            return jsonify({'error': 'Match not found or not authorized'}), 404
 
-        if current_user_id not in active_calls[match_id]['users']:
-            active_calls[match_id]['users'][current_user_id] = {'ice_candidates': []}
-
-        if 'ice_candidates' not in active_calls[match_id]['users'][current_user_id]:
-            active_calls[match_id]['users'][current_user_id]['ice_candidates'] = []
-
-        active_calls[match_id]['users'][current_user_id]['ice_candidates'].append(candidate)
+        # Store ICE candidate
+        signaling_store.add_candidate(match_id, current_user_id, candidate)
+        emit_to_match(match_id, 'ice_candidate', {'match_id': match_id, 'user_id': current_user_id, 'candidate': candidate})
 
         return jsonify({'message': 'ICE candidate sent successfully'}), 200
 
@@ -144,33 +123,35 @@ def send_ice_candidate():
 @video_bp.route('/call/poll', methods=['GET'])
 @jwt_required()
 def poll_call_data():
-    """Poll for call data (offer, answer, ICE candidates) from other user"""
+    """
+    Poll for call data (offer, answer, ICE candidates) from other user.
+    Pass back the returned last_seq as after_seq to get only what is new,
+    and wait=<seconds> to hold the request until something arrives.
+    """
     try:
         current_user_id = get_jwt_identity()
         match_id = request.args.get('match_id')
+        after_seq = request.args.get('after_seq', 0, type=int)
+        wait = request.args.get('wait', 0, type=float)
 
         if not match_id:
             return jsonify({'error': 'Match ID is required'}), 400
 
         # Get match to find other user
-        match = Match.query.get(match_id)
+        match = find_member_match(match_id, current_user_id)
         if not match:
-            return jsonify({'error': 'Match not found'}), 404
+            return jsonify({'error': 'Match not found or not authorized'}), 404
 
         # Find other user ID
-        other_user_id = match.user2_id if match.user1_id == current_user_id else match.user1_id
-
-        # Get call data
-        call_data = active_calls.get(match_id, {})
-        other_user_data = call_data.get('users', {}).get(other_user_id, {})
+        other_user_id = match.receiver_id if match.sender_id == current_user_id else match.sender_id
 
-        response = {
-            'offer': other_user_data.get('offer'),
-            'answer': other_user_data.get('answer'),
-            'ice_candidates': other_user_data.get('ice_candidates', [])
-        }
-
-        return jsonify(response), 200
+        # Offer, answer and ICE candidates sent by the other user
+        if wait > 0:
+            db.session.close()  # Don't hold a database connection while waiting
+            signals = signaling_store.wait_for_signals(match_id, other_user_id, max(after_seq, 0), wait)
+        else:
+            signals = signaling_store.get_signals(match_id, other_user_id, max(after_seq, 0))
+        return jsonify(signals), 200
 
     except Exception as e:
         return jsonify({'error': f'Failed to poll call data: {str(e)}'}), 500
@@ -188,9 +169,12 @@ def end_call():
         if not match_id:
             return jsonify({'error': 'Match ID is required'}), 400
 
+        if not find_member_match(match_id, current_user_id):
+            return jsonify({'error': 'Match not found or not authorized'}), 404
+
         # Remove call data
-        if match_id in active_calls:
-            del active_calls[match_id]
+        signaling_store.end_call(match_id)
+        emit_to_match(match_id, 'call_hangup', {'match_id': match_id, 'user_id': current_user_id})
 
         return jsonify({'message': 'Call ended successfully'}), 200
 
@@ -203,19 +187,22 @@ def end_call():
 def get_call_status():
     """Get status of active calls"""
     try:
+        current_user_id = get_jwt_identity()
         match_id = request.args.get('match_id')
 
         if not match_id:
             return jsonify({'error': 'Match ID is required'}), 400
 
-        call_active = match_id in active_calls
-        call_data = active_calls.get(match_id, {})
+        if not find_member_match(match_id, current_user_id):
+            return jsonify({'error': 'Match not found or not authorized'}), 404
+
+        call_data = signaling_store.get_call(match_id) or {}
 
         return jsonify({
-            'active': call_active,
+            'active': bool(call_data),
             'initiator': call_data.get('initiator'),
             'started_at': call_data.get('started_at'),
-            'participants': len(call_data.get('users', {}))
+            'participants': call_data.get('participants', 0)
         }), 200
 
     except Exception as e:
@@ -0,0 +1,251 @@
+# Auth Claims - authorization claims embedded in access tokens, and the
+# revocation list that marks them stale after bans and plan changes
+# (single tokens revoked at logout are in token_denylist.py)
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt
+from sqlalchemy.orm import load_only
+
+try:
+    import redis
+except ImportError:  # Only the in-process revocation list is available
+    redis = None
+
+from app.models import User, db
+from app.services.entitlements import entitlements
+from app.services.profile_cache import profile_cache
+from app.services.token_denylist import token_denylist
+
+# Claims every access token carries besides the user id
+CLAIM_KEYS = ('role', 'plan', 'plan_expires', 'banned', 'active', 'verification')
+
+
+def verification_level(user):
+    """none, identity (document checked) or age (document checked and 18+)"""
+    if user.identity_verified and user.identity_age_verified:
+        return 'age'
+    if user.identity_verified:
+        return 'identity'
+    return 'none'
+
+
+def claims_for(user):
+    """Claims of a User or ProfileSnapshot"""
+    user_entitlements = entitlements.resolve(user)
+    expires_at = user_entitlements.expires_at
+    return {
+        'role': 'admin' if user.is_admin else 'user',
+        'plan': user_entitlements.plan,
+        'plan_expires': int(expires_at.replace(tzinfo=timezone.utc).timestamp()) if expires_at else None,
+        'banned': bool(user.is_banned),
+        'active': user.is_active is not False,
+        'verification': verification_level(user),
+    }
+
+
+def issue_access_token(user, **kwargs):
+    return create_access_token(identity=user.id, additional_claims=claims_for(user), **kwargs)
+
+
+def issue_refresh_token(user):
+    """Long-lived token that can only be exchanged for new access tokens"""
+    return create_refresh_token(identity=user.id)
+
+
+class LocalRevocationStore:
+    """
+    In-process {user_id: (revoked_at, reject)}; entries are dropped once
+    every older token has expired. Only this worker sees them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = {}  # {user_id: (revoked_at, reject, drop_at)}
+        self._prune_at = 1000
+
+    def revoke(self, user_id, revoked_at, reject, ttl, unban=False):
+        with self._lock:
+            entry = self._revoked.get(user_id)
+            if entry and entry[2] > time.time():
+                revoked_at = max(revoked_at, entry[0])
+                reject = reject or (entry[1] and not unban)
+            self._revoked[user_id] = (revoked_at, reject, revoked_at + ttl)
+            if len(self._revoked) >= self._prune_at:
+                now = time.time()
+                self._revoked = {uid: entry for uid, entry in self._revoked.items() if entry[2] > now}
+                self._prune_at = max(1000, 2 * len(self._revoked))
+
+    def get(self, user_id):
+        """(revoked_at, reject) or None"""
+        entry = self._revoked.get(user_id)
+        return entry[:2] if entry and entry[2] > time.time() else None
+
+
+class RedisRevocationStore:
+    """
+    Revocations shared by all workers, as "revoked_at|reject" strings.
+    Entries are merged in one server-side script, so concurrent revocations
+    keep the later time and a ban's reject flag. Needs a client with
+    get and eval (redis-py).
+    """
+
+    # KEYS[1] entry; ARGV revoked_at, reject (0/1), unban (0/1), ttl
+    MERGE_SCRIPT = """
+        local revoked_at, reject = ARGV[1], ARGV[2]
+        local old = redis.call('GET', KEYS[1])
+        if old then
+            local old_at, old_reject = string.match(old, '^([^|]+)|(%d)$')
+            if old_at and tonumber(old_at) > tonumber(revoked_at) then revoked_at = old_at end
+            if old_reject == '1' and ARGV[3] ~= '1' then reject = '1' end
+        end
+        redis.call('SET', KEYS[1], revoked_at .. '|' .. reject, 'EX', ARGV[4])
+    """
+
+    def __init__(self, client, prefix='revoked:'):
+        self.client = client
+        self.prefix = prefix
+
+    def revoke(self, user_id, revoked_at, reject, ttl, unban=False):
+        self.client.eval(self.MERGE_SCRIPT, 1, self.prefix + user_id,
+                         repr(revoked_at), int(reject), int(unban), max(int(ttl), 1))
+
+    def get(self, user_id):
+        value = self.client.get(self.prefix + user_id)
+        if value is None:
+            return None
+        revoked_at, reject = (value.decode() if isinstance(value, bytes) else value).split('|')
+        return float(revoked_at), reject == '1'
+
+
+class RevocationList:
+    """
+    Remembers, per user, when the claims in their tokens went stale and
+    whether older tokens must be rejected outright (ban, deactivation).
+    Tokens issued before that moment are otherwise authorized from the
+    user's current profile instead of their claims. The reject flag is
+    sticky: later revocations (a plan change after a ban) keep it, and
+    only an explicit unban clears it.
+
+    Set TOKEN_REVOCATION_REDIS_URL to share the list between workers. The
+    in-process list is rebuilt for banned users at startup but does not
+    see bans made on other workers, so it is only used when the server is
+    declared single-process with SINGLE_PROCESS=1.
+    """
+
+    def __init__(self, store=None):
+        redis_url = os.getenv('TOKEN_REVOCATION_REDIS_URL')
+        if store is None and redis_url and redis is not None:
+            store = RedisRevocationStore(redis.Redis.from_url(redis_url))
+        elif store is None:
+            if redis_url:
+                print("[AUTH] redis is not installed, using the in-process revocation list")
+            store = LocalRevocationStore()
+        self.store = store
+        self.ttl = 30 * 86400  # Replaced by the longest token lifetime in init_auth_claims()
+
+    def revoke(self, user_id, reject=False, unban=False):
+        self.store.revoke(user_id, time.time(), reject, self.ttl, unban=unban)
+
+    def check(self, user_id, issued_at):
+        """(stale, reject) for a token of user_id issued at issued_at"""
+        entry = self.store.get(user_id)
+        # iat has whole seconds, so a token issued in the same second counts as stale
+        if entry is None or issued_at > entry[0]:
+            return False, False
+        return True, entry[1]
+
+    def is_stale(self, user_id, issued_at):
+        return self.check(user_id, issued_at)[0]
+
+
+# Singleton instance
+revocation_list = RevocationList()
+
+
+def revoke_claims(user_id, reject=False, unban=False):
+    """
+    Call after committing a change to a user's role, plan, ban or
+    verification; reject=True also rejects every token issued before now.
+    A rejection stays in force through later calls until one passes
+    unban=True (the user was unbanned or reactivated).
+    """
+    revocation_list.revoke(user_id, reject, unban)
+
+
+def current_claims():
+    """
+    Claims of the authenticated user. Taken from the token when it carries
+    them and is not stale, so no database or cache lookup is needed;
+    otherwise built from the user's current profile snapshot.
+    """
+    token = get_jwt()
+    if all(key in token for key in CLAIM_KEYS) and not revocation_list.is_stale(token['sub'], token['iat']):
+        return token
+    user = profile_cache.get(token['sub'])
+    return claims_for(user) if user else {}
+
+
+def current_entitlements():
+    """Entitlements of the authenticated user from their claims"""
+    claims = current_claims()
+    expires = claims.get('plan_expires')
+    return entitlements.for_plan(claims.get('plan'),
+                                 datetime.fromtimestamp(expires, timezone.utc).replace(tzinfo=None) if expires else None)
+
+
+def is_token_revoked(jwt_payload):
+    """
+    Logged-out tokens, tokens of users banned or deactivated since they
+    were issued, and tokens claiming a ban. Only in-memory lookups.
+    """
+    if token_denylist.is_denied(jwt_payload.get('jti', '')):
+        return True
+    stale, reject = revocation_list.check(jwt_payload.get('sub'), jwt_payload.get('iat', 0))
+    if stale:
+        return reject
+    return bool(jwt_payload.get('banned')) or jwt_payload.get('active') is False
+
+
+def deny_token(jwt_payload):
+    """Revoke a single token (logout) until it expires"""
+    token_denylist.deny(jwt_payload['jti'], jwt_payload['exp'])
+
+
+def init_auth_claims(app, jwt_manager):
+    # Revocations must outlive every token issued before them
+    lifetimes = [app.config.get('JWT_ACCESS_TOKEN_EXPIRES'), app.config.get('JWT_REFRESH_TOKEN_EXPIRES')]
+    lifetimes = [lifetime.total_seconds() for lifetime in lifetimes if lifetime]
+    if lifetimes:
+        revocation_list.ttl = token_denylist.max_lifetime = max(lifetimes)
+
+    # Bans must reach every worker. The worker count is not visible from
+    # here (gunicorn -w 4 sets no variable), so one process must be declared
+    if isinstance(revocation_list.store, LocalRevocationStore):
+        single_process = os.getenv('SINGLE_PROCESS', '').lower() in ('1', 'true', 'yes')
+        if not single_process or int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+            raise RuntimeError('The in-process token revocation list only works with one process; '
+                               'set TOKEN_REVOCATION_REDIS_URL, or SINGLE_PROCESS=1 for a single-process server')
+
+    @jwt_manager.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return is_token_revoked(jwt_payload)
+
+
+def revoke_banned_users():
+    """
+    The in-process list starts empty; revoke the tokens of users banned or
+    deactivated before this start so they stay rejected. Needs an app context.
+    """
+    if not isinstance(revocation_list.store, LocalRevocationStore):
+        return
+    try:
+        for user in User.query.options(load_only(User.id)).filter(
+            db.or_(User.is_banned.is_(True), User.is_active.is_(False))
+        ):
+            revocation_list.revoke(user.id, reject=True)
+    except Exception as e:
+        print(f"[AUTH] Could not load banned users: {e}")
+        db.session.rollback()
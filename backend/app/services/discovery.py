@@ -0,0 +1,345 @@
+# Discovery Index - in-memory candidate pools for /api/match/discover
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from itertools import chain
+import numpy as np
+from flask import current_app
+from app.models import db, User, Match
+from app.services.scoring import CandidateFeatures, RowNumbers, score_candidates, top_n
+from app.services.geo import GeoGrid, haversine_km
+
+# Pools are rebuilt from the database after this many seconds so that users
+# registered or updated through another worker process eventually show up.
+# The rebuild runs in a background task; requests keep using the old pools
+# until the new ones are swapped in.
+REFRESH_INTERVAL = 300
+
+# Seen sets are kept for this many viewers, least recently used dropped
+# first; each is a bitmap of at most (indexed users / 8) bytes
+SEEN_MAX_USERS = int(os.getenv('DISCOVERY_SEEN_MAX_USERS', '5000'))
+
+
+# Viewer attributes the scorer needs, detached from the ORM session so it can
+# be handed to background prefetch tasks
+ViewerProfile = namedtuple('ViewerProfile', [
+    'id', 'age', 'interests', 'languages', 'smoking', 'drinking', 'children',
+    'relationship_type', 'trust_score', 'last_active', 'latitude', 'longitude', 'max_distance'
+])
+
+
+def viewer_profile(user):
+    return ViewerProfile(*(getattr(user, field) for field in ViewerProfile._fields))
+
+
+# Candidate attributes the pools are built from; `active` is False for users
+# that should be dropped from the pools
+IndexRow = namedtuple('IndexRow', [
+    'id', 'goal', 'gender', 'age', 'interests', 'languages', 'smoking', 'drinking', 'children',
+    'relationship_type', 'trust_score', 'last_active', 'latitude', 'longitude', 'active'
+])
+
+
+def index_row(user):
+    return IndexRow(*(getattr(user, field) for field in IndexRow._fields[:-1]),
+                    active=user.is_active is not False and not user.is_banned)
+
+
+class SeenRows:
+    """
+    The feature rows a viewer has swiped on, as a packed bitmap. Checking a
+    batch of candidate rows is one vectorized gather, so it costs the same
+    however long the swipe history is.
+    """
+
+    def __init__(self, rows=None):
+        self.bits = np.zeros(0, dtype=np.uint8)
+        if rows is not None and len(rows):
+            self._reserve(int(rows.max()))
+            np.bitwise_or.at(self.bits, rows >> 3, np.left_shift(1, rows & 7).astype(np.uint8))
+
+    def _reserve(self, row):
+        size = (row >> 3) + 1
+        if size > len(self.bits):
+            bits = np.zeros(max(size, 2 * len(self.bits)), dtype=np.uint8)
+            bits[:len(self.bits)] = self.bits
+            self.bits = bits
+
+    def add(self, row):
+        self._reserve(row)
+        self.bits[row >> 3] |= np.uint8(1 << (row & 7))
+
+    def contains(self, rows):
+        """Boolean mask of the `rows` (an int array) already seen"""
+        seen = np.zeros(len(rows), dtype=bool)
+        covered = (rows >> 3) < len(self.bits)
+        covered_rows = rows[covered]
+        seen[covered] = (self.bits[covered_rows >> 3] >> (covered_rows & 7).astype(np.uint8)) & 1 == 1
+        return seen
+
+
+class CandidatePools:
+    """
+    One build of the candidate pools, replaced as a whole on refresh. Each
+    (goal, gender) pool is a boolean mask over the feature rows, and the geo
+    grid holds feature rows too, so candidates are selected with vectorized
+    mask operations and never go through Python objects one by one.
+    """
+
+    def __init__(self, numbering=None):
+        self.features = CandidateFeatures(numbering=numbering)
+        self.pools = {}     # {(goal, gender): bool array over feature rows}
+        self.profiles = {}  # {user_id: (goal, gender)}
+        self.grid = GeoGrid()      # of feature rows
+        self._pool_size = self.features.capacity
+
+    def update(self, row):
+        self.remove(row.id)
+        if row.active:
+            self.add(row)
+
+    def add(self, user):
+        row = self.features.upsert(user.id, user)
+        if self.features.capacity > self._pool_size:
+            self._pool_size = self.features.capacity
+            for key, pool in self.pools.items():
+                self.pools[key] = np.zeros(self._pool_size, dtype=bool)
+                self.pools[key][:len(pool)] = pool
+        key = (user.goal, user.gender)
+        if key not in self.pools:
+            self.pools[key] = np.zeros(self._pool_size, dtype=bool)
+        self.pools[key][row] = True
+        self.profiles[user.id] = key
+        if user.latitude is not None and user.longitude is not None:
+            self.grid.upsert(row, user.latitude, user.longitude)
+
+    def remove(self, user_id):
+        key = self.profiles.pop(user_id, None)
+        if key is None:
+            return
+        row = self.features.row_of(user_id)
+        self.pools[key][row] = False
+        self.grid.remove(row)
+
+    def matching(self, goal, gender):
+        """Masks of the pools for a goal and (optionally) a gender"""
+        return [pool for (pool_goal, pool_gender), pool in self.pools.items()
+                if pool_goal == goal and (not gender or pool_gender == gender)]
+
+
+class DiscoveryIndex:
+    """
+    Keeps discoverable users in per goal and gender pools plus a per-user
+    "already seen" bitmap, so discovery is a few mask operations over the
+    pools instead of a NOT IN (...) scan over the whole swipe history. The
+    remaining candidates are ranked by the vectorized compatibility scorer
+    before the top N are returned.
+
+    The pools are loaded on first use and rebuilt every REFRESH_INTERVAL in
+    a background task, outside the lock; profile changes made while a
+    rebuild runs are replayed onto the new pools before they are swapped in.
+    A viewer's seen set is loaded from the database once, on their first
+    pick, and then kept up to date by mark_seen: swipes made here, and
+    swipes made through other workers as discover re-checks the picked
+    candidates. Sets are kept for the SEEN_MAX_USERS most recent viewers.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._numbering = RowNumbers()  # Shared by every build of the pools
+        self._loaded_at = None
+        self._state = None       # CandidatePools
+        self._refreshing = False
+        self._pending = None     # IndexRows updated while a rebuild runs
+        self._seen = OrderedDict()  # {user_id: SeenRows}, least recent first
+
+    # ---------- loading ----------
+
+    def _ensure_loaded(self):
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self.load(self._query_rows())
+            return
+
+        if time.time() - self._loaded_at < REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self._refreshing or time.time() - self._loaded_at < REFRESH_INTERVAL:
+                return
+            self._refreshing = True
+            self._pending = []
+
+        app = current_app._get_current_object()
+        socketio = app.extensions.get('socketio')
+        if socketio is None:
+            # Scripts without Socket.IO rebuild inline, still outside the lock
+            self._refresh()
+            return
+
+        def refresh_in_background():
+            with app.app_context():
+                self._refresh()
+
+        socketio.start_background_task(refresh_in_background)
+
+    def _query_rows(self):
+        return db.session.query(
+            User.id, User.goal, User.gender, User.age,
+            User.interests, User.languages, User.smoking, User.drinking, User.children,
+            User.relationship_type, User.trust_score, User.last_active,
+            User.latitude, User.longitude
+        ).filter(
+            User.is_active == True,
+            User.is_banned == False
+        ).all()
+
+    def _build(self, rows):
+        state = CandidatePools(self._numbering)
+        for row in rows:
+            state.add(row)
+        return state
+
+    def load(self, rows):
+        """Replace the pools with `rows` (discoverable users with the IndexRow fields)"""
+        state = self._build(rows)
+        with self._lock:
+            self._state = state
+            self._loaded_at = time.time()
+
+    def _refresh(self):
+        try:
+            state = self._build(self._query_rows())
+            with self._lock:
+                for row in self._pending:
+                    state.update(row)
+                self._state = state
+                self._loaded_at = time.time()
+        except Exception as e:
+            print(f"[DISCOVERY] Pool refresh failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._pending = None
+
+    def _seen_for(self, user_id):
+        with self._lock:
+            seen = self._seen.get(user_id)
+            if seen is not None:
+                self._seen.move_to_end(user_id)
+                return seen
+
+        rows = db.session.query(Match.receiver_id).filter(Match.sender_id == user_id).all()
+        return self.load_seen(user_id, [receiver_id for (receiver_id,) in rows])
+
+    def load_seen(self, user_id, receiver_ids):
+        """Replace the seen set of `user_id` with the ids they swiped on"""
+        get = self._numbering.get
+        rows = np.fromiter((get(receiver_id, -1) for receiver_id in receiver_ids), dtype=np.int64)
+        seen = SeenRows(rows[rows >= 0])
+        with self._lock:
+            self._seen[user_id] = seen
+            self._seen.move_to_end(user_id)
+            while len(self._seen) > SEEN_MAX_USERS:
+                self._seen.popitem(last=False)
+        return seen
+
+    # ---------- maintenance ----------
+
+    def update_user(self, user):
+        """Add, move or drop a user after registration or a profile/admin change"""
+        if self._state is None:
+            return
+        row = index_row(user)
+        with self._lock:
+            self._state.update(row)
+            if self._pending is not None:
+                self._pending.append(row)
+
+    def mark_seen(self, user_id, target_id):
+        """Record a like or pass so the target is not offered again"""
+        row = self._numbering.get(target_id)
+        if row is None:
+            return
+        with self._lock:
+            seen = self._seen.get(user_id)
+            if seen is not None:
+                seen.add(row)
+
+    # ---------- querying ----------
+
+    def pick(self, viewer, goal, gender=None, age_min=None, age_max=None, exclude=None,
+             limit=50, order='score'):
+        """
+        Return up to `limit` unseen candidate ids for `viewer` (a User or
+        ViewerProfile), skipping any ids in `exclude` (e.g. candidates
+        already handed out in a feed).
+
+        If the viewer has coordinates and a max_distance, only candidates
+        within that radius are considered. Results are ordered by
+        compatibility score (with a proximity bonus), or nearest first when
+        `order` is 'distance'.
+
+        The pools matching goal and gender (and, for proximity search, the
+        grid cells around the viewer) are taken as arrays of feature rows;
+        seen and excluded rows, age and distance are filtered and the
+        survivors scored as NumPy batches, so no step loops over candidates
+        or the user's swipe history in Python.
+        """
+        self._ensure_loaded()
+        seen = self._seen_for(viewer.id)
+        state = self._state
+        features = state.features
+
+        radius = viewer.max_distance
+        use_distance = bool(radius) and viewer.latitude is not None and viewer.longitude is not None
+
+        with self._lock:
+            pools = state.matching(goal, gender)
+            if not pools:
+                return []
+            if use_distance:
+                # Start from the users around the viewer rather than the whole goal
+                rows = np.fromiter(chain.from_iterable(
+                    state.grid.cells_near(viewer.latitude, viewer.longitude, radius)), dtype=np.int64)
+                keep = np.zeros(len(rows), dtype=bool)
+                for pool in pools:
+                    keep |= pool[rows]
+                rows = rows[keep]
+            else:
+                rows = np.flatnonzero(pools[0] if len(pools) == 1 else np.logical_or.reduce(pools))
+
+            rows = rows[~seen.contains(rows)]
+            rows = rows[~np.isin(rows, features.rows_for([viewer.id, *(exclude or ())]))]
+
+            # Exact age check
+            if age_min or age_max:
+                ages = features.age[rows]
+                keep = ages >= 0
+                if age_min:
+                    keep &= ages >= age_min
+                if age_max:
+                    keep &= ages <= age_max
+                rows = rows[keep]
+
+            # Exact radius check; the grid only narrows it down to whole cells
+            distances = None
+            if use_distance:
+                distances = haversine_km(viewer.latitude, viewer.longitude,
+                                         features.latitude[rows], features.longitude[rows])
+                keep = distances <= radius
+                rows, distances = rows[keep], distances[keep]
+
+            if not len(rows):
+                return []
+            if order == 'distance' and distances is not None:
+                return features.ids[rows[np.argsort(distances, kind='stable')[:limit]]].tolist()
+
+            scores = score_candidates(features, rows, features.encode(viewer),
+                                      distances=distances, max_distance=radius if use_distance else None)
+            return features.ids[rows[top_n(scores, limit)]].tolist()
+
+
+# Singleton instance
+discovery_index = DiscoveryIndex()
@@ -0,0 +1,127 @@
+# Discovery Feed - cursor-based paging for /api/match/discover with a
+# server-side prefetch buffer
+import secrets
+import threading
+import time
+from collections import deque
+
+# Feeds not touched for this many seconds are dropped
+FEED_TTL = 1800
+
+# Upper bound on open feeds kept per process
+MAX_FEEDS = 10000
+
+
+class FeedSession:
+    """One user's swipe session: the ids already handed out and the next page"""
+
+    def __init__(self, user_id, params):
+        self.token = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.params = params
+        self.served = set()      # ids delivered or buffered, never offered twice
+        self.buffer = deque()    # serialized users prefetched for the next page
+        self.exhausted = False
+        self.prefetching = False
+        self.touched_at = time.time()
+        self.lock = threading.Lock()
+
+
+class DiscoveryFeed:
+    """
+    Hands out stable feed tokens for discovery. Each call serves a page from
+    the session's buffer and starts a background prefetch of the next one,
+    so a swiping client normally never waits for a fresh candidate query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds = {}  # {token: FeedSession}
+
+    def open(self, user_id, params):
+        """Start a new feed for `user_id` with the given filter params"""
+        feed = FeedSession(user_id, params)
+        with self._lock:
+            self._expire()
+            self._feeds[feed.token] = feed
+        return feed
+
+    def get(self, token, user_id, params):
+        """Return the feed for `token` if it belongs to `user_id` and still matches `params`"""
+        feed = self._feeds.get(token)
+        if feed is None or feed.user_id != user_id or feed.params != params:
+            return None
+        feed.touched_at = time.time()
+        return feed
+
+    def close(self, token):
+        with self._lock:
+            self._feeds.pop(token, None)
+
+    def next_page(self, feed, loader, limit):
+        """
+        Serve up to `limit` users for `feed`.
+
+        `loader(exclude, limit)` must return a list of serialized users (dicts
+        with an 'id') not contained in `exclude`. Buffered users are used
+        first; only a shortfall is loaded synchronously.
+        """
+        with feed.lock:
+            page = []
+            while feed.buffer and len(page) < limit:
+                page.append(feed.buffer.popleft())
+
+            if len(page) < limit and not feed.exhausted:
+                loaded = loader(set(feed.served), limit - len(page))
+                if len(loaded) < limit - len(page):
+                    feed.exhausted = True
+                feed.served.update(user['id'] for user in loaded)
+                page.extend(loaded)
+
+        return page
+
+    def prefetch(self, feed, loader, limit, start_background_task):
+        """Fill `feed`'s buffer with the next page in a background task"""
+        with feed.lock:
+            if feed.exhausted or feed.prefetching or len(feed.buffer) >= limit:
+                return
+            feed.prefetching = True
+
+        def run():
+            try:
+                with feed.lock:
+                    exclude = set(feed.served)
+                    wanted = limit - len(feed.buffer)
+                loaded = loader(exclude, wanted) if wanted > 0 else []
+                with feed.lock:
+                    if len(loaded) < wanted:
+                        feed.exhausted = True
+                    for user in loaded:
+                        if user['id'] not in feed.served:
+                            feed.served.add(user['id'])
+                            feed.buffer.append(user)
+            except Exception as e:
+                print(f"[DISCOVERY FEED] Prefetch failed: {str(e)}")
+            finally:
+                feed.prefetching = False
+
+        start_background_task(run)
+
+    def has_more(self, feed):
+        return bool(feed.buffer) or not feed.exhausted
+
+    def _expire(self):
+        now = time.time()
+        stale = [token for token, feed in self._feeds.items() if now - feed.touched_at > FEED_TTL]
+        for token in stale:
+            del self._feeds[token]
+
+        # Drop the least recently used feeds if still over the cap
+        if len(self._feeds) >= MAX_FEEDS:
+            oldest = sorted(self._feeds.values(), key=lambda feed: feed.touched_at)
+            for feed in oldest[:len(self._feeds) - MAX_FEEDS + 1]:
+                del self._feeds[feed.token]
+
+
+# Singleton instance
+discovery_feed = DiscoveryFeed()
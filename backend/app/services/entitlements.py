@@ -0,0 +1,75 @@
+# Entitlements - which features a user's subscription unlocks, resolved
+# from Config.SUBSCRIPTION_PLANS and subscription_expires
+from datetime import datetime
+
+from flask import current_app
+
+from app.services.profile_cache import profile_cache
+
+FREE_PLAN = 'free'
+
+
+class Entitlements:
+    """Effective plan of a user and the features it unlocks"""
+
+    def __init__(self, plan, features, expires_at=None):
+        self.plan = plan
+        self.features = features
+        self.expires_at = expires_at
+
+    def allows(self, feature):
+        return bool(self.features.get(feature))
+
+    def to_dict(self):
+        return {
+            'plan': self.plan,
+            'features': self.features,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+
+class EntitlementService:
+    """
+    Resolves entitlements from the plans table. Users are read through the
+    profile cache and the feature set of each plan is built once per plans
+    table, so a gate check normally costs no database query.
+    """
+
+    def __init__(self, plans=None):
+        self._plans = plans
+        self._features = {}  # {plan: features}, built from the plans table on first use
+
+    @property
+    def plans(self):
+        return self._plans if self._plans is not None else current_app.config['SUBSCRIPTION_PLANS']
+
+    def features_of(self, plan):
+        """Feature flags of a plan; unknown plans get the free features"""
+        plans = self.plans
+        cached = self._features.get(plan)
+        if cached is None or cached[0] is not plans:
+            definition = plans.get(plan) or plans[FREE_PLAN]
+            cached = (plans, {key: value for key, value in definition.items() if key not in ('name', 'price')})
+            self._features[plan] = cached
+        return cached[1]
+
+    def resolve(self, user):
+        """Entitlements of a User or ProfileSnapshot"""
+        if not user:
+            return self.for_plan(FREE_PLAN)
+        return self.for_plan(user.subscription_plan, user.subscription_expires)
+
+    def for_plan(self, plan, expires_at=None):
+        """Unknown and expired plans fall back to free"""
+        if plan not in self.plans:
+            plan = FREE_PLAN
+        if plan != FREE_PLAN and expires_at and expires_at < datetime.utcnow():
+            plan, expires_at = FREE_PLAN, None
+        return Entitlements(plan, self.features_of(plan), expires_at)
+
+    def for_user(self, user_id):
+        return self.resolve(profile_cache.get(user_id))
+
+
+# Singleton instance
+entitlements = EntitlementService()
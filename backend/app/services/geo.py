@@ -0,0 +1,88 @@
+# Geo Index - in-memory grid for proximity search on profile coordinates
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell edge in degrees (~11 km north-south, ~7 km east-west in Germany)
+CELL_SIZE_DEG = 0.1
+
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from (lat, lon) to arrays of points"""
+    lat1 = np.radians(lat)
+    lats = np.radians(lats)
+    dlat = lats - lat1
+    dlon = np.radians(lons) - np.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points, None if either is unknown"""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    return float(haversine_km(lat1, lon1, lat2, lon2))
+
+
+def is_valid_coordinate(lat, lon):
+    try:
+        return -90 <= float(lat) <= 90 and -180 <= float(lon) <= 180
+    except (TypeError, ValueError):
+        return False
+
+
+class GeoGrid:
+    """
+    Buckets ids (user ids, or feature rows in the discovery index) into
+    fixed-size lat/lon cells. A radius query only
+    visits the cells overlapping the search circle's bounding box; exact
+    distances are computed afterwards on the (much smaller) result.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE_DEG):
+        self.cell_size = cell_size
+        self._cells = {}   # {(lat_cell, lon_cell): set(user_id)}
+        self._where = {}   # {user_id: (lat_cell, lon_cell)}
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def __len__(self):
+        return len(self._where)
+
+    def clear(self):
+        self._cells = {}
+        self._where = {}
+
+    def upsert(self, user_id, lat, lon):
+        cell = self._cell(lat, lon)
+        if self._where.get(user_id) == cell:
+            return
+        self.remove(user_id)
+        self._cells.setdefault(cell, set()).add(user_id)
+        self._where[user_id] = cell
+
+    def remove(self, user_id):
+        cell = self._where.pop(user_id, None)
+        if cell is not None:
+            members = self._cells.get(cell)
+            members.discard(user_id)
+            if not members:
+                del self._cells[cell]
+
+    def cells_near(self, lat, lon, radius_km):
+        """Yield the id sets of all cells overlapping the radius' bounding box"""
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+
+        lat_lo, lon_lo = self._cell(lat - dlat, lon - dlon)
+        lat_hi, lon_hi = self._cell(lat + dlat, lon + dlon)
+
+        for lat_cell in range(lat_lo, lat_hi + 1):
+            for lon_cell in range(lon_lo, lon_hi + 1):
+                members = self._cells.get((lat_cell, lon_cell))
+                if members:
+                    yield members
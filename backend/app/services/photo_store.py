@@ -0,0 +1,228 @@
+# Photo Store - content-addressed photo storage with pre-rendered thumbnails
+import base64
+import binascii
+import hashlib
+import io
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+from flask import has_request_context, request
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Without Pillow every size is served from the original upload
+    Image = None
+
+# Longest edge in pixels of the renditions generated at upload time
+PHOTO_SIZES = {'thumb': 320, 'medium': 960}
+ORIGINAL = 'original'
+
+MAX_PHOTO_BYTES = 5 * 1024 * 1024
+
+# Photos a profile can have, and the longest external photo URL accepted
+MAX_PROFILE_PHOTOS = 10
+MAX_PHOTO_URL_LENGTH = 2048
+
+# File extension and Pillow format by content type
+PHOTO_TYPES = {
+    'image/jpeg': ('jpg', 'JPEG'),
+    'image/png': ('png', 'PNG'),
+    'image/webp': ('webp', 'WEBP'),
+    'image/gif': ('gif', 'GIF'),
+}
+
+# sha256 of the original bytes + extension
+PHOTO_KEY = re.compile(r'^[0-9a-f]{64}\.(jpg|png|webp|gif)$')
+DATA_URL = re.compile(r'^data:(image/[\w.+-]+);base64,(.*)$', re.S)
+
+DEFAULT_STORAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                   'uploads', 'photos')
+
+
+def sniff_content_type(data):
+    """Content type from the file signature (client-supplied types are not trusted)"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return None
+
+
+def load_photos(value):
+    """users.photos holds a JSON-encoded list (or, for older rows, the list itself)"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+
+class LocalPhotoBackend:
+    """
+    Stores renditions as files under `root/<size>/<key>`. An object storage
+    backend only needs the same put/exists/open methods and a public url().
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def put(self, name, data):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial image
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def open(self, name):
+        return open(self.path(name), 'rb')
+
+    def url(self, name):
+        """Public URL if the backend serves files itself; None to go through /api/photos"""
+        return None
+
+
+class PhotoStore:
+    def __init__(self, backend=None, base_url=None):
+        self.backend = backend or LocalPhotoBackend(os.getenv('PHOTO_STORAGE_DIR', DEFAULT_STORAGE_DIR))
+        # e.g. https://cdn.example.com/photos; defaults to this API's /api/photos
+        self.base_url = (base_url or os.getenv('PHOTO_BASE_URL') or '').rstrip('/')
+
+    def save(self, data):
+        """Store an uploaded image and its thumbnails; returns the photo key"""
+        if len(data) > MAX_PHOTO_BYTES:
+            raise ValueError('Photo is too large (max 5 MB)')
+        content_type = sniff_content_type(data)
+        if content_type not in PHOTO_TYPES:
+            raise ValueError('Unsupported image type')
+
+        extension, image_format = PHOTO_TYPES[content_type]
+        key = f'{hashlib.sha256(data).hexdigest()}.{extension}'
+
+        # Same bytes, same key: an already stored photo is not written again
+        if not self.backend.exists(f'{ORIGINAL}/{key}'):
+            for size, max_edge in PHOTO_SIZES.items():
+                self.backend.put(f'{size}/{key}', self._resize(data, max_edge, image_format))
+            # The original goes last so its presence means the set is complete
+            self.backend.put(f'{ORIGINAL}/{key}', data)
+        return key
+
+    def save_data_url(self, data_url):
+        """Store a base64 data URL as sent by older clients; returns the photo key"""
+        match = DATA_URL.match(data_url)
+        if not match:
+            raise ValueError('Invalid data URL')
+        try:
+            data = base64.b64decode(match.group(2), validate=False)
+        except (binascii.Error, ValueError):
+            raise ValueError('Invalid data URL')
+        return self.save(data)
+
+    def _resize(self, data, max_edge, image_format):
+        if Image is None:
+            return data
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if max(image.size) <= max_edge:
+                    return data
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((max_edge, max_edge))
+                if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                out = io.BytesIO()
+                image.save(out, format=image_format, **({'quality': 85, 'optimize': True}
+                                                         if image_format == 'JPEG' else {}))
+                return out.getvalue()
+        except Exception as e:
+            print(f"[PHOTO STORE] Could not resize image, storing original: {str(e)}")
+            return data
+
+    def url(self, key, size='medium'):
+        return self._url(self._root(), key, size)
+
+    def _root(self):
+        """URL prefix of stored photos when the backend has no public URLs of its own"""
+        if self.base_url:
+            return self.base_url
+        if has_request_context():
+            return f"{request.host_url.rstrip('/')}/api/photos"
+        return '/api/photos'  # Outside a request
+
+    def _url(self, root, key, size):
+        name = f'{size}/{key}'
+        return self.backend.url(name) or f'{root}/{name}'
+
+    def key_for(self, value):
+        """Photo key of a stored photo given its key or one of its URLs, else None"""
+        if not isinstance(value, str):
+            return None
+        candidate = value.split('?', 1)[0].rsplit('/', 1)[-1]
+        return candidate if PHOTO_KEY.match(candidate) else None
+
+    def to_keys(self, photos):
+        """
+        Normalize a photos list from a client into photo keys: data URLs are
+        stored, URLs of stored photos are mapped back to their key and other
+        http(s) URLs (external images) are kept as they are. Anything else,
+        or more than MAX_PROFILE_PHOTOS photos, raises ValueError.
+        """
+        photos = [value for value in photos if value != '']
+        if len(photos) > MAX_PROFILE_PHOTOS:
+            raise ValueError(f'At most {MAX_PROFILE_PHOTOS} photos per profile')
+
+        keys = []
+        for value in photos:
+            if not isinstance(value, str):
+                raise ValueError('Photos must be strings')
+            if value.startswith('data:'):
+                keys.append(self.save_data_url(value))
+                continue
+            key = self.key_for(value)
+            if key and self.backend.exists(f'{ORIGINAL}/{key}'):
+                keys.append(key)
+            elif self._is_external_url(value):
+                keys.append(value)
+            else:
+                raise ValueError('Photos must be uploaded photos or http(s) URLs')
+        return keys
+
+    @staticmethod
+    def _is_external_url(value):
+        if len(value) > MAX_PHOTO_URL_LENGTH:
+            return False
+        try:
+            parts = urlsplit(value)
+        except ValueError:
+            return False
+        return parts.scheme in ('http', 'https') and bool(parts.netloc)
+
+    def urls(self, photos, size='medium', limit=None):
+        """URLs of a users.photos value; entries that are not stored photos pass through"""
+        photos = load_photos(photos)
+        if limit is not None:
+            photos = photos[:limit]
+        if not photos:
+            return []
+        root = self._root()
+        return [self._url(root, value, size) if isinstance(value, str) and PHOTO_KEY.match(value) else value
+                for value in photos]
+
+
+# Singleton instance
+photo_store = PhotoStore()
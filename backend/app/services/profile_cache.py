@@ -0,0 +1,187 @@
+# Profile Cache - read-only user snapshots cached per request and per process
+# (or in Redis), invalidated whenever the profile is written
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import g, has_app_context
+from sqlalchemy.orm import load_only
+
+try:
+    import redis
+except ImportError:  # Only the in-process backend is available
+    redis = None
+
+from app.models import User
+from app.services.serializers import preview_cache
+
+# Columns routes check on almost every request: identity, plan, AI setting,
+# provider status and verification/ban state. Anything else is read from
+# the database as before.
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name', 'goal',
+    'subscription_plan', 'subscription_expires', 'ai_assistant_enabled',
+    'is_service_provider', 'service_verified', 'hourly_rate', 'trust_score',
+    'identity_verified', 'identity_age_verified', 'identity_verification_status',
+    'identity_verified_at', 'identity_document_type', 'verification_attempts',
+    'is_active', 'is_banned', 'is_admin',
+)
+DATETIME_FIELDS = ('subscription_expires', 'identity_verified_at')
+
+SNAPSHOT_COLUMNS = tuple(getattr(User, name) for name in SNAPSHOT_FIELDS)
+
+
+class ProfileSnapshot:
+    """
+    Read-only copy of a user's SNAPSHOT_FIELDS. It has the same attribute
+    names as User, so read-only code can take either; writes must go
+    through a User loaded from the database.
+    """
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, values):
+        for name in SNAPSHOT_FIELDS:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ProfileSnapshot is read-only; load the User to change it')
+
+    @classmethod
+    def from_user(cls, user):
+        return cls({name: getattr(user, name) for name in SNAPSHOT_FIELDS})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in SNAPSHOT_FIELDS}
+
+
+class LocalProfileBackend:
+    """In-process LRU of snapshots with a TTL"""
+
+    def __init__(self, max_users, ttl):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {user_id: (expires_at, snapshot)}
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, snapshot):
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisProfileBackend:
+    """
+    Snapshots shared by all workers, stored as JSON with a TTL. Works with
+    any client exposing get/setex/delete (redis-py or a local stand-in).
+    """
+
+    def __init__(self, client, ttl, prefix='profile:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, user_id):
+        raw = self.client.get(self.prefix + user_id)
+        if raw is None:
+            return None
+        values = json.loads(raw)
+        for name in DATETIME_FIELDS:
+            if values.get(name):
+                values[name] = datetime.fromisoformat(values[name])
+        return ProfileSnapshot(values)
+
+    def set(self, user_id, snapshot):
+        values = snapshot.to_dict()
+        for name in DATETIME_FIELDS:
+            if values[name]:
+                values[name] = values[name].isoformat()
+        self.client.setex(self.prefix + user_id, self.ttl, json.dumps(values))
+
+    def delete(self, user_id):
+        self.client.delete(self.prefix + user_id)
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+
+class ProfileCache:
+    """
+    Looks up user snapshots in the request (flask.g), then in the backend,
+    then in the database. Set PROFILE_CACHE_REDIS_URL to share the cache
+    between workers; otherwise each process keeps its own LRU.
+    """
+
+    def __init__(self, backend=None):
+        ttl = int(os.getenv('PROFILE_CACHE_TTL', 300))
+        redis_url = os.getenv('PROFILE_CACHE_REDIS_URL')
+        if backend is None and redis_url and redis is not None:
+            backend = RedisProfileBackend(redis.Redis.from_url(redis_url), ttl)
+        elif backend is None:
+            if redis_url:
+                print("[PROFILE CACHE] redis is not installed, using the in-process cache")
+            backend = LocalProfileBackend(int(os.getenv('PROFILE_CACHE_SIZE', 10000)), ttl)
+        self.backend = backend
+
+    def get(self, user_id):
+        """Snapshot of a user, or None if the user does not exist"""
+        if not user_id:
+            return None
+        request_cache = self._request_cache()
+        if user_id in request_cache:
+            return request_cache[user_id]
+
+        snapshot = self.backend.get(user_id)
+        if snapshot is None:
+            user = User.query.options(load_only(*SNAPSHOT_COLUMNS)).filter_by(id=user_id).first()
+            if user is not None:
+                snapshot = ProfileSnapshot.from_user(user)
+                self.backend.set(user_id, snapshot)
+
+        request_cache[user_id] = snapshot
+        return snapshot
+
+    def invalidate(self, user_id):
+        self.backend.delete(user_id)
+        self._request_cache().pop(user_id, None)
+
+    def _request_cache(self):
+        if not has_app_context():
+            return {}
+        if 'profile_snapshots' not in g:
+            g.profile_snapshots = {}
+        return g.profile_snapshots
+
+
+# Singleton instance
+profile_cache = ProfileCache()
+
+
+def invalidate_user(user_id):
+    """Drop every cached view of a user; call after committing changes to them"""
+    profile_cache.invalidate(user_id)
+    preview_cache.invalidate(user_id)
@@ -0,0 +1,246 @@
+# Compatibility Scoring - columnar candidate features and a vectorized scorer
+import json
+import threading
+import time
+import numpy as np
+
+# Relative weight of each signal in the final score (sums to 1.0)
+SCORE_WEIGHTS = {
+    'interests': 0.30,
+    'languages': 0.10,
+    'lifestyle': 0.15,
+    'relationship_type': 0.10,
+    'trust_score': 0.10,
+    'activity': 0.10,
+    'proximity': 0.15,
+}
+
+# last_active older than this many days contributes ~1/e of the activity score
+ACTIVITY_DECAY_DAYS = 14.0
+
+# Interests and languages are stored as 64-bit masks; values beyond the 64th
+# distinct entry share bits with earlier ones (a rare, harmless collision)
+MASK_BITS = 64
+
+LIFESTYLE_FIELDS = ('smoking', 'drinking', 'children')
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values):
+    """Number of set bits per element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _as_list(value):
+    """JSON columns may hold a list or a JSON-encoded string"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+
+class _Vocabulary:
+    """Maps free-text values to small integer codes"""
+
+    def __init__(self):
+        self._codes = {}
+
+    def code(self, value):
+        if value is None or value == '':
+            return -1
+        key = str(value).strip().lower()
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self._codes)
+        return code
+
+    def mask(self, values):
+        mask = 0
+        for value in _as_list(values):
+            code = self.code(value)
+            if code >= 0:
+                mask |= 1 << (code % MASK_BITS)
+        return mask
+
+
+# Per-row columns of CandidateFeatures
+FEATURE_COLUMNS = ('ids', 'interests', 'languages', 'lifestyle', 'relationship_type',
+                   'trust_score', 'last_active', 'age', 'latitude', 'longitude')
+
+
+class RowNumbers:
+    """
+    Stable user id -> row numbering. A user keeps their row for the life of
+    the numbering, even after leaving the index, and successive
+    CandidateFeatures builds can share one, so row-addressed state kept
+    elsewhere (pool masks, seen bitmaps) stays valid across rebuilds.
+    """
+
+    def __init__(self):
+        self._rows = {}    # {user_id: row}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, user_id, default=None):
+        return self._rows.get(user_id, default)
+
+    def assign(self, user_id):
+        row = self._rows.get(user_id)
+        if row is None:
+            with self._lock:
+                row = self._rows.get(user_id)
+                if row is None:
+                    row = self._rows[user_id] = len(self._rows)
+        return row
+
+
+class CandidateFeatures:
+    """
+    Column store of the per-user signals the scorer needs. Each indexed user
+    owns one row (see RowNumbers); rows are addressed by integer so whole
+    candidate batches can be gathered with a single NumPy fancy-index, and
+    `ids` maps rows back to user ids.
+    """
+
+    def __init__(self, capacity=1024, numbering=None):
+        self.numbering = numbering if numbering is not None else RowNumbers()
+        self._vocab = {name: _Vocabulary() for name in ('interests', 'languages', 'categorical')}
+        self._alloc(max(capacity, len(self.numbering)))
+
+    def _alloc(self, capacity):
+        self.ids = np.empty(capacity, dtype=object)
+        self.interests = np.zeros(capacity, dtype=np.uint64)
+        self.languages = np.zeros(capacity, dtype=np.uint64)
+        self.lifestyle = np.full((capacity, len(LIFESTYLE_FIELDS)), -1, dtype=np.int16)
+        self.relationship_type = np.full(capacity, -1, dtype=np.int16)
+        self.trust_score = np.zeros(capacity, dtype=np.float32)
+        self.last_active = np.zeros(capacity, dtype=np.float64)
+        self.age = np.full(capacity, -1, dtype=np.int16)
+        self.latitude = np.full(capacity, np.nan, dtype=np.float64)
+        self.longitude = np.full(capacity, np.nan, dtype=np.float64)
+
+    def _grow(self, row):
+        old = [getattr(self, name) for name in FEATURE_COLUMNS]
+        capacity = len(old[0])
+        while capacity <= row:
+            capacity *= 2
+        self._alloc(capacity)
+        for name, src in zip(FEATURE_COLUMNS, old):
+            getattr(self, name)[:len(src)] = src
+
+    @property
+    def capacity(self):
+        return len(self.ids)
+
+    def encode(self, user):
+        """Encode a User (or any object with the same attributes) into scalar features"""
+        categorical = self._vocab['categorical']
+        last_active = getattr(user, 'last_active', None)
+        trust_score = getattr(user, 'trust_score', None)
+        age = getattr(user, 'age', None)
+        latitude = getattr(user, 'latitude', None)
+        longitude = getattr(user, 'longitude', None)
+        return {
+            'interests': self._vocab['interests'].mask(getattr(user, 'interests', None)),
+            'languages': self._vocab['languages'].mask(getattr(user, 'languages', None)),
+            'lifestyle': [categorical.code(f'{field}:{getattr(user, field, None)}')
+                          if getattr(user, field, None) else -1 for field in LIFESTYLE_FIELDS],
+            'relationship_type': categorical.code(f'rel:{user.relationship_type}')
+                                 if getattr(user, 'relationship_type', None) else -1,
+            'trust_score': float(trust_score if trust_score is not None else 50),
+            'last_active': last_active.timestamp() if last_active else 0.0,
+            'age': age if age is not None else -1,
+            'latitude': latitude if latitude is not None else np.nan,
+            'longitude': longitude if longitude is not None else np.nan,
+        }
+
+    def upsert(self, user_id, user):
+        row = self.numbering.assign(user_id)
+        if row >= self.capacity:
+            self._grow(row)
+        self.ids[row] = user_id
+
+        features = self.encode(user)
+        self.interests[row] = features['interests']
+        self.languages[row] = features['languages']
+        self.lifestyle[row] = features['lifestyle']
+        self.relationship_type[row] = features['relationship_type']
+        self.trust_score[row] = features['trust_score']
+        self.last_active[row] = features['last_active']
+        self.age[row] = features['age']
+        self.latitude[row] = features['latitude']
+        self.longitude[row] = features['longitude']
+        return row
+
+    def row_of(self, user_id):
+        """Row of a user id, None if it was never indexed"""
+        return self.numbering.get(user_id)
+
+    def rows_for(self, user_ids):
+        """Row numbers for a (small) collection of user ids; unknown ids are skipped"""
+        get = self.numbering.get
+        rows = np.fromiter((get(user_id, -1) for user_id in user_ids), dtype=np.int64)
+        return rows[rows >= 0]
+
+
+def score_candidates(features, rows, viewer, now=None, distances=None, max_distance=None):
+    """
+    Score candidate `rows` of `features` against `viewer` (as returned by
+    CandidateFeatures.encode). Returns a float32 array aligned with `rows`.
+
+    If `distances` (km, aligned with `rows`) and `max_distance` are given,
+    closer candidates get a proximity bonus.
+    """
+    if now is None:
+        now = time.time()
+
+    interests = features.interests[rows]
+    viewer_interests = np.uint64(viewer['interests'])
+    interest_score = popcount64(interests & viewer_interests).astype(np.float32)
+    interest_score /= max(bin(viewer['interests']).count('1'), 1)
+
+    language_score = ((features.languages[rows] & np.uint64(viewer['languages'])) != 0).astype(np.float32)
+
+    viewer_lifestyle = np.asarray(viewer['lifestyle'], dtype=np.int16)
+    lifestyle_match = (features.lifestyle[rows] == viewer_lifestyle) & (viewer_lifestyle >= 0)
+    lifestyle_score = lifestyle_match.mean(axis=1, dtype=np.float32)
+
+    relationship_score = np.zeros(len(rows), dtype=np.float32)
+    if viewer['relationship_type'] >= 0:
+        relationship_score = (features.relationship_type[rows] == viewer['relationship_type']).astype(np.float32)
+
+    trust_score = np.clip(features.trust_score[rows], 0, 100) / 100.0
+
+    idle_days = np.maximum(now - features.last_active[rows], 0) / 86400.0
+    activity_score = np.exp(-idle_days / ACTIVITY_DECAY_DAYS).astype(np.float32)
+
+    scores = (SCORE_WEIGHTS['interests'] * interest_score
+              + SCORE_WEIGHTS['languages'] * language_score
+              + SCORE_WEIGHTS['lifestyle'] * lifestyle_score
+              + SCORE_WEIGHTS['relationship_type'] * relationship_score
+              + SCORE_WEIGHTS['trust_score'] * trust_score
+              + SCORE_WEIGHTS['activity'] * activity_score)
+
+    if distances is not None and max_distance:
+        proximity_score = np.clip(1.0 - distances / max_distance, 0, 1).astype(np.float32)
+        scores += SCORE_WEIGHTS['proximity'] * proximity_score
+
+    return scores
+
+
+def top_n(scores, limit):
+    """Indices of the `limit` highest scores, best first"""
+    if len(scores) > limit:
+        best = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind='stable')]
@@ -0,0 +1,324 @@
+# Serializers - schema-driven user serialization, a per-user preview cache
+# and an orjson-backed JSON provider
+import os
+import threading
+import time
+from collections import OrderedDict
+from operator import attrgetter, itemgetter
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Responses are encoded with the standard library json module
+    orjson = None
+
+try:
+    import redis
+except ImportError:  # Previews are only invalidated in this process
+    redis = None
+
+from app.services.photo_store import photo_store
+
+# Seconds between pulls of previews invalidated by other workers
+PREVIEW_SYNC_INTERVAL = int(os.getenv('USER_PREVIEW_CACHE_SYNC_SECONDS', 2))
+
+
+# Field accessors: each helper returns a function taking a user
+
+def iso(name):
+    get = attrgetter(name)
+
+    def accessor(user):
+        value = get(user)
+        return value.isoformat() if value else None
+    return accessor
+
+
+def or_default(name, default):
+    """Attribute value, or `default` if it is falsy"""
+    get = attrgetter(name)
+    return lambda user: get(user) or default
+
+
+def if_none(name, default):
+    """Attribute value, or `default` if it is None"""
+    get = attrgetter(name)
+
+    def accessor(user):
+        value = get(user)
+        return default if value is None else value
+    return accessor
+
+
+def photos(size, limit=None):
+    get = attrgetter('photos')
+    return lambda user: photo_store.urls(get(user), size, limit=limit)
+
+
+def provider_rate(user):
+    return user.hourly_rate if user.is_service_provider else None
+
+
+class UserSchema:
+    """
+    A list of output fields. A field given as a plain attribute name is
+    read straight from the instance __dict__ with one itemgetter call,
+    which skips the descriptor of every mapped column (several times
+    faster than attribute access); if one of them is not loaded (deferred
+    or expired), or the object has no __dict__ (ProfileSnapshot), they are
+    read as attributes instead. A callable is called with the user. Schemas with cache=True
+    are previews that may be served from the preview cache.
+    """
+
+    def __init__(self, name, fields, cache=False):
+        self.name = name
+        self.cache = cache
+        self.keys = []
+        self._plain_keys, names, self._computed = [], [], []
+        for field in fields:
+            key, spec = (field, field) if isinstance(field, str) else field
+            if isinstance(spec, str):
+                self._plain_keys.append(key)
+                names.append(spec)
+            else:
+                self._computed.append((key, spec))
+            self.keys.append(key)
+        self._from_dict = _tuple_getter(itemgetter, names)
+        self._from_attrs = _tuple_getter(attrgetter, names)
+
+    def dump(self, user):
+        try:
+            values = self._from_dict(user.__dict__)
+        except (AttributeError, KeyError):
+            values = self._from_attrs(user)
+        data = dict(zip(self._plain_keys, values))
+        for key, get in self._computed:
+            data[key] = get(user)
+        return data
+
+
+def _tuple_getter(getter, names):
+    """getter(*names), always returning a tuple (itemgetter of one name returns the bare value)"""
+    if len(names) > 1:
+        return getter(*names)
+    if names:
+        get = getter(names[0])
+        return lambda obj: (get(obj),)
+    return lambda obj: ()
+
+
+# Matches list
+USER_PREVIEW = UserSchema('preview', [
+    'id', 'username', 'first_name', 'last_name', 'age', 'gender', 'city', 'bio',
+    ('photos', photos('thumb', limit=1)),  # Only first photo
+    'trust_score',
+    ('last_active', iso('last_active')),
+], cache=True)
+
+# Incoming likes
+LIKE_PREVIEW = UserSchema('like', [
+    'id', 'username', 'first_name', 'last_name', 'age', 'gender', 'city', 'bio',
+    ('photos', photos('thumb', limit=1)),  # Only first photo
+    'goal', 'trust_score', 'is_service_provider', 'service_verified',
+    ('hourly_rate', provider_rate),
+], cache=True)
+
+# Discovery candidates (the distance is per viewer and added by the caller)
+CANDIDATE_PREVIEW = UserSchema('candidate', [
+    'id', 'username', 'first_name', 'last_name', 'age', 'gender', 'city', 'bio',
+    ('photos', photos('medium', limit=1)),  # Only first photo for preview
+    'goal', 'trust_score', 'is_service_provider', 'service_verified',
+    ('hourly_rate', provider_rate),
+], cache=True)
+
+# Full profile view, with defaults for None values
+USER_PROFILE = UserSchema('profile', [
+    'id',
+    ('username', or_default('username', 'Пользователь')),
+    'first_name', 'last_name',
+    ('age', or_default('age', 18)),
+    'gender',
+    ('city', or_default('city', 'Не указано')),
+    ('bio', or_default('bio', '')),
+    ('photos', photos('medium')),  # All photos for full profile view
+    ('subscription_plan', or_default('subscription_plan', 'free')),
+    ('trust_score', if_none('trust_score', 50)),
+    ('is_service_provider', or_default('is_service_provider', False)),
+    'hourly_rate',
+    ('service_verified', or_default('service_verified', False)),
+    ('services_offered', or_default('services_offered', [])),
+
+    # Extended profile
+    'height', 'weight', 'body_type', 'hair_color', 'eye_color', 'zodiac_sign',
+    'education', 'occupation', 'company',
+    ('languages', or_default('languages', [])),
+    'smoking', 'drinking', 'children',
+    ('interests', or_default('interests', [])),
+    'relationship_type', 'goal',
+
+    # Activity
+    ('last_active', iso('last_active')),
+    ('created_at', iso('created_at')),
+])
+
+# Participants of a chat room
+ROOM_MEMBER = UserSchema('room_member', [
+    'id', 'username', 'first_name',
+    ('photos', photos('thumb')),
+    'subscription_plan',
+])
+
+# Admin user list
+ADMIN_USER = UserSchema('admin', [
+    'id', 'email', 'username', 'first_name', 'last_name', 'age', 'gender', 'city', 'goal',
+    'subscription_plan', 'trust_score', 'is_active', 'is_banned',
+    ('is_admin', lambda user: getattr(user, 'is_admin', False)),
+    ('created_at', iso('created_at')),
+])
+
+
+class RedisInvalidationLog:
+    """
+    Users whose previews were invalidated, shared by all workers: a sorted
+    set scored by the invalidation time, so each worker can pull what is new
+    """
+
+    def __init__(self, client, key='preview_invalidations'):
+        self.client = client
+        self.key = key
+
+    def add(self, user_id, invalidated_at):
+        self.client.zadd(self.key, {user_id: invalidated_at})
+
+    def since(self, invalidated_after):
+        return [member.decode() if isinstance(member, bytes) else member
+                for member in self.client.zrangebyscore(self.key, f'({invalidated_after}', '+inf')]
+
+    def prune(self, invalidated_before):
+        self.client.zremrangebyscore(self.key, '-inf', invalidated_before)
+
+
+class PreviewCache:
+    """
+    Serialized previews per user and schema, kept for a short TTL and
+    dropped explicitly when the user edits their profile. Entries are keyed
+    by the host the photo URLs were built for.
+
+    The previews live in each process. When PROFILE_CACHE_REDIS_URL is set
+    (the profile cache is shared), invalidations are also logged in Redis
+    and every worker drops the invalidated users at most
+    PREVIEW_SYNC_INTERVAL seconds later, instead of serving them until the
+    TTL runs out.
+    """
+
+    def __init__(self, max_users=None, ttl=None, log=None):
+        self.max_users = max_users or int(os.getenv('USER_PREVIEW_CACHE_SIZE', 10000))
+        self.ttl = ttl or int(os.getenv('USER_PREVIEW_CACHE_TTL', 300))
+        redis_url = os.getenv('PROFILE_CACHE_REDIS_URL')
+        if log is None and redis_url and redis is not None:
+            log = RedisInvalidationLog(redis.Redis.from_url(redis_url))
+        self.log = log
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # {user_id: {(schema, host): (expires_at, preview)}}
+        self._synced_at = time.time()
+        self._next_sync = 0
+
+    def get(self, user_id, key):
+        if self.log is not None and time.time() >= self._next_sync:
+            self.sync()
+        with self._lock:
+            entries = self._users.get(user_id)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del entries[key]
+                return None
+            self._users.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, key, preview):
+        with self._lock:
+            self._users.setdefault(user_id, {})[key] = (time.time() + self.ttl, preview)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+        if self.log is not None:
+            try:
+                self.log.add(user_id, time.time())
+            except Exception as e:
+                print(f"[PREVIEW CACHE] Could not share invalidation: {e}")
+
+    def sync(self):
+        """Drop the users other workers invalidated"""
+        now = time.time()
+        self._next_sync = now + PREVIEW_SYNC_INTERVAL
+        try:
+            user_ids = self.log.since(self._synced_at - PREVIEW_SYNC_INTERVAL)  # Overlap for clock skew
+            self.log.prune(now - self.ttl)
+        except Exception as e:
+            print(f"[PREVIEW CACHE] Sync failed: {e}")
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._users.pop(user_id, None)
+        self._synced_at = now
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+# Singleton instance
+preview_cache = PreviewCache()
+
+
+def serialize_user(user, schema):
+    """Serialize a user with a schema; previews come from the cache when possible"""
+    if not schema.cache:
+        return schema.dump(user)
+
+    key = (schema.name, request.host_url if has_request_context() else '')
+    preview = preview_cache.get(user.id, key)
+    if preview is None:
+        preview = schema.dump(user)
+        preview_cache.set(user.id, key, preview)
+    return preview
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Encodes responses with orjson when it is installed. Output matches the
+    default provider: sorted keys, indented in debug mode, and datetimes,
+    decimals and other non-JSON types still go through Flask's default().
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+        except TypeError:
+            return super().dumps(obj)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._options() | orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:  # e.g. integers beyond 64 bits
+            return super().response(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _options(self):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return option | orjson.OPT_SORT_KEYS if self.sort_keys else option
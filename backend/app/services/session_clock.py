@@ -0,0 +1,144 @@
+# Session Clock - server-authoritative playback clocks for watch-together
+# movie sessions, kept in memory and persisted only on state transitions
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# A reported position further than this from the live clock is a seek
+SEEK_THRESHOLD = float(os.getenv('MOVIE_SEEK_THRESHOLD', 1.0))
+# While playing, re-anchor the stored position at most this often
+CHECKPOINT_SECONDS = float(os.getenv('MOVIE_CHECKPOINT_SECONDS', 60))
+# Playback starts (or resumes after a seek) this long after the change, so
+# the new state reaches every client before its play-at time
+PLAY_LEAD_SECONDS = float(os.getenv('MOVIE_PLAY_LEAD_SECONDS', 0.5))
+
+
+class SessionClock:
+    """
+    Playback state of one session: status, and the position at a wall-clock
+    anchor (epoch seconds). While playing, the live position is computed
+    from the anchor on every read, so nothing has to be written as time
+    passes. An anchor in the future is a play-at time: the position holds
+    until then.
+    """
+    __slots__ = ('session_id', 'status', 'position', 'anchor', 'synced_at')
+
+    def __init__(self, session_id, status, position, anchor, synced_at=None):
+        self.session_id = session_id
+        self.status = status
+        self.position = position
+        self.anchor = anchor
+        self.synced_at = synced_at  # MovieSession.position_anchored_at this clock matches
+
+    @classmethod
+    def from_session(cls, session):
+        # The row stores the position at position_anchored_at. updated_at
+        # also moves on edits of the movie details, so it cannot be the anchor.
+        anchored_at = session.position_anchored_at or session.updated_at or datetime.utcnow()
+        return cls(session.id, session.status, session.current_time or 0.0,
+                   _epoch(anchored_at), session.position_anchored_at)
+
+    def position_at(self, now):
+        if self.status == 'playing':
+            return self.position + max(now - self.anchor, 0.0)
+        return self.position
+
+    def to_dict(self, now=None):
+        """
+        current_time is the position at server_time. While playing, clients
+        sync to `position` at `play_at` (server clock) instead, which does
+        not depend on how long the message took to arrive.
+        """
+        now = time.time() if now is None else now
+        return {
+            'session_id': self.session_id,
+            'status': self.status,
+            'position': self.position,
+            'play_at': self.anchor if self.status == 'playing' else None,
+            'current_time': self.position_at(now),
+            'server_time': now
+        }
+
+
+class SessionClocks:
+    """
+    Clocks of the sessions this process has seen, least recently used
+    first. The database row is the shared record: every transition writes
+    status, position and anchor to it, and a clock whose row was re-anchored
+    by another worker is reloaded from it, so all workers agree on the live
+    position. Evicted clocks are simply reloaded.
+    """
+
+    def __init__(self, max_sessions=None):
+        self.max_sessions = max_sessions or int(os.getenv('MOVIE_CLOCK_MAX_SESSIONS', 10000))
+        self._lock = threading.Lock()
+        self._clocks = OrderedDict()  # {session_id: SessionClock}
+
+    def get(self, session):
+        """Clock of a MovieSession row"""
+        with self._lock:
+            return self._sync(session)
+
+    def update(self, session, status=None, position=None, now=None, lead=0.0):
+        """
+        Apply a status change and/or a reported position. Returns
+        'transition' (status change or seek), 'checkpoint' (position
+        re-anchored) or None; the row is updated in both first cases and
+        the caller commits. With a lead, playback after a transition
+        starts `lead` seconds from now.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            clock = self._sync(session)
+            live = clock.position_at(now)
+            seek = position is not None and abs(position - live) > SEEK_THRESHOLD
+
+            if (status and status != clock.status) or seek:
+                # A client changing the state knows where it paused or sought to
+                clock.position = max(float(position), 0.0) if position is not None else live
+                clock.status = status or clock.status
+                clock.anchor = now + lead if clock.status == 'playing' else now
+                self._persist(session, clock)
+                return 'transition'
+
+            if clock.status == 'playing' and now - clock.anchor >= CHECKPOINT_SECONDS:
+                clock.position, clock.anchor = live, now
+                self._persist(session, clock)
+                return 'checkpoint'
+            return None
+
+    def forget(self, session_id):
+        """Drop a clock, e.g. when its session ended or a write was rolled back"""
+        with self._lock:
+            self._clocks.pop(session_id, None)
+
+    def _sync(self, session):
+        clock = self._clocks.get(session.id)
+        if clock is None or clock.synced_at != session.position_anchored_at:
+            clock = self._clocks[session.id] = SessionClock.from_session(session)
+        self._clocks.move_to_end(session.id)
+        while len(self._clocks) > self.max_sessions:
+            self._clocks.popitem(last=False)
+        return clock
+
+    @staticmethod
+    def _persist(session, clock):
+        anchor = datetime.utcfromtimestamp(clock.anchor)
+        session.status = clock.status
+        session.current_time = clock.position
+        session.position_anchored_at = anchor
+        if clock.status == 'playing' and not session.started_at:
+            session.started_at = anchor
+        elif clock.status == 'ended':
+            session.ended_at = anchor
+        clock.synced_at = anchor
+
+
+def _epoch(naive_utc):
+    return (naive_utc - datetime(1970, 1, 1)).total_seconds()
+
+
+# Singleton instance
+session_clocks = SessionClocks()
@@ -0,0 +1,322 @@
+# Signaling Store - WebRTC call state (offers, answers, ICE candidates) per
+# match, kept in process or in Redis so every worker sees the same calls
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import takewhile
+
+try:
+    import redis
+except ImportError:  # Only the in-process store is available
+    redis = None
+
+# Longest wait a poll may ask for, in seconds
+MAX_LONG_POLL = float(os.getenv('SIGNALING_MAX_LONG_POLL', 25))
+
+
+def signal_delta(offer, answer, last_seq, entries, first_seq, after_seq, active=True):
+    """
+    What a user has signaled since after_seq. Every offer, answer and ICE
+    candidate of a user gets the next number of that user's signal log;
+    `entries` are the (seq, kind, payload) log entries after after_seq,
+    oldest first, and first_seq is the oldest number still in the log.
+    A client that fell behind the log (or never polled) gets the full
+    state; otherwise offer and answer are only set when they changed.
+    """
+    full = after_seq < first_seq - 1
+    candidates = [payload for seq, kind, payload in entries if kind == 'candidate']
+    if not full:
+        offer = answer = None
+        for seq, kind, payload in entries:
+            if kind == 'offer':
+                offer = payload
+            elif kind == 'answer':
+                answer = payload
+    return {
+        'active': active,
+        'offer': offer,
+        'answer': answer,
+        'ice_candidates': candidates,
+        'last_seq': last_seq
+    }
+
+
+class LocalSignalingStore:
+    """
+    Calls of this process only. Each call expires `ttl` seconds after its
+    last write and at most `max_calls` are kept (the least recently active
+    go first); each user's signal log keeps the last `max_signals` entries.
+    """
+
+    def __init__(self, ttl, max_signals, max_calls=10000):
+        self.ttl = ttl
+        self.max_signals = max_signals
+        self.max_calls = max_calls
+        self._lock = threading.Lock()
+        # {match_id: {'initiator', 'started_at', 'expires_at', 'users': {user_id: {...}}}},
+        # least recently written first, so expired calls are always at the front
+        self._calls = OrderedDict()
+        self._waiting = {}  # {match_id: [Condition, number of waiting polls]}
+
+    def start_call(self, match_id, initiator):
+        with self._lock:
+            call = self._touch(match_id)
+            if call['initiator'] is None:
+                call['initiator'] = initiator
+                call['started_at'] = datetime.utcnow().isoformat()
+            return self._summary(call)
+
+    def set_description(self, match_id, user_id, kind, description):
+        """Store the user's offer or answer (kind)"""
+        with self._lock:
+            user = self._user(self._touch(match_id), user_id)
+            user[kind] = description
+            self._log(match_id, user, kind, description)
+
+    def add_candidate(self, match_id, user_id, candidate):
+        with self._lock:
+            self._log(match_id, self._user(self._touch(match_id), user_id), 'candidate', candidate)
+
+    def get_signals(self, match_id, user_id, after_seq=0):
+        """Offer, answer and ICE candidates sent by user_id after after_seq"""
+        with self._lock:
+            return self._signals(match_id, user_id, after_seq)
+
+    def wait_for_signals(self, match_id, user_id, after_seq, timeout):
+        """get_signals(), waiting up to `timeout` seconds for something new"""
+        deadline = time.time() + min(timeout, MAX_LONG_POLL)
+        with self._lock:
+            waiting = self._waiting.setdefault(match_id, [threading.Condition(self._lock), 0])
+            waiting[1] += 1
+            try:
+                while True:
+                    signals = self._signals(match_id, user_id, after_seq)
+                    remaining = deadline - time.time()
+                    if _has_news(signals, after_seq) or remaining <= 0:
+                        return signals
+                    waiting[0].wait(remaining)
+            finally:
+                waiting[1] -= 1
+                if not waiting[1]:
+                    del self._waiting[match_id]
+
+    def get_call(self, match_id):
+        with self._lock:
+            call = self._live(match_id)
+            return self._summary(call) if call else None
+
+    def end_call(self, match_id):
+        with self._lock:
+            self._calls.pop(match_id, None)
+            self._notify(match_id)
+
+    def _signals(self, match_id, user_id, after_seq):
+        call = self._live(match_id)
+        user = call['users'].get(user_id) if call else None
+        if not user:
+            return signal_delta(None, None, 0, [], 1, 0, active=call is not None)
+        if after_seq > user['seq']:
+            after_seq = 0  # Numbers from an earlier call
+        log = user['log']
+        entries = list(takewhile(lambda entry: entry[0] > after_seq, reversed(log)))
+        entries.reverse()
+        first_seq = log[0][0] if log else user['seq'] + 1
+        return signal_delta(user['offer'], user['answer'], user['seq'], entries, first_seq, after_seq)
+
+    def _log(self, match_id, user, kind, payload):
+        user['seq'] += 1
+        user['log'].append((user['seq'], kind, payload))
+        self._notify(match_id)
+
+    def _notify(self, match_id):
+        waiting = self._waiting.get(match_id)
+        if waiting:
+            waiting[0].notify_all()
+
+    def _live(self, match_id):
+        call = self._calls.get(match_id)
+        if call and call['expires_at'] <= time.time():
+            del self._calls[match_id]
+            return None
+        return call
+
+    def _touch(self, match_id):
+        """The live call, created if needed, with its TTL restarted"""
+        now = time.time()
+        call = self._live(match_id)
+        if call is None:
+            call = self._calls[match_id] = {'initiator': None, 'started_at': None, 'users': {}}
+        call['expires_at'] = now + self.ttl
+        self._calls.move_to_end(match_id)
+
+        # Collect finished calls: expired ones, then the least recently active over the cap
+        while self._calls:
+            oldest_id, oldest = next(iter(self._calls.items()))
+            if oldest['expires_at'] > now and len(self._calls) <= self.max_calls:
+                break
+            del self._calls[oldest_id]
+            self._notify(oldest_id)
+        return call
+
+    def _user(self, call, user_id):
+        user = call['users'].get(user_id)
+        if user is None:
+            user = call['users'][user_id] = {
+                'offer': None,
+                'answer': None,
+                'seq': 0,
+                'log': deque(maxlen=self.max_signals)  # (seq, kind, payload)
+            }
+        return user
+
+    @staticmethod
+    def _summary(call):
+        return {
+            'initiator': call['initiator'],
+            'started_at': call['started_at'],
+            'participants': len(call['users'])
+        }
+
+
+class RedisSignalingStore:
+    """
+    Calls shared by all workers. Works with any client speaking the Redis
+    commands used here (redis-py or a local stand-in):
+
+        call:<match_id>                    hash  initiator, started_at
+        call:<match_id>:users              set   participant ids
+        call:<match_id>:<user_id>          hash  offer, answer (JSON), seq
+        call:<match_id>:<user_id>:log      list  [kind, payload] (JSON), trimmed
+
+    seq and the log are updated in one transaction, so the last log entry
+    is always number seq. Every write restarts the TTL of the call's keys.
+    Waiting polls re-read every `poll_interval` seconds.
+    """
+
+    def __init__(self, client, ttl, max_signals, prefix='call:', poll_interval=0.25):
+        self.client = client
+        self.ttl = ttl
+        self.max_signals = max_signals
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+
+    def start_call(self, match_id, initiator):
+        key = self.prefix + match_id
+        pipe = self.client.pipeline()
+        pipe.hsetnx(key, 'initiator', initiator)
+        pipe.hsetnx(key, 'started_at', datetime.utcnow().isoformat())
+        self._expire(pipe, match_id)
+        pipe.execute()
+        return self.get_call(match_id)
+
+    def set_description(self, match_id, user_id, kind, description):
+        self._log(match_id, user_id, kind, description)
+
+    def add_candidate(self, match_id, user_id, candidate):
+        self._log(match_id, user_id, 'candidate', candidate)
+
+    def get_signals(self, match_id, user_id, after_seq=0):
+        user_key = self._user_key(match_id, user_id)
+        pipe = self.client.pipeline()
+        pipe.hmget(user_key, 'offer', 'answer', 'seq')
+        pipe.lrange(user_key + ':log', 0, -1)  # At most max_signals entries
+        pipe.exists(self.prefix + match_id, self.prefix + match_id + ':users')
+        (offer, answer, last_seq), log, active = pipe.execute()
+
+        last_seq = int(last_seq or 0)
+        if after_seq > last_seq:
+            after_seq = 0  # Numbers from an earlier call
+        first_seq = last_seq - len(log) + 1
+        start = max(after_seq - first_seq + 1, 0)
+        entries = [(first_seq + index, *json.loads(log[index])) for index in range(start, len(log))]
+        return signal_delta(json.loads(offer) if offer else None, json.loads(answer) if answer else None,
+                            last_seq, entries, first_seq, after_seq, active=bool(active))
+
+    def wait_for_signals(self, match_id, user_id, after_seq, timeout):
+        deadline = time.time() + min(timeout, MAX_LONG_POLL)
+        while True:
+            signals = self.get_signals(match_id, user_id, after_seq)
+            remaining = deadline - time.time()
+            if _has_news(signals, after_seq) or remaining <= 0:
+                return signals
+            time.sleep(min(self.poll_interval, remaining))
+
+    def get_call(self, match_id):
+        pipe = self.client.pipeline()
+        pipe.hgetall(self.prefix + match_id)
+        pipe.scard(self.prefix + match_id + ':users')
+        meta, participants = pipe.execute()
+        if not meta and not participants:
+            return None
+        meta = {_text(key): _text(value) for key, value in meta.items()}
+        return {
+            'initiator': meta.get('initiator'),
+            'started_at': meta.get('started_at'),
+            'participants': participants
+        }
+
+    def end_call(self, match_id):
+        users_key = self.prefix + match_id + ':users'
+        keys = [self.prefix + match_id, users_key]
+        for user_id in self.client.smembers(users_key):
+            user_key = self._user_key(match_id, _text(user_id))
+            keys += [user_key, user_key + ':log']
+        self.client.delete(*keys)
+
+    def _log(self, match_id, user_id, kind, payload):
+        user_key = self._user_key(match_id, user_id)
+        pipe = self.client.pipeline()  # MULTI/EXEC: seq and the log stay in step
+        if kind != 'candidate':
+            pipe.hset(user_key, kind, json.dumps(payload))
+        pipe.hincrby(user_key, 'seq', 1)
+        pipe.rpush(user_key + ':log', json.dumps([kind, payload]))
+        pipe.ltrim(user_key + ':log', -self.max_signals, -1)
+        pipe.sadd(self.prefix + match_id + ':users', user_id)
+        self._expire(pipe, match_id, user_id)
+        pipe.execute()
+
+    def _user_key(self, match_id, user_id):
+        return f'{self.prefix}{match_id}:{user_id}'
+
+    def _expire(self, pipe, match_id, user_id=None):
+        ttl = max(int(self.ttl), 1)
+        pipe.expire(self.prefix + match_id, ttl)
+        pipe.expire(self.prefix + match_id + ':users', ttl)
+        if user_id:
+            # The other participant's keys keep their own TTL from their last write
+            user_key = self._user_key(match_id, user_id)
+            pipe.expire(user_key, ttl)
+            pipe.expire(user_key + ':log', ttl)
+
+
+def _has_news(signals, after_seq):
+    """New signals, or the call the client was following has ended"""
+    return signals['last_seq'] != after_seq or (after_seq > 0 and not signals['active'])
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def create_signaling_store():
+    """
+    Redis store when SIGNALING_REDIS_URL is set (and redis is installed),
+    otherwise the in-process store. SIGNALING_CALL_TTL (seconds since the
+    last signal), SIGNALING_MAX_SIGNALS (per user) and SIGNALING_MAX_CALLS
+    (in-process only) bound memory.
+    """
+    ttl = int(os.getenv('SIGNALING_CALL_TTL', 3600))
+    max_signals = int(os.getenv('SIGNALING_MAX_SIGNALS', 50))
+    redis_url = os.getenv('SIGNALING_REDIS_URL')
+    if redis_url and redis is not None:
+        return RedisSignalingStore(redis.Redis.from_url(redis_url), ttl, max_signals)
+    if redis_url:
+        print("[SIGNALING] redis is not installed, using the in-process store")
+    return LocalSignalingStore(ttl, max_signals, int(os.getenv('SIGNALING_MAX_CALLS', 10000)))
+
+
+# Singleton instance
+signaling_store = create_signaling_store()
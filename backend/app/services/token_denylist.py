@@ -0,0 +1,138 @@
+# Token Denylist - revoked token ids (logout), checked in memory with a
+# Bloom filter in front of an exact set, optionally shared through Redis
+import hashlib
+import math
+import os
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # Only the in-process denylist is available
+    redis = None
+
+# Seconds between pulls of tokens denied by other workers
+SYNC_INTERVAL = int(os.getenv('TOKEN_DENYLIST_SYNC_SECONDS', 5))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RedisDenylistStore:
+    """
+    Denied token ids shared by all workers, in a sorted set scored by the
+    time they were denied so each worker can pull what is new
+    """
+
+    def __init__(self, client, key='denied_tokens'):
+        self.client = client
+        self.key = key
+
+    def add(self, jti, expires_at, denied_at):
+        self.client.zadd(self.key, {f'{jti}|{expires_at}': denied_at})
+
+    def since(self, denied_after):
+        """(jti, expires_at) of tokens denied after the given time"""
+        entries = []
+        for member in self.client.zrangebyscore(self.key, f'({denied_after}', '+inf'):
+            member = member.decode() if isinstance(member, bytes) else member
+            jti, expires_at = member.rsplit('|', 1)
+            entries.append((jti, float(expires_at)))
+        return entries
+
+    def prune(self, denied_before):
+        self.client.zremrangebyscore(self.key, '-inf', denied_before)
+
+
+class TokenDenylist:
+    """
+    Ids (jti) of tokens revoked before they expire. A lookup is a Bloom
+    filter test and, only for possible hits, a set lookup: O(1), in memory,
+    no database. Entries are dropped once their token has expired.
+
+    With TOKEN_REVOCATION_REDIS_URL set, denials are also written to Redis
+    and every worker pulls the new ones at most every SYNC_INTERVAL
+    seconds, so the check itself never waits on the network.
+    """
+
+    def __init__(self, store=None, capacity=100000):
+        redis_url = os.getenv('TOKEN_REVOCATION_REDIS_URL')
+        if store is None and redis_url and redis is not None:
+            store = RedisDenylistStore(redis.Redis.from_url(redis_url))
+        self.store = store
+        self.capacity = capacity
+        self.max_lifetime = 30 * 86400  # Longest token lifetime, set by init_auth_claims()
+        self._lock = threading.Lock()
+        self._denied = {}  # {jti: expires_at}
+        self._bloom = BloomFilter(capacity)
+        self._synced_at = time.time()
+        self._next_sync = 0
+
+    def deny(self, jti, expires_at):
+        """Revoke a token until its expiry (epoch seconds)"""
+        now = time.time()
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._add(jti, expires_at, now)
+        if self.store is not None:
+            self.store.add(jti, expires_at, now)
+
+    def is_denied(self, jti):
+        if self.store is not None and time.time() >= self._next_sync:
+            self.sync()
+        if jti not in self._bloom:
+            return False
+        expires_at = self._denied.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def sync(self):
+        """Pull tokens denied by other workers"""
+        now = time.time()
+        self._next_sync = now + SYNC_INTERVAL
+        try:
+            entries = self.store.since(self._synced_at - SYNC_INTERVAL)  # Overlap for clock skew
+            self.store.prune(now - self.max_lifetime)
+        except Exception as e:
+            print(f"[TOKEN DENYLIST] Sync failed: {e}")
+            return
+        with self._lock:
+            for jti, expires_at in entries:
+                if expires_at > now:
+                    self._add(jti, expires_at, now)
+        self._synced_at = now
+
+    def _add(self, jti, expires_at, now):
+        self._denied[jti] = expires_at
+        self._bloom.add(jti)
+        if len(self._denied) >= self.capacity:
+            # Bloom filters cannot forget; rebuild from the entries still alive
+            self._denied = {key: value for key, value in self._denied.items() if value > now}
+            self.capacity = max(self.capacity, 2 * len(self._denied))
+            bloom = BloomFilter(self.capacity)
+            for key in self._denied:
+                bloom.add(key)
+            self._bloom = bloom
+
+
+# Singleton instance
+token_denylist = TokenDenylist()
@@ -0,0 +1,125 @@
+"""
+Benchmark proximity search for /api/match/discover
+
+Generates a synthetic dataset of users spread across Germany (clustered
+around the big cities, with a rural background), loads it into the geo grid
+used by the discovery index and measures radius queries against a full
+vectorized scan of every user.
+
+Usage: python benchmark_geo.py [users] [queries] [radius_km]
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app.services.geo import GeoGrid, haversine_km
+
+# Germany's bounding box
+LAT_MIN, LAT_MAX = 47.27, 55.06
+LON_MIN, LON_MAX = 5.87, 15.04
+
+# (name, lat, lon, relative population)
+CITIES = [
+    ('Berlin', 52.520, 13.405, 3.7),
+    ('Hamburg', 53.551, 9.994, 1.9),
+    ('Munich', 48.137, 11.576, 1.5),
+    ('Cologne', 50.938, 6.960, 1.1),
+    ('Frankfurt', 50.110, 8.682, 0.8),
+    ('Stuttgart', 48.776, 9.183, 0.6),
+    ('Duesseldorf', 51.228, 6.773, 0.6),
+    ('Leipzig', 51.340, 12.375, 0.6),
+    ('Dortmund', 51.514, 7.468, 0.6),
+    ('Essen', 51.456, 7.012, 0.6),
+    ('Bremen', 53.079, 8.802, 0.6),
+    ('Dresden', 51.050, 13.738, 0.6),
+    ('Hanover', 52.376, 9.732, 0.5),
+    ('Nuremberg', 49.452, 11.077, 0.5),
+    ('Rostock', 54.092, 12.099, 0.2),
+    ('Freiburg', 47.999, 7.842, 0.2),
+]
+
+# Share of users placed uniformly at random instead of around a city
+RURAL_SHARE = 0.25
+
+
+def generate_users(count, seed=42):
+    """Return (lat, lon) arrays for `count` users spread across Germany"""
+    rng = np.random.default_rng(seed)
+
+    rural = int(count * RURAL_SHARE)
+    urban = count - rural
+
+    weights = np.array([city[3] for city in CITIES])
+    city_idx = rng.choice(len(CITIES), size=urban, p=weights / weights.sum())
+    centers = np.array([(city[1], city[2]) for city in CITIES])[city_idx]
+    # ~10 km standard deviation around each city centre
+    spread = rng.normal(0, 1, size=(urban, 2)) * np.array([0.09, 0.14])
+    urban_points = centers + spread
+
+    rural_points = np.column_stack([
+        rng.uniform(LAT_MIN, LAT_MAX, rural),
+        rng.uniform(LON_MIN, LON_MAX, rural),
+    ])
+
+    points = np.vstack([urban_points, rural_points])
+    points[:, 0] = np.clip(points[:, 0], LAT_MIN, LAT_MAX)
+    points[:, 1] = np.clip(points[:, 1], LON_MIN, LON_MAX)
+    rng.shuffle(points)
+    return points[:, 0], points[:, 1]
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    radius = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+
+    print(f"Generating {users:,} users across Germany...")
+    lats, lons = generate_users(users)
+
+    started = time.perf_counter()
+    grid = GeoGrid()
+    for user_id, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist())):
+        grid.upsert(user_id, lat, lon)
+    print(f"Built geo grid in {time.perf_counter() - started:.1f} s")
+
+    rng = np.random.default_rng(7)
+    viewers = rng.choice(users, size=queries, replace=False)
+
+    grid_times, scan_times, found = [], [], []
+    for viewer in viewers.tolist():
+        lat, lon = lats[viewer], lons[viewer]
+
+        started = time.perf_counter()
+        nearby = set().union(*grid.cells_near(lat, lon, radius))
+        rows = np.fromiter(nearby, dtype=np.int64, count=len(nearby))
+        distances = haversine_km(lat, lon, lats[rows], lons[rows])
+        in_range = rows[distances <= radius]
+        grid_times.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        scan = np.nonzero(haversine_km(lat, lon, lats, lons) <= radius)[0]
+        scan_times.append((time.perf_counter() - started) * 1000)
+
+        assert len(scan) == len(in_range), "grid and full scan disagree"
+        found.append(len(in_range))
+
+    def report(name, timings):
+        timings = sorted(timings)
+        print(f"  {name:<10} median {timings[len(timings) // 2]:8.2f} ms   "
+              f"p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms")
+
+    print(f"\n{queries} radius queries of {radius:.0f} km over {users:,} users")
+    print(f"  users in range: median {sorted(found)[len(found) // 2]:,}, max {max(found):,}")
+    report('geo grid', grid_times)
+    report('full scan', scan_times)
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("PROXIMITY SEARCH BENCHMARK")
+    print("=" * 60)
+    main()
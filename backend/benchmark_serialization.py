@@ -0,0 +1,140 @@
+"""
+Benchmark serializing a page of user previews
+
+Builds a page of users with stored photos and serializes it the way the
+incoming likes listing did before (a hand-built dict per user, encoded
+with the standard json module) and does now (the shared LIKE_PREVIEW
+schema, encoded with orjson when it is installed): without the preview
+cache, with every preview missing the cache, and with every preview
+cached. Reports the median time per page for building the dicts and for
+encoding the response.
+
+The users are built in memory and never written, so the database
+(DATABASE_URL, or a temporary SQLite file from scratch_db.py) only has to
+exist.
+
+Usage: python benchmark_serialization.py [page_size] [repeats]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.models import User
+from app.services.photo_store import photo_store
+from app.services.serializers import serialize_user, preview_cache, orjson, LIKE_PREVIEW
+
+WORDS = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'.split()
+
+
+def make_users(count, rng):
+    users = []
+    for _ in range(count):
+        name = f'bench_{uuid.uuid4().hex[:12]}'
+        users.append(User(
+            id=str(uuid.uuid4()), username=name, first_name=name[:10], last_name='Mustermann',
+            age=rng.randint(18, 70), gender=rng.choice(['male', 'female']), city='Berlin',
+            bio=' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))),
+            photos=json.dumps([f'{uuid.uuid4().hex}{uuid.uuid4().hex}.jpg' for _ in range(3)]),
+            goal='relationship', trust_score=rng.randint(0, 100),
+            is_service_provider=rng.random() < 0.1, service_verified=False, hourly_rate=50.0,
+            last_active=datetime.utcnow() - timedelta(minutes=rng.randint(0, 10000)),
+        ))
+    return users
+
+
+def hand_built(user):
+    """The preview dict as get_incoming_likes built it before the shared schema"""
+    return {
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'age': user.age,
+        'gender': user.gender,
+        'city': user.city,
+        'bio': user.bio,
+        'photos': photo_store.urls(user.photos, 'thumb', limit=1),  # Only first photo
+        'goal': user.goal,
+        'trust_score': user.trust_score,
+        'is_service_provider': user.is_service_provider,
+        'service_verified': user.service_verified,
+        'hourly_rate': user.hourly_rate if user.is_service_provider else None
+    }
+
+
+def page(users, serialize):
+    return {
+        'likes': [{'match_id': str(i), 'liked_at': '2024-01-01T00:00:00', 'user': serialize(user)}
+                  for i, user in enumerate(users)],
+        'count': len(users),
+    }
+
+
+def median_ms(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    app, socketio = create_app()
+    users = make_users(page_size, random.Random(42))
+    stdlib_json = DefaultJSONProvider(app)
+
+    def cached(user):
+        return serialize_user(user, LIKE_PREVIEW)
+
+    def cache_misses(user):
+        if user is users[0]:
+            preview_cache.clear()  # Once per page
+        return serialize_user(user, LIKE_PREVIEW)
+
+    scenarios = [
+        ('hand-built + json (before)', hand_built, stdlib_json),
+        ('schema, no cache', LIKE_PREVIEW.dump, app.json),
+        ('schema, cache misses', cache_misses, app.json),
+        ('schema, cached', cached, app.json),
+    ]
+
+    with app.test_request_context('/api/match/likes/incoming'):
+        assert page(users, hand_built) == page(users, LIKE_PREVIEW.dump), \
+            'schema output differs from the hand-built dicts'
+
+        print(f"\nPages of {page_size} users, median of {repeats} runs "
+              f"(JSON backend: {'orjson' if orjson else 'json'})")
+        print(f"  {'scenario':<28} {'build ms':>9} {'encode ms':>10} {'total ms':>9}")
+        baseline = None
+        for name, serialize, provider in scenarios:
+            body = page(users, serialize)
+            build = median_ms(lambda: page(users, serialize), repeats)
+            encode = median_ms(lambda: provider.response(body), repeats)
+            baseline = baseline or build + encode
+            print(f"  {name:<28} {build:>9.3f} {encode:>10.3f} {build + encode:>9.3f}"
+                  f"   ({(build + encode) / baseline:.0%})")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("USER PREVIEW SERIALIZATION BENCHMARK")
+    print("=" * 60)
+    main()
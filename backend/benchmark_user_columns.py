@@ -0,0 +1,157 @@
+"""
+Benchmark loading users for list endpoints: full rows vs preview projections
+
+Seeds users with realistic heavy columns (bio, photos, interests, languages,
+services, Stripe and verification data) and loads pages of them the way the
+list endpoints did before (every column) and do now (the preview
+projection with load_only). Reports the bytes fetched per row and the ORM
+hydration time.
+
+Pass legacy_photo_kb > 0 to store base64 data URLs in users.photos, as
+before the photo store existed.
+
+Seeding writes to DATABASE_URL; leave it unset to benchmark a temporary
+SQLite file (see scratch_db.py), or set it to a scratch PostgreSQL
+database to see real row sizes.
+
+Usage: python benchmark_user_columns.py [users] [page_size] [legacy_photo_kb]
+"""
+import base64
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from sqlalchemy import event
+from sqlalchemy.orm import load_only, undefer_group
+from app import create_app
+from app.models import db, User
+from app.routes.match import PREVIEW_COLUMNS, CANDIDATE_COLUMNS
+from app.routes.admin import USER_LIST_COLUMNS
+
+REPEATS = 15
+
+INTERESTS = ['travel', 'music', 'sport', 'art', 'cooking', 'reading', 'movies', 'hiking',
+             'photography', 'gaming', 'dancing', 'yoga', 'fashion', 'tech', 'nature']
+LANGUAGES = ['German', 'English', 'Russian', 'French', 'Spanish', 'Italian', 'Turkish']
+WORDS = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'.split()
+
+# name -> load options; "before" loads every column, as User.query did
+SCENARIOS = [
+    ('full row (before)', [undefer_group('profile'), undefer_group('billing'), undefer_group('verification')]),
+    ('deferred groups only', []),
+    ('discover candidate', [load_only(*CANDIDATE_COLUMNS)]),
+    ('match/like preview', [load_only(*PREVIEW_COLUMNS)]),
+    ('admin user list', [load_only(*USER_LIST_COLUMNS)]),
+]
+
+
+def seed(count, legacy_photo_kb, rng):
+    legacy_photo = None
+    if legacy_photo_kb:
+        legacy_photo = 'data:image/jpeg;base64,' + base64.b64encode(os.urandom(legacy_photo_kb * 768)).decode()
+
+    for start in range(0, count, 1000):
+        for _ in range(min(1000, count - start)):
+            name = f'bench_{uuid.uuid4().hex[:12]}'
+            photos = [legacy_photo] * 3 if legacy_photo else \
+                [f'{uuid.uuid4().hex}{uuid.uuid4().hex}.jpg' for _ in range(3)]
+            db.session.add(User(
+                id=str(uuid.uuid4()), email=f'{name}@example.com', username=name,
+                password_hash='pbkdf2:sha256:600000$' + uuid.uuid4().hex * 2,
+                first_name=name[:10], last_name='Mustermann', age=rng.randint(18, 70),
+                gender=rng.choice(['male', 'female']), city='Berlin', goal='relationship',
+                latitude=52.5 + rng.random(), longitude=13.4 + rng.random(),
+                bio=' '.join(rng.choice(WORDS) for _ in range(rng.randint(60, 140))),
+                photos=json.dumps(photos),
+                interests=rng.sample(INTERESTS, 6), languages=rng.sample(LANGUAGES, 3),
+                services_offered=['Begleitung', 'Abendessen'] if rng.random() < 0.1 else [],
+                occupation='Software Engineer', company='Example GmbH',
+                stripe_customer_id=f'cus_{uuid.uuid4().hex[:14]}',
+                stripe_subscription_id=f'sub_{uuid.uuid4().hex[:24]}',
+                stripe_identity_session_id=f'vs_{uuid.uuid4().hex[:24]}',
+                identity_document_type='id_card', verification_attempts=1,
+            ))
+        db.session.commit()
+
+
+def load_page(options, page_size, offset):
+    return User.query.options(*options).order_by(User.id).offset(offset).limit(page_size).all()
+
+
+def row_bytes(options, page_size, offset):
+    """Average bytes of the column values the ORM query fetches per row"""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        recorded.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        db.session.expunge_all()
+        load_page(options, page_size, offset)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    # Fetch the same rows again through the driver and measure them
+    statement, parameters = recorded[-1]
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(statement, parameters).fetchall()
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is not None:
+                total += len(value if isinstance(value, bytes) else str(value).encode())
+    return total / max(len(rows), 1)
+
+
+def hydration_ms(options, page_size, offsets):
+    timings = []
+    for offset in offsets:
+        db.session.expunge_all()
+        started = time.perf_counter()
+        load_page(options, page_size, offset)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    legacy_photo_kb = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    app, socketio = create_app()
+    rng = random.Random(42)
+
+    with app.app_context():
+        print(f"Seeding {users:,} users{f' with {legacy_photo_kb} KB data URL photos' if legacy_photo_kb else ''}...")
+        seed(users, legacy_photo_kb, rng)
+
+        offsets = [rng.randrange(0, max(users - page_size, 1)) for _ in range(REPEATS)]
+
+        print(f"\nPages of {page_size} users, median of {REPEATS} loads")
+        print(f"  {'scenario':<22} {'bytes/row':>10} {'page ms':>9}")
+        baseline = None
+        for name, options in SCENARIOS:
+            size = row_bytes(options, page_size, offsets[0])
+            timing = hydration_ms(options, page_size, offsets)
+            baseline = baseline or (size, timing)
+            print(f"  {name:<22} {size:>10,.0f} {timing:>9.2f}"
+                  f"   ({size / baseline[0]:.0%} of bytes, {timing / baseline[1]:.0%} of time)")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("USER COLUMN LOADING BENCHMARK")
+    print("=" * 60)
+    main()
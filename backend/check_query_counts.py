@@ -0,0 +1,106 @@
+"""
+Query-count regression check for match listings
+
+Counts the SQL statements issued by the match and like listing endpoints
+for a user with few and with many matches. The counts must not grow with
+the number of rows; an N+1 lookup (one query per listed user) fails the
+check.
+
+Statement counts do not depend on the backend, so the temporary SQLite
+file from scratch_db.py is enough unless DATABASE_URL says otherwise.
+
+Usage: python check_query_counts.py
+"""
+import os
+import sys
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.models import db, User, Match
+
+ENDPOINTS = [
+    ('matches', '/api/match/matches'),
+    ('incoming likes', '/api/match/likes/incoming'),
+    ('admin matches', '/api/admin/matches?per_page=200'),
+]
+
+SMALL, LARGE = 3, 60
+
+
+def make_user(**kwargs):
+    name = f'qc_{uuid.uuid4().hex[:12]}'
+    user = User(id=str(uuid.uuid4()), email=f'{name}@example.com', username=name,
+                password_hash='x', goal='relationship', age=30, **kwargs)
+    db.session.add(user)
+    return user
+
+
+def make_account(count):
+    """A user with `count` mutual matches and `count` incoming likes"""
+    user = make_user()
+    for _ in range(count):
+        matched = make_user()
+        db.session.add(Match(sender_id=user.id, receiver_id=matched.id, status='matched'))
+        db.session.add(Match(sender_id=matched.id, receiver_id=user.id, status='matched'))
+        liker = make_user()
+        db.session.add(Match(sender_id=liker.id, receiver_id=user.id, status='liked'))
+    db.session.commit()
+    return user.id
+
+
+def main():
+    app, socketio = create_app()
+    client = app.test_client()
+
+    statements = []
+
+    def count_queries(url, token):
+        statements.clear()
+        response = client.get(url, headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200, response.get_json()
+        return len(statements)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        admin = make_user(is_admin=True)
+        db.session.commit()
+        admin_token = create_access_token(identity=admin.id)
+
+    # Measure with a small account first, then again once a large one exists
+    # (the admin listing covers every match in the database)
+    counts = {}
+    for size in (SMALL, LARGE):
+        with app.app_context():
+            token = create_access_token(identity=make_account(size))
+        for name, url in ENDPOINTS:
+            counts[(name, size)] = count_queries(url, admin_token if name.startswith('admin') else token)
+
+    failed = False
+    for name, url in ENDPOINTS:
+        small, large = counts[(name, SMALL)], counts[(name, LARGE)]
+        ok = large <= small
+        failed = failed or not ok
+        print(f"  {'OK  ' if ok else 'FAIL'} {name:<16} {small} queries with {SMALL} rows, {large} with {LARGE}")
+
+    if failed:
+        print("\nFAILED - query count grows with the number of rows")
+        sys.exit(1)
+    print("\nOK - query counts are independent of list size")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MATCH LISTING QUERY COUNT CHECK")
+    print("=" * 60)
+    main()
@@ -0,0 +1,189 @@
+"""
+Query-plan check for the hot chat, match and booking queries
+
+Calls the hot endpoints of match.py, chat.py and payment.py, records every
+SQL statement they issue and runs EXPLAIN on it with the same parameters.
+The check fails if any of them reads a hot table (matches, chats, bookings,
+users) with a full table scan instead of an index.
+
+On PostgreSQL sequential scans are disabled for the EXPLAIN session, so a
+small scratch database still shows whether a usable index exists.
+
+Plans differ between backends: run it against a scratch PostgreSQL
+database through DATABASE_URL as well as on the default temporary SQLite
+file (scratch_db.py).
+
+Usage: python check_query_plans.py
+"""
+import json
+import os
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.models import db, User, Match, Chat, Booking
+
+HOT_TABLES = ('matches', 'chats', 'bookings', 'users')
+
+
+def make_user(**kwargs):
+    name = f'qp_{uuid.uuid4().hex[:12]}'
+    user = User(id=str(uuid.uuid4()), email=f'{name}@example.com', username=name,
+                password_hash='x', goal='relationship', age=30, **kwargs)
+    db.session.add(user)
+    return user
+
+
+def seed():
+    """A user with matches, likes, a conversation and bookings on both sides"""
+    user, provider = make_user(), make_user(is_service_provider=True)
+    partner, liker, target = make_user(), make_user(), make_user()
+
+    match = Match(sender_id=user.id, receiver_id=partner.id, status='matched')
+    db.session.add_all([
+        match,
+        Match(sender_id=partner.id, receiver_id=user.id, status='matched'),
+        Match(sender_id=liker.id, receiver_id=user.id, status='liked'),
+    ])
+    db.session.flush()
+
+    started = datetime.utcnow() - timedelta(hours=1)
+    messages = []
+    for i in range(20):
+        message = Chat(match_id=match.id, sender_id=(user.id, partner.id)[i % 2],
+                       message=f'message {i}', created_at=started + timedelta(minutes=i))
+        db.session.add(message)
+        messages.append(message)
+
+    for client in (user, partner):
+        db.session.add(Booking(client_id=client.id, provider_id=provider.id,
+                               booking_date=datetime.utcnow() + timedelta(days=1),
+                               duration_hours=1, hourly_rate=50, total_amount=50))
+    db.session.commit()
+
+    return {
+        'user': create_access_token(identity=user.id),
+        'provider': create_access_token(identity=provider.id),
+        'match_id': match.id,
+        'message_id': messages[10].id,
+        'target_id': target.id,
+    }
+
+
+def hot_requests(ids):
+    """(name, token key, method, url, json body) of every hot query path"""
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    match_id = ids['match_id']
+    return [
+        ('matches', 'user', 'GET', '/api/match/matches', None),
+        ('matches page', 'user', 'GET', '/api/match/matches?limit=10', None),
+        ('matches delta', 'user', 'GET', f'/api/match/matches?updated_since={since}', None),
+        ('incoming likes page', 'user', 'GET', '/api/match/likes/incoming?limit=10', None),
+        ('incoming likes delta', 'user', 'GET', f'/api/match/likes/incoming?updated_since={since}', None),
+        ('like', 'user', 'POST', '/api/match/like', {'user_id': ids['target_id']}),
+        ('inbox', 'user', 'GET', '/api/chat/inbox', None),
+        ('messages', 'user', 'GET', f'/api/chat/{match_id}/messages', None),
+        ('messages before', 'user', 'GET', f"/api/chat/{match_id}/messages?before_id={ids['message_id']}", None),
+        ('messages after', 'user', 'GET', f"/api/chat/{match_id}/messages?after_id={ids['message_id']}", None),
+        ('send message', 'user', 'POST', f'/api/chat/{match_id}/messages', {'message': 'hello'}),
+        ('bookings as client', 'user', 'GET', '/api/payment/bookings?role=client', None),
+        ('bookings as provider', 'provider', 'GET', '/api/payment/bookings?role=provider', None),
+    ]
+
+
+def sqlite_full_scans(conn, statement, parameters):
+    """Tables read by a full scan according to EXPLAIN QUERY PLAN"""
+    plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        # "SCAN matches" is a full table scan; "SEARCH ... USING INDEX" and
+        # "SCAN ... USING COVERING INDEX" on a subquery result are fine
+        match = re.match(r'SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)', detail)
+        if match and match.group(1) in HOT_TABLES and 'INDEX' not in match.group(3):
+            scans.append(detail)
+    return scans
+
+
+def postgres_full_scans(conn, statement, parameters):
+    """Tables read by a sequential scan according to EXPLAIN"""
+    scans = []
+    # The atomic like sends its advisory lock and CTE as one round trip
+    for part in (p for p in statement.split(';') if p.strip()):
+        plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {part}', parameters).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        stack = [plan[0]['Plan']]
+        while stack:
+            node = stack.pop()
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in HOT_TABLES:
+                scans.append(f"Seq Scan on {node['Relation Name']}")
+            stack.extend(node.get('Plans', []))
+    return scans
+
+
+def main():
+    app, socketio = create_app()
+    client = app.test_client()
+    is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+
+    with app.app_context():
+        ids = seed()
+
+        recorded = []
+
+        def record(conn, cursor, statement, parameters, *args):
+            recorded.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+
+        requests = []
+        for name, token, method, url, body in hot_requests(ids):
+            recorded.clear()
+            response = client.open(url, method=method, json=body,
+                                   headers={'Authorization': f'Bearer {ids[token]}'})
+            assert response.status_code < 300, (name, response.status_code, response.get_json())
+            requests.append((name, list(recorded)))
+
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    failed = False
+    with app.app_context(), db.engine.connect() as conn:
+        if is_postgres:
+            conn.exec_driver_sql('SET enable_seqscan = off')
+        explain = postgres_full_scans if is_postgres else sqlite_full_scans
+
+        for name, statements in requests:
+            problems = []
+            for statement, parameters in statements:
+                if not re.match(r'\s*(SELECT|WITH|UPDATE|DELETE|INSERT INTO \S+ \(.*\) SELECT)', statement, re.I | re.S):
+                    continue
+                for scan in explain(conn, statement, parameters):
+                    problems.append((scan, ' '.join(statement.split())[:160]))
+
+            failed = failed or bool(problems)
+            print(f"  {'OK  ' if not problems else 'FAIL'} {name:<22} {len(statements)} statements")
+            for scan, statement in problems:
+                print(f"         {scan}\n           in: {statement}")
+
+    if failed:
+        print("\nFAILED - hot queries read tables without an index")
+        sys.exit(1)
+    print("\nOK - every hot query uses an index")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("HOT QUERY PLAN CHECK")
+    print("=" * 60)
+    main()
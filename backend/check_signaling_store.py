@@ -0,0 +1,347 @@
+"""
+Behaviour check for WebRTC signaling: stores, routes and Socket.IO events
+
+Runs the same scenarios against the in-process store and the Redis store:
+call start, offers/answers, bounded signal logs, incremental reads with
+after_seq, long-polling, per-call TTL expiry and hangup. Two Redis store instances sharing one client stand in
+for two workers. The Redis store talks to SIGNALING_REDIS_URL when it is
+set and redis is installed, otherwise to a small in-memory stand-in that
+speaks the same commands.
+
+Finally the video routes and the Socket.IO signaling events are exercised
+end to end with a mutual match, seeded into DATABASE_URL or a temporary
+SQLite file (scratch_db.py).
+
+Usage: python check_signaling_store.py
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.models import db, User, Match
+from app.services.signaling_store import LocalSignalingStore, RedisSignalingStore, redis, signaling_store
+
+MAX_SIGNALS = 50
+TTL = 1
+
+
+class LocalRedis:
+    """In-memory stand-in for the Redis commands the signaling store uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def _get(self, key, default):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key, default)
+
+    def pipeline(self):
+        return LocalPipeline(self)
+
+    def hsetnx(self, key, field, value):
+        fields = self.data.setdefault(key, self._get(key, {}))
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, self._get(key, {}))[field] = value
+
+    def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, self._get(key, {}))
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+    def hmget(self, key, *fields):
+        values = self._get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hgetall(self, key):
+        return dict(self._get(key, {}))
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, self._get(key, set())).add(member)
+
+    def scard(self, key):
+        return len(self._get(key, set()))
+
+    def smembers(self, key):
+        return set(self._get(key, set()))
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, self._get(key, [])).append(value)
+
+    def ltrim(self, key, start, end):
+        values = self._get(key, [])
+        end = len(values) if end == -1 else end + 1
+        self.data[key] = values[start:end] if start >= 0 else values[max(len(values) + start, 0):end]
+
+    def lrange(self, key, start, end):
+        values = self._get(key, [])
+        return values[start:] if end == -1 else values[start:end + 1]
+
+    def exists(self, *keys):
+        return sum(self._get(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        if self._get(key, None) is not None:
+            self.expires[key] = time.time() + seconds
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+
+class LocalPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        return lambda *args: self.calls.append((command, args))
+
+    def execute(self):
+        return [command(*args) for command, args in self.calls]
+
+
+def redis_client():
+    redis_url = os.getenv('SIGNALING_REDIS_URL')
+    if redis_url and redis is not None:
+        print(f"Redis store: {redis_url}")
+        return redis.Redis.from_url(redis_url)
+    print("Redis store: in-memory stand-in")
+    return LocalRedis()
+
+
+def check(label, ok):
+    print(f"  {'OK  ' if ok else 'FAIL'} {label}")
+    return ok
+
+
+def check_store(name, store, peer):
+    """peer is a second store instance; it must see the calls of `store` if shared"""
+    print(f"\n{name}")
+    match_id, alice, bob = str(uuid.uuid4()), 'alice', 'bob'
+    results = []
+
+    first = store.start_call(match_id, alice)
+    second = store.start_call(match_id, bob)
+    results.append(check('first caller stays the initiator',
+                         first['initiator'] == alice and second['initiator'] == alice))
+
+    offer = {'type': 'offer', 'sdp': 'v=0 offer'}
+    answer = {'type': 'answer', 'sdp': 'v=0 answer'}
+    store.set_description(match_id, alice, 'offer', offer)
+    store.set_description(match_id, bob, 'answer', answer)
+    for i in range(MAX_SIGNALS + 30):
+        store.add_candidate(match_id, alice, {'candidate': f'c{i}', 'sdpMid': '0'})
+
+    signals = store.get_signals(match_id, alice)
+    results.append(check('offer and answer round-trip',
+                         signals['offer'] == offer and store.get_signals(match_id, bob)['answer'] == answer))
+    candidates = [candidate['candidate'] for candidate in signals['ice_candidates']]
+    results.append(check(f'signal log capped at {MAX_SIGNALS}, newest kept',
+                         len(candidates) == MAX_SIGNALS and candidates[-1] == f'c{MAX_SIGNALS + 29}'))
+    results.append(check('two participants', store.get_call(match_id)['participants'] == 2))
+
+    last_seq = signals['last_seq']
+    for i in range(3):
+        store.add_candidate(match_id, alice, {'candidate': f'n{i}'})
+    delta = store.get_signals(match_id, alice, after_seq=last_seq)
+    results.append(check('after_seq returns only new candidates',
+                         [candidate['candidate'] for candidate in delta['ice_candidates']] == ['n0', 'n1', 'n2']
+                         and delta['offer'] is None and delta['last_seq'] == last_seq + 3))
+    results.append(check('nothing new after last_seq',
+                         store.get_signals(match_id, alice, after_seq=delta['last_seq'])['ice_candidates'] == []))
+    behind = store.get_signals(match_id, alice, after_seq=1)
+    results.append(check('a client behind the log gets the full state',
+                         behind['offer'] == offer and len(behind['ice_candidates']) == MAX_SIGNALS))
+
+    # Long-poll: returns as soon as a candidate arrives, or at the timeout
+    timer = threading.Timer(0.3, store.add_candidate, (match_id, alice, {'candidate': 'late'}))
+    timer.start()
+    started = time.perf_counter()
+    waited = store.wait_for_signals(match_id, alice, delta['last_seq'], 5)
+    elapsed = time.perf_counter() - started
+    results.append(check(f'long-poll wakes on a new candidate ({elapsed * 1000:.0f} ms)',
+                         [candidate['candidate'] for candidate in waited['ice_candidates']] == ['late']
+                         and elapsed < 1))
+    started = time.perf_counter()
+    idle = store.wait_for_signals(match_id, alice, waited['last_seq'], 0.5)
+    elapsed = time.perf_counter() - started
+    results.append(check(f'long-poll times out with nothing new ({elapsed * 1000:.0f} ms)',
+                         idle['ice_candidates'] == [] and 0.45 < elapsed < 1.5))
+
+    shared = peer.get_signals(match_id, alice)['offer'] == offer
+    print(f"  ---- second instance sees the call: {shared}")
+
+    timer = threading.Timer(0.3, store.end_call, (match_id,))
+    timer.start()
+    started = time.perf_counter()
+    ended = store.wait_for_signals(match_id, alice, waited['last_seq'], 5)
+    results.append(check('hangup wakes a waiting poll',
+                         not ended['active'] and time.perf_counter() - started < 1))
+    results.append(check('hangup removes the call',
+                         store.get_call(match_id) is None and store.get_signals(match_id, alice)['offer'] is None))
+
+    idle_id = str(uuid.uuid4())
+    store.set_description(idle_id, alice, 'offer', offer)
+    time.sleep(TTL + 0.2)
+    results.append(check(f'idle call expires after {TTL}s', store.get_call(idle_id) is None))
+    return all(results), shared
+
+
+def check_collection():
+    print("\nIn-process store collection")
+    store = LocalSignalingStore(TTL, MAX_SIGNALS, max_calls=3)
+    ids = [str(uuid.uuid4()) for _ in range(5)]
+    for match_id in ids:
+        store.start_call(match_id, 'alice')
+    results = [check('at most max_calls calls, least recently active dropped',
+                     [store.get_call(match_id) is not None for match_id in ids] == [False, False, True, True, True])]
+    time.sleep(TTL + 0.2)
+    store.start_call(str(uuid.uuid4()), 'alice')
+    results.append(check('expired calls are collected on the next write', len(store._calls) == 1))
+    return all(results)
+
+
+def seed_match(app):
+    """A mutual match between two users, and an outsider; returns ids and tokens"""
+    with app.app_context():
+        users = []
+        for _ in range(3):
+            name = f'sig_{uuid.uuid4().hex[:12]}'
+            user = User(id=str(uuid.uuid4()), email=f'{name}@example.com', username=name,
+                        password_hash='x', goal='relationship', age=30)
+            db.session.add(user)
+            users.append(user)
+        alice, bob, eve = users
+        db.session.add(Match(sender_id=alice.id, receiver_id=bob.id, status='matched'))
+        match = Match(sender_id=bob.id, receiver_id=alice.id, status='matched')
+        db.session.add(match)
+        db.session.commit()
+        match_id = match.id
+        tokens = {user.id: create_access_token(identity=user.id) for user in users}
+        return match_id, alice.id, bob.id, eve.id, tokens
+
+
+def check_routes(app):
+    print("\nVideo routes")
+    client = app.test_client()
+    match_id, alice, bob, eve, tokens = seed_match(app)
+    headers = {user_id: {'Authorization': f'Bearer {token}'} for user_id, token in tokens.items()}
+
+    offer = {'type': 'offer', 'sdp': 'v=0'}
+    results = [
+        check('initiate', client.post('/api/video/call/initiate', json={'match_id': match_id},
+                                      headers=headers[alice]).status_code == 200),
+        check('offer', client.post('/api/video/call/offer', json={'match_id': match_id, 'offer': offer},
+                                   headers=headers[alice]).status_code == 200),
+        check('ICE candidate', client.post('/api/video/call/ice-candidate',
+                                           json={'match_id': match_id, 'candidate': {'candidate': 'c0'}},
+                                           headers=headers[alice]).status_code == 200),
+    ]
+    polled = client.get(f'/api/video/call/poll?match_id={match_id}', headers=headers[bob]).get_json()
+    results.append(check('peer polls the offer and candidate',
+                         polled.get('offer') == offer and polled.get('ice_candidates') == [{'candidate': 'c0'}]))
+    client.post('/api/video/call/ice-candidate', json={'match_id': match_id, 'candidate': {'candidate': 'c1'}},
+                headers=headers[alice])
+    delta = client.get(f"/api/video/call/poll?match_id={match_id}&after_seq={polled['last_seq']}&wait=2",
+                       headers=headers[bob]).get_json()
+    results.append(check('incremental long-poll returns only the new candidate',
+                         delta.get('ice_candidates') == [{'candidate': 'c1'}] and delta.get('offer') is None))
+    results.append(check('outsider cannot signal', client.post(
+        '/api/video/call/offer', json={'match_id': match_id, 'offer': offer}, headers=headers[eve]).status_code == 404))
+    status = client.get(f'/api/video/call/status?match_id={match_id}', headers=headers[bob]).get_json()
+    results.append(check('status', status['active'] and status['initiator'] == alice))
+    client.post('/api/video/call/end', json={'match_id': match_id}, headers=headers[bob])
+    status = client.get(f'/api/video/call/status?match_id={match_id}', headers=headers[bob]).get_json()
+    results.append(check('ended', not status['active']))
+    return all(results)
+
+
+def check_socket_events(app, socketio):
+    print("\nSocket.IO signaling")
+    match_id, alice, bob, eve, tokens = seed_match(app)
+    clients = {user_id: socketio.test_client(app, auth={'token': token}) for user_id, token in tokens.items()}
+    for sc in clients.values():
+        sc.emit('join_match', {'match_id': match_id})
+        sc.get_received()
+
+    def received(user_id, event):
+        return [message['args'][0] for message in clients[user_id].get_received() if message['name'] == event]
+
+    offer = {'type': 'offer', 'sdp': 'v=0'}
+    answer = {'type': 'answer', 'sdp': 'v=0'}
+    clients[alice].emit('call_offer', {'match_id': match_id, 'offer': offer})
+    results = [check('offer reaches the peer', [event['offer'] for event in received(bob, 'call_offer')] == [offer])]
+    results.append(check('no echo to the sender', received(alice, 'call_offer') == []))
+
+    clients[bob].emit('call_answer', {'match_id': match_id, 'answer': answer})
+    results.append(check('answer reaches the caller',
+                         [event['answer'] for event in received(alice, 'call_answer')] == [answer]))
+
+    for i in range(3):
+        clients[alice].emit('ice_candidate', {'match_id': match_id, 'candidate': {'candidate': f'c{i}'}})
+    deltas = received(bob, 'ice_candidate')
+    results.append(check('each ICE candidate is sent once, as a delta',
+                         [event['candidate']['candidate'] for event in deltas] == ['c0', 'c1', 'c2']))
+
+    with app.app_context():
+        stored = signaling_store.get_signals(match_id, alice)
+    results.append(check('signals are kept for late joiners',
+                         stored['offer'] == offer and len(stored['ice_candidates']) == 3))
+
+    # The outsider could not join the room, so cannot signal into it
+    clients[eve].emit('call_offer', {'match_id': match_id, 'offer': {'type': 'offer', 'sdp': 'evil'}})
+    results.append(check('outsider cannot signal', received(bob, 'call_offer') == []))
+
+    clients[bob].emit('call_hangup', {'match_id': match_id})
+    results.append(check('hangup reaches the caller', len(received(alice, 'call_hangup')) == 1))
+    results.append(check('hangup ends the call', signaling_store.get_call(match_id) is None))
+
+    for sc in clients.values():
+        sc.disconnect()
+    return all(results)
+
+
+def main():
+    local_ok, _ = check_store('In-process store', LocalSignalingStore(TTL, MAX_SIGNALS),
+                              LocalSignalingStore(TTL, MAX_SIGNALS))
+    local_ok = check_collection() and local_ok
+    client = redis_client()
+    redis_ok, shared = check_store('Redis store', RedisSignalingStore(client, TTL, MAX_SIGNALS, poll_interval=0.05),
+                                   RedisSignalingStore(client, TTL, MAX_SIGNALS))
+    redis_ok = check('workers share calls through Redis', shared) and redis_ok
+    app, socketio = create_app()
+    routes_ok = check_routes(app)
+    events_ok = check_socket_events(app, socketio)
+
+    if not (local_ok and redis_ok and routes_ok and events_ok):
+        print("\nFAILED")
+        sys.exit(1)
+    print("\nOK - both stores behave the same and signals are relayed")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("WEBRTC SIGNALING CHECK")
+    print("=" * 60)
+    main()
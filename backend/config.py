@@ -20,14 +20,31 @@ class Config:
     } if 'postgresql' in os.getenv('DATABASE_URL', '') else {}
     DATABASE_SCHEMA = os.getenv('DATABASE_SCHEMA', 'public')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=30)
+    # Short-lived access tokens; clients renew them at /api/auth/refresh
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', '15')))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '30')))
+    # Bans, deactivations and plan changes revoke tokens through a revocation
+    # list. Without Redis it lives in each process and a ban only reaches the
+    # worker that made it, so the app refuses to start without this unless
+    # SINGLE_PROCESS=1 declares a single-process server (python run.py sets
+    # it). Any multi-worker setup, e.g. gunicorn -w 4, needs this set.
+    TOKEN_REVOCATION_REDIS_URL = os.getenv('TOKEN_REVOCATION_REDIS_URL')
     STRIPE_API_KEY = os.getenv('STRIPE_SECRET_KEY') or os.getenv('STRIPE_API_KEY')
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+    # Plans and the features they unlock. basic, premium and vip are sold
+    # through Stripe; standard is kept for existing subscribers.
     SUBSCRIPTION_PLANS = {
-        'free': {'name': 'Free', 'price': 0, 'ai_assistant': False, 'cinema': False, 'booking': False, 'max_matches': 10},
-        'standard': {'name': 'Standard', 'price': 9.99, 'ai_assistant': True, 'cinema': True, 'booking': False, 'max_matches': 50},
-        'premium': {'name': 'Premium', 'price': 19.99, 'ai_assistant': True, 'cinema': True, 'booking': True, 'max_matches': -1}
+        'free': {'name': 'Free', 'price': 0, 'ai_assistant': False, 'cinema': False, 'booking': False,
+                 'video_chat': False, 'unlimited_likes': False, 'priority_support': False, 'max_matches': 10},
+        'basic': {'name': 'Basic', 'price': 9.99, 'ai_assistant': False, 'cinema': True, 'booking': False,
+                  'video_chat': False, 'unlimited_likes': False, 'priority_support': False, 'max_matches': 50},
+        'standard': {'name': 'Standard', 'price': 9.99, 'ai_assistant': True, 'cinema': True, 'booking': False,
+                     'video_chat': False, 'unlimited_likes': False, 'priority_support': False, 'max_matches': 50},
+        'premium': {'name': 'Premium', 'price': 19.99, 'ai_assistant': True, 'cinema': True, 'booking': True,
+                    'video_chat': True, 'unlimited_likes': True, 'priority_support': False, 'max_matches': -1},
+        'vip': {'name': 'VIP', 'price': 29.99, 'ai_assistant': True, 'cinema': True, 'booking': True,
+                'video_chat': True, 'unlimited_likes': True, 'priority_support': True, 'max_matches': -1}
     }
 
 config = {'development': Config, 'default': Config}
@@ -0,0 +1,58 @@
+"""
+Migration to add per-participant read watermarks to the matches table
+
+Backfills each side's watermark from the chats already flagged is_read, so
+existing conversations keep their read state.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from sqlalchemy import text, inspect
+
+COLUMNS = ['sender_last_read_at', 'receiver_last_read_at']
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        schema = os.getenv('DATABASE_SCHEMA', 'public') if is_postgres else None
+        matches = f"{schema}.matches" if schema else "matches"
+        chats = f"{schema}.chats" if schema else "chats"
+
+        existing = {column['name'] for column in inspect(db.engine).get_columns('matches', schema=schema)}
+
+        try:
+            for column in COLUMNS:
+                if column in existing:
+                    print(f"  Column already exists: {column}")
+                else:
+                    db.session.execute(text(f"ALTER TABLE {matches} ADD COLUMN {column} TIMESTAMP"))
+                    print(f"  Added column: {column}")
+
+            # A side has read up to the newest message from the other side marked is_read
+            for column, reader in (('sender_last_read_at', 'sender_id'), ('receiver_last_read_at', 'receiver_id')):
+                result = db.session.execute(text(f"""
+                    UPDATE {matches} SET {column} = (
+                        SELECT MAX(c.created_at) FROM {chats} c
+                        WHERE c.match_id = {matches}.id
+                          AND c.sender_id <> {matches}.{reader}
+                          AND c.is_read = :read
+                    )
+                    WHERE {column} IS NULL
+                """), {'read': True})
+                print(f"  Backfilled {column} for {result.rowcount} rows")
+
+            db.session.commit()
+        except Exception as e:
+            print(f"  Migration failed: {str(e)}")
+            db.session.rollback()
+
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,82 @@
+"""
+Migration to add inbox counters (last message preview, unread counts) to the matches table
+
+Run after migrate_chat_read_watermarks.py: unread counts are backfilled
+from the read watermarks.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from sqlalchemy import text, inspect
+
+COLUMNS = [
+    ('last_message_at', 'TIMESTAMP'),
+    ('last_message_preview', 'VARCHAR(200)'),
+    ('last_message_sender_id', 'VARCHAR(36)'),
+    ('sender_unread_count', 'INTEGER DEFAULT 0'),
+    ('receiver_unread_count', 'INTEGER DEFAULT 0'),
+]
+
+# Must match PREVIEW_LENGTH in app/routes/chat.py
+PREVIEW_LENGTH = 100
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        schema = os.getenv('DATABASE_SCHEMA', 'public') if is_postgres else None
+        matches = f"{schema}.matches" if schema else "matches"
+        chats = f"{schema}.chats" if schema else "chats"
+
+        existing = {column['name'] for column in inspect(db.engine).get_columns('matches', schema=schema)}
+
+        try:
+            for column, column_type in COLUMNS:
+                if column in existing:
+                    print(f"  Column already exists: {column}")
+                else:
+                    db.session.execute(text(f"ALTER TABLE {matches} ADD COLUMN {column} {column_type}"))
+                    print(f"  Added column: {column}")
+
+            # Last message of every match
+            latest = f"""
+                SELECT {{field}} FROM {chats} c
+                WHERE c.match_id = {matches}.id
+                ORDER BY c.created_at DESC, c.id DESC LIMIT 1
+            """
+            result = db.session.execute(text(f"""
+                UPDATE {matches} SET
+                    last_message_at = ({latest.format(field='c.created_at')}),
+                    last_message_preview = ({latest.format(field=f'SUBSTR(c.message, 1, {PREVIEW_LENGTH})')}),
+                    last_message_sender_id = ({latest.format(field='c.sender_id')})
+                WHERE last_message_at IS NULL
+            """))
+            print(f"  Backfilled last message for {result.rowcount} rows")
+
+            # Messages from the other side newer than each side's read watermark
+            for column, reader, watermark in (('sender_unread_count', 'sender_id', 'sender_last_read_at'),
+                                              ('receiver_unread_count', 'receiver_id', 'receiver_last_read_at')):
+                db.session.execute(text(f"""
+                    UPDATE {matches} SET {column} = (
+                        SELECT COUNT(*) FROM {chats} c
+                        WHERE c.match_id = {matches}.id
+                          AND c.sender_id <> {matches}.{reader}
+                          AND ({matches}.{watermark} IS NULL OR c.created_at > {matches}.{watermark})
+                    )
+                """))
+                print(f"  Backfilled {column}")
+
+            db.session.commit()
+        except Exception as e:
+            print(f"  Migration failed: {str(e)}")
+            db.session.rollback()
+
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,74 @@
+"""
+Migration to create indexes and constraints declared in models.py on existing databases
+(db.create_all() only creates them for new tables)
+
+Run migrate_match_updated_at.py first: the match listing indexes cover updated_at.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from sqlalchemy import text
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ("uq_matches_sender_receiver", "matches", "sender_id, receiver_id", True),
+    ("ix_matches_sender_status_updated", "matches", "sender_id, status, updated_at", False),
+    ("ix_matches_receiver_status_updated", "matches", "receiver_id, status, updated_at", False),
+    ("ix_chats_match_created", "chats", "match_id, created_at, id", False),
+    ("ix_bookings_provider_created", "bookings", "provider_id, created_at", False),
+    ("ix_bookings_client_created", "bookings", "client_id, created_at", False),
+    ("ix_users_stripe_subscription_id", "users", "stripe_subscription_id", False),
+]
+
+def find_duplicate_swipes(table):
+    """Pairs with more than one swipe in the same direction block the unique index"""
+    return db.session.execute(text(f"""
+        SELECT sender_id, receiver_id, COUNT(*)
+        FROM {table}
+        GROUP BY sender_id, receiver_id
+        HAVING COUNT(*) > 1
+    """)).fetchall()
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        schema = os.getenv('DATABASE_SCHEMA', 'public') if is_postgres else None
+
+        for index_name, table_name, columns, unique in INDEXES:
+            table = f"{schema}.{table_name}" if schema else table_name
+
+            if index_name == "uq_matches_sender_receiver":
+                duplicates = find_duplicate_swipes(table)
+                if duplicates:
+                    print(f"  Skipping {index_name}: {len(duplicates)} sender/receiver pairs have duplicate rows")
+                    for sender_id, receiver_id, count in duplicates[:20]:
+                        print(f"    {sender_id} -> {receiver_id}: {count} rows")
+                    print("  Remove the duplicates (check chats referencing them first) and run again.")
+                    continue
+
+            try:
+                db.session.execute(text(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+                ))
+                db.session.commit()
+                print(f"  Index ready: {index_name} on {table_name} ({columns})")
+            except Exception as e:
+                print(f"  Error creating {index_name}: {str(e)}")
+                db.session.rollback()
+
+        if is_postgres:
+            # Refresh planner statistics so the new indexes are picked up right away
+            for table_name in sorted({table_name for _, table_name, _, _ in INDEXES}):
+                db.session.execute(text(f"ANALYZE {schema}.{table_name}"))
+            db.session.commit()
+
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,43 @@
+"""
+Migration to add latitude/longitude to the users table (proximity search in discovery)
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from sqlalchemy import text, inspect
+
+NEW_COLUMNS = [
+    ("latitude", "DOUBLE PRECISION"),
+    ("longitude", "DOUBLE PRECISION"),
+]
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        schema = os.getenv('DATABASE_SCHEMA', 'public') if is_postgres else None
+        table = f"{schema}.users" if schema else "users"
+
+        existing = {column['name'] for column in inspect(db.engine).get_columns('users', schema=schema)}
+
+        for column_name, column_type in NEW_COLUMNS:
+            if column_name in existing:
+                print(f"  Column already exists: {column_name}")
+                continue
+            try:
+                db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_name} {column_type}"))
+                db.session.commit()
+                print(f"  Added column: {column_name}")
+            except Exception as e:
+                print(f"  Error adding {column_name}: {str(e)}")
+                db.session.rollback()
+
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,41 @@
+"""
+Migration to add updated_at to the matches table (delta sync for match and like listings)
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from sqlalchemy import text, inspect
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        schema = os.getenv('DATABASE_SCHEMA', 'public') if is_postgres else None
+        table = f"{schema}.matches" if schema else "matches"
+
+        existing = {column['name'] for column in inspect(db.engine).get_columns('matches', schema=schema)}
+
+        try:
+            if 'updated_at' in existing:
+                print("  Column already exists: updated_at")
+            else:
+                db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP"))
+                print("  Added column: updated_at")
+
+            # Existing rows count as last changed when they were created
+            result = db.session.execute(text(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL"))
+            db.session.commit()
+            print(f"  Backfilled updated_at for {result.rowcount} rows")
+        except Exception as e:
+            print(f"  Migration failed: {str(e)}")
+            db.session.rollback()
+
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,44 @@
+"""
+Migration to add position_anchored_at to the movie_sessions table (playback clock anchor, separate from updated_at)
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from sqlalchemy import text, inspect
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        schema = os.getenv('DATABASE_SCHEMA', 'public') if is_postgres else None
+        table = f"{schema}.movie_sessions" if schema else "movie_sessions"
+
+        existing = {column['name'] for column in inspect(db.engine).get_columns('movie_sessions', schema=schema)}
+
+        try:
+            if 'position_anchored_at' in existing:
+                print("  Column already exists: position_anchored_at")
+            else:
+                db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN position_anchored_at TIMESTAMP"))
+                print("  Added column: position_anchored_at")
+
+            # Until now updated_at was the anchor of current_time
+            result = db.session.execute(text(
+                f"UPDATE {table} SET position_anchored_at = COALESCE(updated_at, created_at) "
+                f"WHERE position_anchored_at IS NULL"
+            ))
+            db.session.commit()
+            print(f"  Backfilled position_anchored_at for {result.rowcount} rows")
+        except Exception as e:
+            print(f"  Migration failed: {str(e)}")
+            db.session.rollback()
+
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,68 @@
+"""
+Migration to move profile photos out of users.photos into the photo store
+
+Older clients saved photos as base64 data URLs inside the users row. Each
+data URL is written to the photo store (with thumbnails) and replaced by
+its photo key. URLs that are not data URLs are left untouched. Safe to run
+more than once.
+"""
+import sys
+import os
+import json
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import User
+from app.services.photo_store import photo_store, load_photos
+
+BATCH_SIZE = 100
+
+def migrate():
+    app, socketio = create_app()
+
+    with app.app_context():
+        migrated = photos_stored = failed = 0
+        last_id = ''
+
+        # Page by id so only one batch of (possibly huge) rows is in memory
+        while True:
+            users = User.query.filter(User.id > last_id).order_by(User.id).limit(BATCH_SIZE).all()
+            if not users:
+                break
+            last_id = users[-1].id
+
+            for user in users:
+                photos = load_photos(user.photos)
+                if not any(isinstance(p, str) and p.startswith('data:') for p in photos):
+                    continue
+
+                keys = []
+                for photo in photos:
+                    if isinstance(photo, str) and photo.startswith('data:'):
+                        try:
+                            keys.append(photo_store.save_data_url(photo))
+                            photos_stored += 1
+                        except ValueError as e:
+                            # Keep undecodable photos as they are rather than losing them
+                            print(f"  User {user.id}: could not store photo: {str(e)}")
+                            keys.append(photo)
+                            failed += 1
+                    else:
+                        keys.append(photo)
+
+                user.photos = json.dumps(keys)
+                migrated += 1
+
+            db.session.commit()
+            db.session.expunge_all()
+            print(f"  Processed users up to {last_id}")
+
+        print(f"  Users migrated: {migrated}")
+        print(f"  Photos stored:  {photos_stored}")
+        print(f"  Photos failed:  {failed}")
+        print("Migration completed!")
+
+if __name__ == '__main__':
+    migrate()
@@ -4,6 +4,10 @@ from app import create_app
 
 load_dotenv()
 
+if __name__ == '__main__':
+    # The development server below runs in one process
+    os.environ.setdefault('SINGLE_PROCESS', '1')
+
 app, socketio = create_app(os.getenv('FLASK_ENV', 'development'))
 
 if __name__ == '__main__':
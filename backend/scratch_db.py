@@ -0,0 +1,33 @@
+"""
+Scratch database for the check, benchmark, stress and simulation scripts
+
+The scripts create their own users, matches and sessions. They use
+DATABASE_URL when it is set (point it at a scratch database, never at
+production); otherwise they get a private temporary SQLite file, created
+with mkstemp so no other process can take the name, and removed at exit.
+
+Call use_scratch_database() before importing the app: the models read
+DATABASE_URL when they are imported. The scripts run in one process, so it
+also sets SINGLE_PROCESS for the in-process token revocation list.
+"""
+import atexit
+import os
+import tempfile
+
+
+def use_scratch_database():
+    """DATABASE_URL, set to a new temporary SQLite file if it is unset"""
+    if not os.getenv('DATABASE_URL'):
+        fd, path = tempfile.mkstemp(prefix='dating_scratch_', suffix='.db')
+        os.close(fd)
+        atexit.register(_remove, path)
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ.setdefault('SINGLE_PROCESS', '1')
+    return os.environ['DATABASE_URL']
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,348 @@
+"""
+Drift simulation for watch-together playback sync
+
+Simulates two MovieTheater clients watching one session, in simulated
+time, under injected network latency and jitter, wrong client clocks,
+media clocks running slightly fast or slow, and buffering stalls. The
+server side is the real SessionClocks; the client side mirrors
+frontend/src/utils/movieSync.js: NTP-style clock offset estimation,
+play-at scheduling, drift correction through the playback rate, and a
+hard seek plus a drift report only past DRIFT_SEEK.
+
+For every latency profile it prints how far each client drifts from the
+server clock and from the other client, how many drift reports were sent
+and how many database writes the session cost, next to the writes of the
+previous protocol (each client PUTting current_time every second).
+
+Finally the movie routes are run against a real database (DATABASE_URL,
+or a temporary SQLite file from scratch_db.py) to check that editing the
+movie details during playback does not move the playback clock.
+
+Usage: python simulate_movie_sync.py [minutes] [seed]
+"""
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.models import db, User, Match
+from app.services.session_clock import SessionClocks, session_clocks, PLAY_LEAD_SECONDS
+
+# Client constants, as in frontend/src/utils/movieSync.js
+DRIFT_IGNORE = 0.04        # Seconds of drift left alone...
+DRIFT_SETTLED = 0.01       # ...until a correction brings it under this
+DRIFT_SEEK = 1.0           # Seconds of drift corrected by seeking (and reported)
+MAX_RATE_CHANGE = 0.05     # Largest playback rate correction (5%)
+CORRECTION_WINDOW = 2.0    # Seconds over which drift is corrected by rate
+CORRECTION_INTERVAL = 0.25
+SYNC_SAMPLES = 8
+
+TICK = 0.01
+START = 1_700_000_000.0    # Simulated server epoch at the start
+
+# name: (base one-way latency, mean jitter, upload/download asymmetry, stalls per minute)
+PROFILES = [
+    ('lan', 0.005, 0.002, 1.0, 0),
+    ('broadband', 0.030, 0.015, 1.0, 0),
+    ('mobile', 0.080, 0.060, 2.0, 0),
+    ('mobile + stalls', 0.080, 0.060, 2.0, 0.5),
+]
+
+# (minute, client, action, status, position): what the users do
+SCRIPT = [
+    (0.02, 0, 'play', 'playing', 0.0),  # Once both clients have synced their clocks
+    (0.3, 1, 'seek', None, 600.0),
+    (0.5, 0, 'pause', 'paused', None),
+    (0.55, 1, 'play', 'playing', None),
+    (0.8, 0, 'seek', None, 120.0),
+]
+
+# Inter-client drift (p95, seconds) a profile without stalls must stay under
+MAX_P95_DRIFT = 0.1
+
+
+class Network:
+    def __init__(self, rng, base, jitter, asymmetry):
+        self.rng = rng
+        self.base = base
+        self.jitter = jitter
+        self.asymmetry = asymmetry
+
+    def up(self):
+        return (self.base + self.rng.expovariate(1 / self.jitter)) * self.asymmetry
+
+    def down(self):
+        return self.base + self.rng.expovariate(1 / self.jitter)
+
+
+class Client:
+    """A MovieTheater client: clock, media element and sync logic"""
+
+    def __init__(self, name, rng, network, stalls_per_minute):
+        self.name = name
+        self.rng = rng
+        self.network = network
+        self.clock_error = rng.uniform(-2.0, 2.0)    # Client clock minus server clock
+        self.media_skew = rng.uniform(-0.003, 0.003)  # Media clock speed error
+        self.stall_rate = stalls_per_minute / 60
+        self.offset = 0.0  # Estimated server minus client clock
+        self.state = None
+        self.position = 0.0
+        self.playing = False
+        self.rate = 1.0
+        self.correcting = False
+        self.stalled_until = 0.0
+        self.reports = 0
+
+    def now(self, t):
+        return t + self.clock_error
+
+    def server_now(self, t):
+        return self.now(t) + self.offset
+
+    def sync_clock(self, t):
+        """NTP-style probes; the offset of the one with the smallest round trip, and how long they took"""
+        best, elapsed = None, 0.0
+        for _ in range(SYNC_SAMPLES):
+            up, down = self.network.up(), self.network.down()
+            t0 = self.now(t + elapsed)
+            t1 = t2 = t + elapsed + up  # Server clock
+            t3 = self.now(t + elapsed + up + down)
+            sample = ((t3 - t0) - (t2 - t1), ((t1 - t0) + (t2 - t3)) / 2)
+            if best is None or sample[0] < best[0]:
+                best = sample
+            elapsed += up + down
+        return best[1], elapsed
+
+    def target(self, t):
+        state = self.state
+        if state['status'] != 'playing':
+            return state['position']
+        return state['position'] + max(self.server_now(t) - state['play_at'], 0.0)
+
+    def correct(self, t, send):
+        """Same decisions as correctDrift() in movieSync.js"""
+        if self.state is None:
+            return
+        target = self.target(t)
+        if self.state['status'] != 'playing':
+            self.playing, self.rate, self.correcting = False, 1.0, False
+            if abs(self.position - target) > DRIFT_IGNORE:
+                self.position = target
+            return
+        if self.server_now(t) < self.state['play_at']:
+            # Wait for the play-at time
+            self.playing, self.rate, self.position = False, 1.0, self.state['position']
+            return
+        self.playing = True
+        drift = self.position - target
+        if abs(drift) >= DRIFT_SEEK:
+            self.position, self.rate, self.correcting = target, 1.0, False
+            self.reports += 1
+            send(self, 'movie_drift', {'position': self.position})
+            return
+        self.correcting = abs(drift) > (DRIFT_SETTLED if self.correcting else DRIFT_IGNORE)
+        if self.correcting:
+            self.rate = 1 - max(-MAX_RATE_CHANGE, min(MAX_RATE_CHANGE, drift / CORRECTION_WINDOW))
+        else:
+            self.rate = 1.0
+
+    def start_on_time(self, t):
+        """The play-at timer: start playback the moment the server clock reaches play_at"""
+        state = self.state
+        if state and state['status'] == 'playing' and not self.playing and self.server_now(t) >= state['play_at']:
+            self.playing, self.position = True, self.target(t)
+
+    def advance(self, t, dt):
+        if self.playing and t >= self.stalled_until:
+            if self.stall_rate and self.rng.random() < self.stall_rate * dt:
+                self.stalled_until = t + self.rng.uniform(0.5, 3.0)
+            else:
+                self.position += dt * self.rate * (1 + self.media_skew)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0.0
+
+
+def simulate(profile, minutes, seed):
+    name, base, jitter, asymmetry, stalls = profile
+    rng = random.Random(seed)
+    network = Network(rng, base, jitter, asymmetry)
+    clients = [Client(f'client {i + 1}', rng, network, stalls) for i in range(2)]
+
+    clocks = SessionClocks()
+    row = SimpleNamespace(id='session', status='selecting', current_time=0.0,
+                          position_anchored_at=datetime.utcfromtimestamp(START), started_at=None, ended_at=None)
+    writes = 0
+    inbox = []  # (deliver_at, recipient or None for the server, event, data, sender)
+
+    def sync(client, t):
+        offset, elapsed = client.sync_clock(t)
+        inbox.append((t + elapsed, client, 'synced', offset, None))
+
+    def send(client, event, data):
+        inbox.append((t + network.up(), None, event, data, client))
+
+    def broadcast(t):
+        state = clocks.get(row).to_dict(now=t)
+        for client in clients:
+            inbox.append((t + network.down(), client, 'movie_state', state, None))
+
+    t = START
+    for client in clients:
+        sync(client, t)
+
+    script = sorted(SCRIPT)
+    duration = minutes * 60
+    next_correction = t
+    to_server, between = [[] for _ in clients], []
+
+    while t < START + duration:
+        # Scripted user actions, sent with the acting client's own position
+        while script and START + script[0][0] * duration <= t:
+            _, index, action, status, position = script.pop(0)
+            client = clients[index]
+            if position is None and action == 'pause':
+                position = client.position
+            send(client, 'movie_control', {'status': status, 'position': position})
+
+        # Deliver due messages
+        due = [message for message in inbox if message[0] <= t]
+        inbox[:] = [message for message in inbox if message[0] > t]
+        for _, recipient, event, data, sender in sorted(due, key=lambda message: message[0]):
+            if recipient is None and event == 'movie_control':
+                if clocks.update(row, status=data['status'], position=data['position'], now=t,
+                                 lead=PLAY_LEAD_SECONDS):
+                    writes += 1
+                    broadcast(t)
+            elif recipient is None and event == 'movie_drift':
+                # Answer the reporting client only, and let it re-measure its clock
+                inbox.append((t + network.down(), sender, 'movie_state', clocks.get(row).to_dict(now=t), None))
+                sync(sender, t)
+            elif event == 'synced':
+                recipient.offset = data
+            elif event == 'movie_state':
+                recipient.state = data
+                recipient.correct(t, send)
+
+        if t >= next_correction:
+            for client in clients:
+                client.correct(t, send)
+            next_correction = t + CORRECTION_INTERVAL
+
+        for client in clients:
+            client.start_on_time(t)
+            client.advance(t, TICK)
+
+        # Measure once playback has settled after the last change
+        clock = clocks.get(row)
+        if clock.status == 'playing' and t >= clock.anchor + 1.0 and round((t - START) / TICK) % 10 == 0:
+            server_position = clock.position_at(t)
+            for index, client in enumerate(clients):
+                to_server[index].append(abs(client.position - server_position))
+            between.append(abs(clients[0].position - clients[1].position))
+        t += TICK
+
+    return {
+        'name': name,
+        'stalls': stalls,
+        'to_server': to_server,
+        'between': between,
+        'reports': sum(client.reports for client in clients),
+        'writes': writes,
+        'previous_writes': int(duration) * len(clients),
+        'clock_errors': [abs(client.offset + client.clock_error) for client in clients],
+    }
+
+
+def check_details_edit():
+    """A details-only PUT while playing must leave position and play-at alone"""
+    app, socketio = create_app()
+    client = app.test_client()
+    with app.app_context():
+        users = []
+        for _ in range(2):
+            name = f'movie_{uuid.uuid4().hex[:12]}'
+            user = User(id=str(uuid.uuid4()), email=f'{name}@example.com', username=name,
+                        password_hash='x', goal='relationship', age=30)
+            db.session.add(user)
+            users.append(user)
+        match = Match(sender_id=users[0].id, receiver_id=users[1].id, status='matched')
+        db.session.add(match)
+        db.session.commit()
+        match_id = match.id
+        headers = {'Authorization': f'Bearer {create_access_token(identity=users[0].id)}'}
+
+    base = f'/api/movie/{match_id}/session'
+    session_id = client.post(base, json={'movie_url': 'https://example.com/movie.mp4'},
+                             headers=headers).get_json()['session']['id']
+    played = client.put(f'{base}/{session_id}', json={'status': 'playing', 'current_time': 100.0},
+                        headers=headers).get_json()['session']
+    time.sleep(PLAY_LEAD_SECONDS + 1.0)  # Let playback run past the play-at time
+
+    edited = client.put(f'{base}/{session_id}', json={'movie_thumbnail': 'https://example.com/thumb.jpg'},
+                        headers=headers).get_json()['session']
+    session_clocks.forget(session_id)  # Another worker, or an evicted clock, reloads from the row
+    reloaded = client.get(base, headers=headers).get_json()['session']
+
+    expected = 100.0 + (reloaded['server_time'] - played['play_at'])
+    # The row keeps microseconds, the clock a float
+    ok = (edited['position'] == played['position'] and abs(edited['play_at'] - played['play_at']) < 0.001
+          and abs(reloaded['play_at'] - played['play_at']) < 0.001 and abs(reloaded['current_time'] - expected) < 0.01)
+    print(f"details-only edit while playing: position {edited['position']:.1f} -> "
+          f"{reloaded['current_time']:.2f} s live (expected {expected:.2f}) - {'ok' if ok else 'MOVED'}")
+    return ok
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    failed = False
+    print(f"{minutes:g} simulated minutes per profile, play-at lead {PLAY_LEAD_SECONDS:.2f} s\n")
+    for profile in PROFILES:
+        result = simulate(profile, minutes, seed)
+        print(result['name'])
+        errors = ', '.join(f'{error * 1000:.1f}' for error in result['clock_errors'])
+        print(f"  clock offset error (ms)   {errors}")
+        for index, drifts in enumerate(result['to_server']):
+            print(f"  client {index + 1} vs server (ms)   p50 {percentile(drifts, 0.5) * 1000:7.1f}   "
+                  f"p95 {percentile(drifts, 0.95) * 1000:7.1f}   max {max(drifts) * 1000:7.1f}")
+        between = result['between']
+        p95 = percentile(between, 0.95)
+        print(f"  client vs client (ms)     p50 {percentile(between, 0.5) * 1000:7.1f}   "
+              f"p95 {p95 * 1000:7.1f}   max {max(between) * 1000:7.1f}")
+        print(f"  drift reports {result['reports']}, database writes {result['writes']} "
+              f"(previously {result['previous_writes']:,})\n")
+        if not result['stalls'] and p95 > MAX_P95_DRIFT:
+            failed = True
+
+    if failed:
+        print(f"FAILED - clients drift more than {MAX_P95_DRIFT * 1000:.0f} ms apart")
+        sys.exit(1)
+    if not check_details_edit():
+        print("FAILED - editing the movie details moved the playback clock")
+        sys.exit(1)
+    print(f"OK - clients stay within {MAX_P95_DRIFT * 1000:.0f} ms of each other (p95), "
+          f"and detail edits keep the clock")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MOVIE SYNC DRIFT SIMULATION")
+    print("=" * 60)
+    main()
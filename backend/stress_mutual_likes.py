@@ -0,0 +1,145 @@
+"""
+Concurrency stress test for mutual matches
+
+Creates pairs of users and has both users of every pair like each other at
+the same moment, from many threads at once. Pairs take turns between
+/like on both sides, /swipes on both sides and one of each. A /swipes user
+sends the same batch (the like plus a pass on a shared decoy user) twice at
+once, so duplicates race as well. Afterwards every request must have
+succeeded, every pair must have exactly two 'matched' rows and exactly one
+response must have reported the match.
+
+SQLite serializes writers, so the default temporary SQLite file
+(scratch_db.py) only shows the logic is right; set DATABASE_URL to a
+scratch PostgreSQL database to exercise the advisory lock under real
+concurrency.
+
+Usage: python stress_mutual_likes.py [pairs] [threads]
+"""
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scratch_db import use_scratch_database
+
+use_scratch_database()
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.models import db, User, Match
+
+
+# How the two users of a pair send their like, in turn
+ROUTES = [('like', 'like'), ('swipes', 'swipes'), ('like', 'swipes')]
+
+
+def create_user():
+    name = f'stress_{uuid.uuid4().hex[:12]}'
+    user = User(id=str(uuid.uuid4()), email=f'{name}@example.com', username=name,
+                password_hash='x', goal='relationship', age=30)
+    db.session.add(user)
+    return user.id
+
+
+def create_pairs(count):
+    pairs = []
+    for _ in range(count):
+        pairs.append((create_user(), create_user()))
+    db.session.commit()
+    return pairs
+
+
+def main():
+    pair_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    app, socketio = create_app()
+
+    with app.app_context():
+        pairs = create_pairs(pair_count)
+        decoy = create_user()
+        db.session.commit()
+        tokens = {user_id: create_access_token(identity=user_id) for pair in pairs for user_id in pair}
+
+    # All requests of a pair are released together by a per-pair barrier
+    jobs = []
+    barriers = {}
+    swipers = []
+    for index, (a, b) in enumerate(pairs):
+        pair_jobs = []
+        for (sender, receiver), route in zip(((a, b), (b, a)), ROUTES[index % len(ROUTES)]):
+            pair_jobs += [((a, b), route, sender, receiver)] * (2 if route == 'swipes' else 1)
+            if route == 'swipes':
+                swipers.append(sender)
+        barriers[(a, b)] = threading.Barrier(len(pair_jobs))
+        jobs += pair_jobs
+
+    def like(job):
+        pair, route, sender, receiver = job
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {tokens[sender]}'}
+        try:
+            barriers[pair].wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        if route == 'like':
+            response = client.post('/api/match/like', json={'user_id': receiver}, headers=headers)
+            body = response.get_json()
+            # A lost duplicate would be a 400; every /like here is the first
+            return pair, response.status_code, body, body.get('is_match')
+        response = client.post('/api/match/swipes', json={'swipes': [
+            {'user_id': receiver, 'action': 'like'},
+            {'user_id': decoy, 'action': 'pass'}
+        ]}, headers=headers)
+        body = response.get_json()
+        return pair, response.status_code, body, response.status_code == 200 and body['results'][0]['is_match']
+
+    print(f"Firing {len(jobs):,} reciprocal likes (/like and /swipes) for {pair_count:,} pairs "
+          f"on {threads} threads...")
+    # Pair jobs are adjacent, so all requests of a pair run concurrently
+    with ThreadPoolExecutor(max_workers=max(threads, 4)) as pool:
+        responses = list(pool.map(like, jobs))
+
+    errors = [(pair, status, body) for pair, status, body, _ in responses if status != 200]
+    reported = {}
+    for pair, status, body, is_match in responses:
+        if is_match:
+            reported[pair] = reported.get(pair, 0) + 1
+
+    failures = []
+    with app.app_context():
+        for a, b in pairs:
+            rows = Match.query.filter(
+                ((Match.sender_id == a) & (Match.receiver_id == b)) |
+                ((Match.sender_id == b) & (Match.receiver_id == a))
+            ).all()
+            statuses = sorted(row.status for row in rows)
+            if statuses != ['matched', 'matched'] or reported.get((a, b), 0) != 1:
+                failures.append(((a, b), statuses, reported.get((a, b), 0)))
+        decoy_passes = Match.query.filter_by(receiver_id=decoy, status='passed').count()
+
+    print(f"\nRequests failed:  {len(errors)}")
+    for pair, status, body in errors[:10]:
+        print(f"  {status}: {body}")
+    print(f"Pairs checked:    {pair_count}")
+    print(f"Pairs wrong:      {len(failures)}")
+    for pair, statuses, count in failures[:10]:
+        print(f"  {pair}: rows={statuses}, reported matches={count}")
+    print(f"Decoy passes:     {decoy_passes} (expected {len(swipers)})")
+
+    if errors or failures or decoy_passes != len(swipers):
+        print("\nFAILED")
+        sys.exit(1)
+    print("\nOK - every pair matched exactly once")
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("MUTUAL MATCH STRESS TEST")
+    print("=" * 60)
+    main()
@@ -1,28 +1,138 @@
 import { useState, useEffect, useRef } from 'react';
-import { Monitor, MonitorOff, Send, MessageCircle, Video, AlertCircle } from 'lucide-react';
+import { Monitor, MonitorOff, Send, MessageCircle, Video, AlertCircle, Play, Pause, Film, X } from 'lucide-react';
 import axios from 'axios';
+import { subscribeToMatch, emitToMatch } from '../utils/socket';
+import { syncClock, correctDrift, untilPlayAt, CORRECTION_INTERVAL } from '../utils/movieSync';
 
 export default function MovieTheater({ matchId, currentUserId, otherUser }) {
   const [isScreenSharing, setIsScreenSharing] = useState(false);
   const [messages, setMessages] = useState([]);
   const [newMessage, setNewMessage] = useState('');
   const [sending, setSending] = useState(false);
+  const [movie, setMovie] = useState(null); // Последнее состояние сеанса с сервера
+  const [movieUrl, setMovieUrl] = useState('');
+  const [moviePosition, setMoviePosition] = useState(0);
+  const [movieDuration, setMovieDuration] = useState(0);
 
   const videoRef = useRef(null);
   const screenStreamRef = useRef(null);
   const messagesEndRef = useRef(null);
+  const movieRef = useRef(null);
+  const clockOffsetRef = useRef(0); // Часы сервера минус наши, в секундах
+  const correctingRef = useRef(false);
+  const syncingRef = useRef(false);
 
   // Загрузка сообщений
   useEffect(() => {
     fetchMessages();
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
+    // Новые сообщения приходят через Socket.IO
+    return subscribeToMatch(matchId, {
+      new_message: (message) => {
+        addMessage(message);
+        if (message.sender_id !== currentUserId) {
+          emitToMatch('mark_read', matchId);
+        }
+      }
+    });
+  }, [matchId, currentUserId]);
+
+  // Сеанс совместного просмотра: часы сервера и его состояние
+  useEffect(() => {
+    resyncClock();
+    fetchMovieSession();
+    return subscribeToMatch(matchId, {
+      movie_state: (state) => setMovie(state)
+    });
   }, [matchId]);
 
+  // Держим видео на часах сервера: старт точно в play_at, затем коррекция
+  // скорости; при большом расхождении — перемотка и запрос состояния
+  useEffect(() => {
+    const video = movieRef.current;
+    if (!movie || !video) return;
+
+    const correct = () => {
+      if (correctDrift(video, movie, clockOffsetRef.current, correctingRef)) {
+        emitToMatch('movie_drift', matchId, { session_id: movie.session_id });
+        resyncClock();
+      }
+    };
+    correct();
+    const startTimer = setTimeout(correct, untilPlayAt(movie, clockOffsetRef.current));
+    const interval = setInterval(correct, CORRECTION_INTERVAL);
+    return () => {
+      clearTimeout(startTimer);
+      clearInterval(interval);
+    };
+  }, [movie, matchId]);
+
   useEffect(() => {
     scrollToBottom();
   }, [messages]);
 
+  const resyncClock = async () => {
+    if (syncingRef.current) return;
+    syncingRef.current = true;
+    try {
+      clockOffsetRef.current = await syncClock();
+    } catch (err) {
+      console.error('Failed to sync clock:', err);
+    } finally {
+      syncingRef.current = false;
+    }
+  };
+
+  const fetchMovieSession = async () => {
+    try {
+      const response = await axios.get(`http://localhost:5000/api/movie/${matchId}/session`, {
+        headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` }
+      });
+      const session = response.data.session;
+      // Событие movie_state могло прийти раньше ответа
+      if (session) setMovie(prev => prev || { ...session, session_id: session.id });
+    } catch (err) {
+      console.error('Failed to load movie session:', err);
+    }
+  };
+
+  const startMovie = async (e) => {
+    e.preventDefault();
+    if (!movieUrl.trim()) return;
+    try {
+      // Состояние нового сеанса приходит через movie_state
+      await axios.post(
+        `http://localhost:5000/api/movie/${matchId}/session`,
+        { movie_url: movieUrl.trim(), movie_title: movieUrl.trim().split('/').pop() },
+        { headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` } }
+      );
+      setMovieUrl('');
+    } catch (err) {
+      console.error('Failed to start movie session:', err);
+    }
+  };
+
+  const endMovie = async () => {
+    try {
+      await axios.delete(`http://localhost:5000/api/movie/${matchId}/session/${movie.session_id}`, {
+        headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` }
+      });
+    } catch (err) {
+      console.error('Failed to end movie session:', err);
+    }
+  };
+
+  // Play, pause и перемотка идут на сервер; видео меняется только когда
+  // приходит новое состояние, одновременно у обоих
+  const controlMovie = (status, position) => {
+    emitToMatch('movie_control', matchId, { session_id: movie.session_id, status, position });
+  };
+
+  const formatPosition = (seconds) => {
+    const total = Math.floor(seconds || 0);
+    const minutes = Math.floor(total / 60);
+    return `${minutes}:${String(total % 60).padStart(2, '0')}`;
+  };
+
   const fetchMessages = async () => {
     try {
       const response = await axios.get(`http://localhost:5000/api/chat/${matchId}/messages`, {
@@ -34,19 +144,23 @@ export default function MovieTheater({ matchId, currentUserId, otherUser }) {
     }
   };
 
+  const addMessage = (message) => {
+    setMessages(prev => prev.some(msg => msg.id === message.id) ? prev : [...prev, message]);
+  };
+
   const sendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim() || sending) return;
 
     setSending(true);
     try {
-      await axios.post(
+      const response = await axios.post(
         `http://localhost:5000/api/chat/${matchId}/messages`,
         { message: newMessage },
         { headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` } }
       );
       setNewMessage('');
-      fetchMessages();
+      addMessage(response.data.message);
     } catch (err) {
       console.error('Failed to send message:', err);
     } finally {
@@ -119,7 +233,49 @@ export default function MovieTheater({ matchId, currentUserId, otherUser }) {
     <div className="h-full flex flex-col bg-gray-50">
       {/* Screen Share Area */}
       <div className="flex-1 bg-black relative overflow-hidden">
-        {!isScreenSharing ? (
+        {!isScreenSharing && movie?.movie_url && movie.status !== 'ended' ? (
+          // Synced movie player
+          <>
+            <video
+              ref={movieRef}
+              src={movie.movie_url}
+              playsInline
+              onLoadedMetadata={(e) => setMovieDuration(e.target.duration)}
+              onTimeUpdate={(e) => setMoviePosition(e.target.currentTime)}
+              className="w-full h-full object-contain"
+            />
+
+            <div className="absolute bottom-0 inset-x-0 p-4 bg-gradient-to-t from-black/80 to-transparent flex items-center gap-3 text-white">
+              <button
+                onClick={() => controlMovie(movie.status === 'playing' ? 'paused' : 'playing', movieRef.current?.currentTime)}
+                className="p-2 bg-pink-600 hover:bg-pink-700 rounded-lg transition"
+                title={movie.status === 'playing' ? 'Пауза' : 'Смотреть'}
+              >
+                {movie.status === 'playing' ? <Pause className="w-5 h-5" /> : <Play className="w-5 h-5" />}
+              </button>
+              <span className="text-sm tabular-nums">{formatPosition(moviePosition)}</span>
+              <input
+                type="range"
+                min={0}
+                max={movieDuration || 0}
+                step={1}
+                value={Math.min(moviePosition, movieDuration || 0)}
+                onChange={(e) => setMoviePosition(Number(e.target.value))}
+                onPointerUp={(e) => controlMovie(null, Number(e.target.value))}
+                onKeyUp={(e) => controlMovie(null, Number(e.target.value))}
+                className="flex-1 accent-pink-600"
+              />
+              <span className="text-sm tabular-nums">{formatPosition(movieDuration)}</span>
+              <button
+                onClick={endMovie}
+                className="p-2 bg-gray-800 hover:bg-gray-700 rounded-lg transition"
+                title="Завершить просмотр"
+              >
+                <X className="w-5 h-5" />
+              </button>
+            </div>
+          </>
+        ) : !isScreenSharing ? (
           // Placeholder when not sharing
           <div className="h-full flex flex-col items-center justify-center text-white p-8">
             <div className="text-center max-w-lg">
@@ -137,6 +293,24 @@ export default function MovieTheater({ matchId, currentUserId, otherUser }) {
                 Начать демонстрацию экрана
               </button>
 
+              <form onSubmit={startMovie} className="mt-4 flex gap-2">
+                <input
+                  type="url"
+                  value={movieUrl}
+                  onChange={(e) => setMovieUrl(e.target.value)}
+                  placeholder="...или ссылка на видеофайл"
+                  className="flex-1 px-4 py-2 rounded-lg bg-gray-900 border border-gray-700 text-white text-sm focus:ring-2 focus:ring-pink-500 focus:border-transparent"
+                />
+                <button
+                  type="submit"
+                  disabled={!movieUrl.trim()}
+                  className="bg-pink-600 hover:bg-pink-700 px-4 py-2 rounded-lg transition disabled:opacity-50 flex items-center gap-2 text-sm font-semibold"
+                >
+                  <Film className="w-4 h-4" />
+                  Смотреть вместе
+                </button>
+              </form>
+
               <div className="mt-8 p-4 bg-gray-900 rounded-lg text-left">
                 <div className="flex items-start gap-3 mb-3">
                   <AlertCircle className="w-5 h-5 text-yellow-500 flex-shrink-0 mt-0.5" />
@@ -2,6 +2,7 @@ import React from 'react'
 import ReactDOM from 'react-dom/client'
 import App from './App.jsx'
 import './index.css'
+import './utils/api' // Installs the token refresh interceptor on axios
 
 ReactDOM.createRoot(document.getElementById('root')).render(
   <React.StrictMode>
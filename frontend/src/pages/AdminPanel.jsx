@@ -74,8 +74,9 @@ export default function AdminPanel() {
         }
       );
 
-      // Save new token
+      // Save new tokens
       localStorage.setItem('access_token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
       alert(`Sie sind jetzt als ${username} angemeldet`);
       navigate('/dashboard');
     } catch (err) {
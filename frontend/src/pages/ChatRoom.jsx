@@ -7,6 +7,7 @@ import {
 } from 'lucide-react';
 import axios from 'axios';
 import MovieTheater from '../components/MovieTheater';
+import { subscribeToMatch, emitToMatch } from '../utils/socket';
 
 export default function ChatRoom() {
   const { matchId } = useParams();
@@ -23,6 +24,13 @@ export default function ChatRoom() {
   const [currentUserId, setCurrentUserId] = useState(null);
   const [currentUser, setCurrentUser] = useState(null);
   const [activeTab, setActiveTab] = useState('chat');
+  const [otherTyping, setOtherTyping] = useState(false);
+  const typingTimeoutRef = useRef(null);
+  const typingSentRef = useRef(0);
+  const currentUserIdRef = useRef(null);
+  const messagesRef = useRef([]);
+  const [hasOlder, setHasOlder] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   // AI Assistant State
   const [showAiPanel, setShowAiPanel] = useState(false);
@@ -41,14 +49,49 @@ export default function ChatRoom() {
     fetchMessages();
     fetchAiStatus();
 
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
+    // Live updates are pushed over Socket.IO instead of polling
+    const unsubscribe = subscribeToMatch(matchId, {
+      // (Re)joined the room: pick up anything sent while disconnected
+      joined_match: () => fetchNewerMessages(),
+      new_message: (message) => {
+        addMessage(message);
+        setOtherTyping(false);
+        // The chat is open, so messages from the other user are read right away
+        if (message.sender_id !== currentUserIdRef.current) {
+          emitToMatch('mark_read', matchId);
+        }
+      },
+      messages_read: ({ reader_id, read_at }) => {
+        // Everything sent to the reader up to the read watermark is read
+        setMessages(prev => prev.map(msg =>
+          msg.sender_id !== reader_id && msg.created_at <= read_at ? { ...msg, is_read: true } : msg
+        ));
+      },
+      typing: ({ is_typing }) => {
+        setOtherTyping(is_typing);
+        clearTimeout(typingTimeoutRef.current);
+        if (is_typing) {
+          typingTimeoutRef.current = setTimeout(() => setOtherTyping(false), 5000);
+        }
+      }
+    });
+
+    return () => {
+      unsubscribe();
+      clearTimeout(typingTimeoutRef.current);
+    };
   }, [matchId]);
 
+  // Scroll only when a new message arrives, not when older ones are prepended
+  const lastMessageId = messages[messages.length - 1]?.id;
   useEffect(() => {
-    scrollToBottom();
+    messagesRef.current = messages;
   }, [messages]);
 
+  useEffect(() => {
+    scrollToBottom();
+  }, [lastMessageId]);
+
   useEffect(() => {
     if (aiChatEndRef.current) {
       aiChatEndRef.current.scrollIntoView({ behavior: 'smooth' });
@@ -77,6 +120,7 @@ export default function ChatRoom() {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       setCurrentUserId(userResponse.data.user.id);
+      currentUserIdRef.current = userResponse.data.user.id;
       setCurrentUser(userResponse.data.user);
 
       const roomResponse = await axios.get(`http://localhost:5000/api/chat/${matchId}/room`, {
@@ -96,6 +140,7 @@ export default function ChatRoom() {
         }
       });
       setMessages(response.data.messages);
+      setHasOlder(response.data.has_more);
       setOtherUser(response.data.other_user);
       setLoading(false);
     } catch (err) {
@@ -104,13 +149,68 @@ export default function ChatRoom() {
     }
   };
 
+  const fetchNewerMessages = async () => {
+    const lastId = messagesRef.current[messagesRef.current.length - 1]?.id;
+    if (!lastId) return;
+    try {
+      const response = await axios.get(`http://localhost:5000/api/chat/${matchId}/messages`, {
+        params: { after_id: lastId, limit: 200 },
+        headers: {
+          'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+        }
+      });
+      if (response.data.has_more) {
+        // Too far behind, reload the latest page
+        fetchMessages();
+      } else {
+        response.data.messages.forEach(addMessage);
+      }
+    } catch (err) {
+      console.error('Failed to load new messages:', err);
+    }
+  };
+
+  const fetchOlderMessages = async () => {
+    const firstId = messages[0]?.id;
+    if (!firstId || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const response = await axios.get(`http://localhost:5000/api/chat/${matchId}/messages`, {
+        params: { before_id: firstId },
+        headers: {
+          'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+        }
+      });
+      setMessages(prev => [...response.data.messages, ...prev]);
+      setHasOlder(response.data.has_more);
+    } catch (err) {
+      console.error('Failed to load older messages:', err);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
+  const addMessage = (message) => {
+    setMessages(prev => prev.some(msg => msg.id === message.id) ? prev : [...prev, message]);
+  };
+
+  const handleMessageChange = (e) => {
+    setNewMessage(e.target.value);
+    // Throttle typing notifications to one every 2 seconds
+    const now = Date.now();
+    if (now - typingSentRef.current > 2000) {
+      typingSentRef.current = now;
+      emitToMatch('typing', matchId, { is_typing: true });
+    }
+  };
+
   const sendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim() || sending) return;
 
     setSending(true);
     try {
-      await axios.post(
+      const response = await axios.post(
         `http://localhost:5000/api/chat/${matchId}/messages`,
         { message: newMessage },
         {
@@ -120,7 +220,9 @@ export default function ChatRoom() {
         }
       );
       setNewMessage('');
-      fetchMessages();
+      addMessage(response.data.message);
+      typingSentRef.current = 0;
+      emitToMatch('typing', matchId, { is_typing: false });
       
       // Refresh AI suggestions after sending
       if (aiEnabled && showAiPanel) {
@@ -272,8 +374,8 @@ export default function ChatRoom() {
           {otherUser && (
             <div className="flex items-center gap-3">
               <div className="w-10 h-10 rounded-full overflow-hidden bg-gray-200">
-                {otherUser.photos && JSON.parse(otherUser.photos)[0] ? (
-                  <img src={JSON.parse(otherUser.photos)[0]} alt={otherUser.username} className="w-full h-full object-cover" />
+                {otherUser.photos?.[0] ? (
+                  <img src={otherUser.photos[0]} alt={otherUser.username} className="w-full h-full object-cover" />
                 ) : (
                   <div className="w-full h-full flex items-center justify-center bg-gradient-to-br from-pink-200 to-purple-200 text-white font-bold">
                     {otherUser.first_name?.[0] || otherUser.username[0]}
@@ -374,6 +476,17 @@ export default function ChatRoom() {
                   </div>
                 ) : (
                   <div className="space-y-4">
+                    {hasOlder && (
+                      <div className="text-center">
+                        <button
+                          onClick={fetchOlderMessages}
+                          disabled={loadingOlder}
+                          className="text-sm text-pink-600 hover:underline disabled:opacity-50"
+                        >
+                          {loadingOlder ? 'Wird geladen...' : 'Ältere Nachrichten laden'}
+                        </button>
+                      </div>
+                    )}
                     {messages.map((msg) => {
                       const isOwn = msg.sender_id === currentUserId;
                       return (
@@ -399,6 +512,11 @@ export default function ChatRoom() {
                         </div>
                       );
                     })}
+                    {otherTyping && (
+                      <p className="text-xs text-gray-500 italic">
+                        {otherUser?.first_name || otherUser?.username} schreibt...
+                      </p>
+                    )}
                     <div ref={messagesEndRef} />
                   </div>
                 )}
@@ -425,7 +543,7 @@ export default function ChatRoom() {
                 <input
                   type="text"
                   value={newMessage}
-                  onChange={(e) => setNewMessage(e.target.value)}
+                  onChange={handleMessageChange}
                   placeholder="Nachricht schreiben..."
                   className="flex-1 px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-pink-500 focus:border-transparent"
                   disabled={sending}
@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { authAPI } from '../utils/api';
+import { authAPI, clearTokens } from '../utils/api';
+import { disconnectSocket } from '../utils/socket';
 import axios from 'axios';
 import { Shield, AlertTriangle, CheckCircle, ArrowRight } from 'lucide-react';
 
@@ -18,7 +19,7 @@ export default function Dashboard() {
         setUser(response.data.user);
       } catch (error) {
         // If token is invalid, redirect to login
-        localStorage.removeItem('access_token');
+        clearTokens();
         navigate('/login');
       } finally {
         setLoading(false);
@@ -53,7 +54,8 @@ export default function Dashboard() {
   }, [navigate]);
 
   const handleLogout = () => {
-    localStorage.removeItem('access_token');
+    authAPI.logout().catch(() => {}).finally(clearTokens);
+    disconnectSocket();
     navigate('/');
   };
 
@@ -11,6 +11,8 @@ export default function Discover() {
   const [users, setUsers] = useState([]);
   const [currentIndex, setCurrentIndex] = useState(0);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [showMatchModal, setShowMatchModal] = useState(false);
   const [matchedUser, setMatchedUser] = useState(null);
@@ -43,6 +45,7 @@ export default function Discover() {
         }
       });
       setUsers(response.data.users);
+      setNextCursor(response.data.next_cursor);
       setLoading(false);
     } catch (err) {
       setError('Failed to load matches');
@@ -50,6 +53,36 @@ export default function Discover() {
     }
   };
 
+  // Load the next page of the feed (already prefetched on the server)
+  const fetchMoreMatches = async () => {
+    if (!nextCursor || loadingMore) return;
+
+    try {
+      setLoadingMore(true);
+      const params = new URLSearchParams({ cursor: nextCursor });
+      if (category) params.set('category', category);
+
+      const response = await axios.get(`http://localhost:5000/api/match/discover?${params}`, {
+        headers: {
+          'Authorization': `Bearer ${localStorage.getItem('access_token')}`
+        }
+      });
+      setUsers((prev) => [...prev, ...response.data.users]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error('Failed to load more matches:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Request the next page shortly before the current one runs out
+  useEffect(() => {
+    if (users.length - currentIndex <= 5) {
+      fetchMoreMatches();
+    }
+  }, [currentIndex, users.length]);
+
   const getCategoryInfo = () => {
     const categories = {
       'relationship': { title: 'Beziehungen', icon: Heart, color: 'pink' },
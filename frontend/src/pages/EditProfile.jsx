@@ -117,15 +117,23 @@ export default function EditProfile() {
           continue;
         }
 
-        // In base64 konvertieren für Einfachheit (im Produktiveinsatz S3/Cloudinary verwenden)
-        const reader = new FileReader();
-        const base64 = await new Promise((resolve, reject) => {
-          reader.onload = () => resolve(reader.result);
-          reader.onerror = reject;
-          reader.readAsDataURL(file);
+        // In den Foto-Speicher hochladen (Server erzeugt Thumbnails), URL übernehmen
+        const body = new FormData();
+        body.append('photo', file);
+        const response = await fetch('http://localhost:5000/api/photos', {
+          method: 'POST',
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+          },
+          body,
         });
+        const result = await response.json();
+        if (!response.ok) {
+          setError(result.error || `Datei ${file.name} konnte nicht hochgeladen werden`);
+          continue;
+        }
 
-        uploadedUrls.push(base64);
+        uploadedUrls.push(result.url);
       }
 
       setPhotos([...photos, ...uploadedUrls]);
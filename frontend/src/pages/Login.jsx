@@ -31,8 +31,9 @@ export default function Login() {
     try {
       const response = await authAPI.login(formData);
 
-      // Save token
+      // Save tokens
       localStorage.setItem('access_token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
 
       // Redirect to dashboard
       navigate('/dashboard');
@@ -10,6 +10,7 @@ import {
 } from 'lucide-react';
 import axios from 'axios';
 import RealStripePaymentModal from '../components/RealStripePayment';
+import { subscribeToMatch, emitToMatch } from '../utils/socket';
 
 // Interest icons mapping
 const interestIcons = {
@@ -94,8 +95,13 @@ export default function ProfileView() {
   useEffect(() => {
     if (activeTab === 'chat' && matchId) {
       fetchMessages();
-      const interval = setInterval(fetchMessages, 3000);
-      return () => clearInterval(interval);
+      // New messages are pushed over Socket.IO instead of polling
+      return subscribeToMatch(matchId, {
+        new_message: (message) => {
+          addMessage(message);
+          emitToMatch('mark_read', matchId);
+        }
+      });
     }
   }, [activeTab, matchId]);
 
@@ -150,6 +156,10 @@ export default function ProfileView() {
     }
   };
 
+  const addMessage = (message) => {
+    setMessages(prev => prev.some(msg => msg.id === message.id) ? prev : [...prev, message]);
+  };
+
   const sendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim() || !matchId) return;
@@ -157,13 +167,13 @@ export default function ProfileView() {
     try {
       setSending(true);
       const token = localStorage.getItem('access_token');
-      await axios.post(
+      const response = await axios.post(
         `http://localhost:5000/api/chat/${matchId}/messages`,
         { message: newMessage },
         { headers: { 'Authorization': `Bearer ${token}` } }
       );
       setNewMessage('');
-      await fetchMessages();
+      addMessage(response.data.message);
     } catch (err) {
       console.error('Failed to send message:', err);
     } finally {
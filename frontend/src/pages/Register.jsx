@@ -122,6 +122,7 @@ export default function Register() {
 
       const response = await authAPI.register(payload);
       localStorage.setItem('access_token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
       navigate('/dashboard');
     } catch (err) {
       setError(err.response?.data?.error || 'Registrierungsfehler. Bitte versuchen Sie es erneut.');
@@ -18,9 +18,64 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+export const clearTokens = () => {
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+};
+
+// Access tokens are short-lived. One refresh is shared by every request
+// that fails at the same time; resolves to the new access token.
+let refreshing: Promise<string> | null = null;
+
+export const refreshAccessToken = (): Promise<string> => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = (refreshToken
+      ? axios.post(`${API_URL}/auth/refresh`, {}, {
+          headers: { Authorization: `Bearer ${refreshToken}` },
+          skipAuthRefresh: true,
+        } as any)
+      : Promise.reject<any>(new Error('No refresh token'))
+    )
+      .then((response: any) => {
+        localStorage.setItem('access_token', response.data.access_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+// On 401, refresh the access token and retry the request once. Installed on
+// the shared instance and on the global axios used by most pages.
+const retryWithFreshToken = (client: any) => async (error: any) => {
+  const config = error.config;
+  if (error.response?.status !== 401 || !config || config.skipAuthRefresh || config._retried) {
+    throw error;
+  }
+  config._retried = true;
+  let token: string;
+  try {
+    token = await refreshAccessToken();
+  } catch {
+    clearTokens();
+    window.location.assign('/login');
+    throw error;
+  }
+  config.headers.Authorization = `Bearer ${token}`;
+  return client(config);
+};
+
+api.interceptors.response.use(null, retryWithFreshToken(api));
+axios.interceptors.response.use(null, retryWithFreshToken(axios));
+
 // Auth endpoints
 export const authAPI = {
-  register: (data: any) => api.post('/auth/register', data),
-  login: (data: any) => api.post('/auth/login', data),
+  register: (data: any) => api.post('/auth/register', data, { skipAuthRefresh: true } as any),
+  login: (data: any) => api.post('/auth/login', data, { skipAuthRefresh: true } as any),
   getMe: () => api.get('/auth/me'),
+  // Best effort: revokes the access token and the refresh token on the server
+  logout: () => api.post('/auth/logout', { refresh_token: localStorage.getItem('refresh_token') }, { skipAuthRefresh: true } as any),
 };
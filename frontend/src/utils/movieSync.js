@@ -0,0 +1,102 @@
+import { getSocket } from './socket';
+
+// Watch-together playback sync. The server owns the playback clock: a state
+// says "position `position` at server time `play_at`". Each client measures
+// its offset to the server clock once, then keeps its own <video> on that
+// clock locally, nudging the playback rate; it only seeks (and reports to
+// the server) when the drift is too large to correct that way.
+// backend/simulate_movie_sync.py simulates this logic with the same constants.
+
+export const DRIFT_IGNORE = 0.04; // Seconds of drift left alone...
+export const DRIFT_SETTLED = 0.01; // ...until a correction brings it under this
+export const DRIFT_SEEK = 1.0; // Seconds of drift corrected by seeking (and reported)
+export const MAX_RATE_CHANGE = 0.05; // Largest playback rate correction (5%)
+export const CORRECTION_WINDOW = 2.0; // Seconds over which drift is corrected by rate
+export const CORRECTION_INTERVAL = 250; // ms between corrections
+export const SYNC_SAMPLES = 8;
+
+const nowSeconds = () => Date.now() / 1000;
+
+const probe = () =>
+  new Promise((resolve, reject) => {
+    getSocket()
+      .timeout(2000)
+      .emit('time_sync', { t0: nowSeconds() }, (err, reply) => {
+        const t3 = nowSeconds();
+        if (err || !reply) {
+          reject(err || new Error('No reply'));
+          return;
+        }
+        const { t0, t1, t2 } = reply;
+        resolve({ rtt: (t3 - t0) - (t2 - t1), offset: ((t1 - t0) + (t2 - t3)) / 2 });
+      });
+  });
+
+// NTP-style offset of the server clock to ours (seconds, server minus
+// client), from the probe with the smallest round trip
+export const syncClock = async (samples = SYNC_SAMPLES) => {
+  let best = null;
+  for (let i = 0; i < samples; i += 1) {
+    try {
+      const sample = await probe();
+      if (!best || sample.rtt < best.rtt) best = sample;
+    } catch {
+      // A lost probe is just skipped
+    }
+  }
+  if (!best) throw new Error('Clock sync failed');
+  return best.offset;
+};
+
+export const serverNow = (offset) => nowSeconds() + offset;
+
+// Where playback should be right now
+export const targetPosition = (state, offset) => {
+  if (state.status !== 'playing' || state.play_at == null) return state.position;
+  return state.position + Math.max(serverNow(offset) - state.play_at, 0);
+};
+
+// Milliseconds until a playing state's play-at time, 0 if it has passed
+export const untilPlayAt = (state, offset) =>
+  state.status === 'playing' && state.play_at != null
+    ? Math.max((state.play_at - serverNow(offset)) * 1000, 0)
+    : 0;
+
+// Bring the video in line with the state. Returns true after a hard seek,
+// which the caller reports with `movie_drift` (and re-syncs its clock).
+// `correcting` carries the hysteresis between calls.
+export const correctDrift = (video, state, offset, correcting) => {
+  const target = targetPosition(state, offset);
+  if (state.status !== 'playing') {
+    if (!video.paused) video.pause();
+    video.playbackRate = 1;
+    correcting.current = false;
+    if (Math.abs(video.currentTime - target) > DRIFT_IGNORE) video.currentTime = target;
+    return false;
+  }
+  if (untilPlayAt(state, offset) > 0) {
+    // Wait for the play-at time; the caller starts playback on a timer
+    if (!video.paused) video.pause();
+    video.playbackRate = 1;
+    if (Math.abs(video.currentTime - state.position) > DRIFT_IGNORE) video.currentTime = state.position;
+    return false;
+  }
+  if (video.paused) {
+    // Start (on the play-at timer, or late) at the live position
+    video.currentTime = target;
+    video.play().catch(() => {});
+  }
+
+  const drift = video.currentTime - target;
+  if (Math.abs(drift) >= DRIFT_SEEK) {
+    video.currentTime = target;
+    video.playbackRate = 1;
+    correcting.current = false;
+    return true;
+  }
+  correcting.current = Math.abs(drift) > (correcting.current ? DRIFT_SETTLED : DRIFT_IGNORE);
+  video.playbackRate = correcting.current
+    ? 1 - Math.max(-MAX_RATE_CHANGE, Math.min(MAX_RATE_CHANGE, drift / CORRECTION_WINDOW))
+    : 1;
+  return false;
+};
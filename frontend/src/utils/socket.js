@@ -0,0 +1,79 @@
+import { io } from 'socket.io-client';
+import { refreshAccessToken } from './api';
+
+const SOCKET_URL = import.meta.env.VITE_SOCKET_URL || 'http://localhost:5000';
+
+let socket = null;
+
+// Number of mounted subscribers per match room
+const roomRefs = {};
+
+// Shared Socket.IO connection, authenticated with the current access token
+export const getSocket = () => {
+  if (!socket) {
+    socket = io(SOCKET_URL, {
+      // Read the token on every (re)connect so a new login is picked up
+      auth: (cb) => cb({ token: localStorage.getItem('access_token') }),
+    });
+    // A rejected connection usually means the access token expired: refresh
+    // it and try once more; a successful connection re-arms the retry.
+    let retried = false;
+    socket.on('connect', () => {
+      retried = false;
+    });
+    socket.on('connect_error', () => {
+      if (retried) return;
+      retried = true;
+      const s = socket;
+      refreshAccessToken()
+        .then(() => {
+          if (socket === s) s.connect();
+        })
+        .catch(() => {});
+    });
+  }
+  return socket;
+};
+
+export const disconnectSocket = () => {
+  if (socket) {
+    socket.disconnect();
+    socket = null;
+  }
+  Object.keys(roomRefs).forEach((matchId) => delete roomRefs[matchId]);
+};
+
+// Join a match room and listen to its events. Handlers only receive events
+// for this match. Several components may subscribe to the same match; the
+// room is left when the last one cleans up. Returns a cleanup function.
+export const subscribeToMatch = (matchId, handlers) => {
+  const s = getSocket();
+  const join = () => s.emit('join_match', { match_id: matchId });
+  roomRefs[matchId] = (roomRefs[matchId] || 0) + 1;
+
+  const listeners = Object.entries(handlers).map(([event, handler]) => {
+    const listener = (data) => {
+      if (data?.match_id === matchId) handler(data);
+    };
+    s.on(event, listener);
+    return [event, listener];
+  });
+
+  // Rooms are lost on reconnect, so join again every time we connect
+  s.on('connect', join);
+  if (s.connected) join();
+
+  return () => {
+    roomRefs[matchId] -= 1;
+    if (roomRefs[matchId] <= 0) {
+      delete roomRefs[matchId];
+      s.emit('leave_match', { match_id: matchId });
+    }
+    s.off('connect', join);
+    listeners.forEach(([event, listener]) => s.off(event, listener));
+  };
+};
+
+export const emitToMatch = (event, matchId, data = {}) => {
+  getSocket().emit(event, { match_id: matchId, ...data });
+};